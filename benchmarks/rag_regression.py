@@ -0,0 +1,498 @@
+################################################################
+# End-to-end RAG regression benchmark: every question row of the knowledge
+# base is asked through `answer_query`, the path main.py's
+# get_query_response takes, with deterministic local fakes for the
+# embeddings and the LLM and an in-process vector index, over a grid of
+# chunking and retrieval settings. Reports retrieval recall@k, latency
+# percentiles and ROUGE/METEOR of the answers, as JSON that can be compared
+# against a baseline run.
+#
+#   python -m benchmarks.rag_regression [--chunk-size 500,1000]
+#       [--chunk-overlap 0,100] [--k 3,5] [--mode hybrid,vector]
+#       [--sample N] [--queries keywords|verbatim]
+#       [--output results.json] [--baseline previous.json]
+################################################################
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from rich import print as rprint
+
+from cache import ResponseCache, normalize_query
+from config.settings import DATA_DIR
+from core import AppContext, answer_query, load_config
+from evaluation.engine import score_lexical
+from evaluation.metrics import ensure_nltk_data, meteor_value
+from pipeline.chunker import pack_rows
+from pipeline.loader import load_csv_file
+from utils.metrics import get_registry
+from vectorstore import HybridRetriever, LocalVectorIndex
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+_WORD = re.compile(r"\w+")
+
+
+def words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings: every word and word pair is hashed
+    into one of `dimensions` buckets. Texts sharing words are close, as with
+    a real model, without any network call.
+    """
+
+    model = "hashing"
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def _bucket(self, token: str) -> int:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % self.dimensions
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        tokens = words(text)
+        for token in tokens + [" ".join(pair) for pair in zip(tokens, tokens[1:])]:
+            vector[self._bucket(token)] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def parse_row(text: str) -> Tuple[str, str]:
+    """(question, answer) of a CSVLoader question/answer row."""
+    question, _, answer = text.partition("\nanswer:")
+    return question.removeprefix("question:").strip(), answer.strip()
+
+
+class ExtractiveChain:
+    """
+    Stands in for the QA chain: answers with the packed row whose question
+    shares the most words with the query, after `latency` seconds. Whatever
+    retrieval and packing left out, it cannot answer.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.last_documents: List[Document] = []
+
+    def run(self, input_documents, question, callbacks=None) -> str:
+        self.last_documents = list(input_documents)
+        if self.latency:
+            time.sleep(self.latency)
+
+        query_words = set(words(question))
+        best, best_overlap = "", -1
+        for document in input_documents:
+            for line in re.split(r"\n(?=question:)", document.page_content):
+                row_question, answer = parse_row(line)
+                overlap = len(query_words & set(words(row_question)))
+                if answer and overlap > best_overlap:
+                    best, best_overlap = answer, overlap
+        return best
+
+
+def keyword_query(question: str, rng: random.Random, keep: float = 0.6) -> str:
+    """
+    The question as a user might type it into a search box: words of four
+    letters or more, a random `keep` share of them, in their order.
+    """
+    content = [word for word in words(question) if len(word) > 3] or words(question)
+    count = max(1, round(len(content) * keep))
+    kept = sorted(rng.sample(range(len(content)), count))
+    return " ".join(content[i] for i in kept)
+
+
+def load_queries(
+    data_directory: str,
+    sample: Optional[int] = None,
+    seed: int = 0,
+    style: str = "keywords",
+) -> List[Dict[str, Any]]:
+    """
+    Every distinct question row of the CSVs, with the answer and where it
+    lives. The query asked is the question itself (`style` "verbatim") or
+    seeded keywords taken from it ("keywords"), which retrieval finds harder.
+    """
+    rng = random.Random(seed)
+    queries, seen = [], set()
+    for filename in sorted(os.listdir(data_directory)):
+        if not filename.endswith(".csv"):
+            continue
+        for row in load_csv_file(os.path.join(data_directory, filename)):
+            question, answer = parse_row(row.page_content)
+            if question and answer and normalize_query(question) not in seen:
+                seen.add(normalize_query(question))
+                queries.append(
+                    {
+                        "query": (
+                            question
+                            if style == "verbatim"
+                            else keyword_query(question, rng)
+                        ),
+                        "question": question,
+                        "answer": answer,
+                        "source": filename,
+                        "row": row.metadata["row"],
+                    }
+                )
+    if sample and sample < len(queries):
+        queries = rng.sample(queries, sample)
+    return queries
+
+
+def load_rows(data_directory: str) -> List[List[Document]]:
+    return [
+        load_csv_file(os.path.join(data_directory, filename))
+        for filename in sorted(os.listdir(data_directory))
+        if filename.endswith(".csv")
+    ]
+
+
+def is_relevant(document: Document, query: Dict[str, Any]) -> bool:
+    metadata = document.metadata
+    return metadata.get("source") == query["source"] and metadata.get(
+        "row_start", -1
+    ) <= query["row"] <= metadata.get("row_end", -1)
+
+
+def percentiles_ms(seconds: Sequence[float]) -> Dict[str, float]:
+    if not seconds:
+        return {}
+    values = np.asarray(seconds) * 1000
+    return {
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p90": float(np.percentile(values, 90)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+@lru_cache
+def meteor_available() -> bool:
+    ensure_nltk_data()
+    try:
+        meteor_value("ready", "ready")
+        return True
+    except LookupError:
+        logging.warning("Skipping METEOR, the NLTK wordnet and punkt data are missing")
+        return False
+
+
+def lexical_quality(
+    references: List[str], predictions: List[str], metrics: Sequence[str]
+) -> Dict[str, float]:
+    if "meteor" in metrics and not meteor_available():
+        metrics = [metric for metric in metrics if metric != "meteor"]
+    scores = score_lexical(references, predictions, metrics, workers=1)
+    columns = sorted({column for score in scores for column in score})
+    return {
+        column: float(np.mean([score[column] for score in scores]))
+        for column in columns
+    }
+
+
+def run_config(
+    rows: List[List[Document]],
+    queries: List[Dict[str, Any]],
+    config: Dict[str, Any],
+    embeddings: Embeddings,
+    llm_latency: float = 0.0,
+    metrics: Sequence[str] = ("rouge", "meteor"),
+) -> Dict[str, Any]:
+    """Build an index for `config`, ask every query and score the run."""
+    start_time = time.perf_counter()
+    chunks = [
+        chunk
+        for file_rows in rows
+        for chunk in pack_rows(
+            file_rows,
+            chunk_size=config["chunk_size"],
+            chunk_overlap=config["chunk_overlap"],
+        )
+    ]
+    index = LocalVectorIndex.from_texts(
+        [chunk.page_content for chunk in chunks],
+        embeddings,
+        metadatas=[chunk.metadata for chunk in chunks],
+    )
+    index_seconds = time.perf_counter() - start_time
+
+    conf = load_config()
+    conf["documents_return_count"] = str(config["k"])
+    retriever = HybridRetriever(
+        index,
+        index if config["retrieval_mode"] == "hybrid" else None,
+        candidates=conf.getint("retrieval_candidates", 20),
+        rrf_k=conf.getint("rrf_k", 60),
+    )
+    chain = ExtractiveChain(llm_latency)
+    # questions are distinct and semantic hits are off, so every query
+    # takes the full path
+    context = AppContext(
+        conf,
+        embeddings,
+        index,
+        chain,
+        ResponseCache(threshold=float("inf")),
+        retriever,
+    )
+
+    registry = get_registry()
+    registry.clear()
+    hits = context_hits = 0
+    latencies: List[float] = []
+    predictions: List[str] = []
+    for query in queries:
+        retrieved = retriever.search(
+            query["query"], embeddings.embed_query(query["query"]), config["k"]
+        )
+        hits += any(is_relevant(document, query) for document in retrieved)
+
+        start_time = time.perf_counter()
+        predictions.append(answer_query(context, query["query"]))
+        latencies.append(time.perf_counter() - start_time)
+        context_hits += any(
+            is_relevant(document, query) for document in chain.last_documents
+        )
+
+    histograms = registry.snapshot()["histograms"]
+    return {
+        "config": config,
+        "chunks": len(chunks),
+        "index_seconds": index_seconds,
+        "queries": len(queries),
+        "recall_at_k": hits / len(queries) if queries else 0.0,
+        "context_recall": context_hits / len(queries) if queries else 0.0,
+        "latency_ms": percentiles_ms(latencies),
+        "stages_p50_ms": {
+            name.removeprefix("stage."): summary["p50"] * 1000
+            for name, summary in histograms.items()
+            if name.startswith("stage.") and "p50" in summary
+        },
+        "context_tokens_mean": histograms.get("tokens.context", {}).get("mean", 0.0),
+        "quality": lexical_quality(
+            [query["answer"] for query in queries], predictions, metrics
+        ),
+    }
+
+
+def config_grid(
+    chunk_sizes: Sequence[int],
+    chunk_overlaps: Sequence[int],
+    ks: Sequence[int],
+    modes: Sequence[str],
+) -> List[Dict[str, Any]]:
+    return [
+        {
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "k": k,
+            "retrieval_mode": mode,
+        }
+        for chunk_size, chunk_overlap, k, mode in itertools.product(
+            chunk_sizes, chunk_overlaps, ks, modes
+        )
+        if chunk_overlap < chunk_size
+    ]
+
+
+def run_benchmark(
+    data_directory: str,
+    grid: List[Dict[str, Any]],
+    sample: Optional[int] = None,
+    seed: int = 0,
+    llm_latency: float = 0.0,
+    metrics: Sequence[str] = ("rouge", "meteor"),
+    query_style: str = "keywords",
+) -> Dict[str, Any]:
+    queries = load_queries(data_directory, sample, seed, query_style)
+    rows = load_rows(data_directory)
+    embeddings = HashingEmbeddings()
+    runs = []
+    for config in grid:
+        run = run_config(rows, queries, config, embeddings, llm_latency, metrics)
+        logging.info(f"Benchmark run {json.dumps(run['config'])} done")
+        runs.append(run)
+    return {
+        "benchmark": "rag_regression",
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": current_commit(),
+        "dataset": {
+            "directory": os.path.relpath(data_directory),
+            "queries": len(queries),
+            "sample": sample,
+            "seed": seed,
+            "query_style": query_style,
+        },
+        "llm_latency_ms": llm_latency * 1000,
+        "runs": runs,
+    }
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def config_key(config: Dict[str, Any]) -> str:
+    return json.dumps(config, sort_keys=True)
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    recall_tolerance: float = 0.01,
+    latency_tolerance: float = 0.25,
+    quality_tolerance: float = 0.01,
+) -> List[str]:
+    """
+    Regressions of `current` against `baseline`, for the configurations both
+    ran: recall or answer quality lower by more than the tolerance, or p90
+    latency higher by more than `latency_tolerance` (a fraction).
+    """
+    previous = {config_key(run["config"]): run for run in baseline["runs"]}
+    regressions = []
+    for run in current["runs"]:
+        before = previous.get(config_key(run["config"]))
+        if before is None:
+            continue
+        name = config_key(run["config"])
+        for metric in ("recall_at_k", "context_recall"):
+            if run[metric] < before[metric] - recall_tolerance:
+                regressions.append(
+                    f"{name}: {metric} {before[metric]:.3f} -> {run[metric]:.3f}"
+                )
+        for metric, value in run["quality"].items():
+            if metric in before["quality"] and (
+                value < before["quality"][metric] - quality_tolerance
+            ):
+                regressions.append(
+                    f"{name}: {metric} {before['quality'][metric]:.3f} -> {value:.3f}"
+                )
+        p90, before_p90 = run["latency_ms"]["p90"], before["latency_ms"]["p90"]
+        if p90 > before_p90 * (1 + latency_tolerance):
+            regressions.append(
+                f"{name}: p90 latency {before_p90:.2f} ms -> {p90:.2f} ms"
+            )
+    return regressions
+
+
+def int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def str_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    conf = load_config()
+    parser = argparse.ArgumentParser(description="End-to-end RAG benchmark.")
+    parser.add_argument("--data", default=DATA_DIR, help="directory of csv files")
+    parser.add_argument(
+        "--chunk-size", type=int_list, default=[conf.getint("chunk_size")]
+    )
+    parser.add_argument(
+        "--chunk-overlap", type=int_list, default=[conf.getint("chunk_overlap")]
+    )
+    parser.add_argument(
+        "--k", type=int_list, default=[conf.getint("documents_return_count")]
+    )
+    parser.add_argument(
+        "--mode", type=str_list, default=[conf.get("retrieval_mode", "hybrid")]
+    )
+    parser.add_argument("--sample", type=int, default=None, help="queries to ask")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--queries",
+        choices=["keywords", "verbatim"],
+        default="keywords",
+        help="ask seeded keywords from each question, or the question itself",
+    )
+    parser.add_argument(
+        "--llm-latency-ms",
+        type=float,
+        default=0.0,
+        help="simulated LLM time per answer",
+    )
+    parser.add_argument("--metrics", type=str_list, default=["rouge", "meteor"])
+    parser.add_argument("--output", default=None, help="default: benchmarks/results/")
+    parser.add_argument(
+        "--baseline", default=None, help="earlier results to check for regressions"
+    )
+    parser.add_argument("--latency-tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    grid = config_grid(args.chunk_size, args.chunk_overlap, args.k, args.mode)
+    results = run_benchmark(
+        args.data,
+        grid,
+        sample=args.sample,
+        seed=args.seed,
+        llm_latency=args.llm_latency_ms / 1000,
+        metrics=args.metrics,
+        query_style=args.queries,
+    )
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"rag_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    for run in results["runs"]:
+        quality = ", ".join(f"{k} {v:.3f}" for k, v in run["quality"].items())
+        rprint(
+            f"[bold]{config_key(run['config'])}[/bold]\n"
+            f"  recall@k {run['recall_at_k']:.3f}, context recall "
+            f"{run['context_recall']:.3f}, {quality}\n"
+            f"  latency p50 {run['latency_ms']['p50']:.2f} ms, "
+            f"p90 {run['latency_ms']['p90']:.2f} ms, p99 {run['latency_ms']['p99']:.2f} ms"
+        )
+    rprint(f"results: {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(
+            baseline, results, latency_tolerance=args.latency_tolerance
+        )
+        for regression in regressions:
+            rprint(f"[red]regression[/red] {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
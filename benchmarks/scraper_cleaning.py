@@ -0,0 +1,119 @@
+################################################################
+# Per-page CPU time of page cleaning: the previous three find_all passes
+# against the single-pass cleaner, on the saved fixture pages.
+#
+#   python -m benchmarks.scraper_cleaning [--repeat N] [--scale N]
+################################################################
+
+import argparse
+import glob
+import os
+import re
+import time
+
+from bs4 import BeautifulSoup
+from rich import print as rprint
+
+from pipeline.webscraper.cleaner import extract_page_text, parse_page
+
+PAGES = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures", "pages")
+
+
+def legacy_extract(markup):
+    """The extraction as it was before the single-pass cleaner."""
+
+    def is_navigation_or_footer_element(tag):
+        common_navigation_classes = ["navbar", "nav", "menu", "navigation", "header"]
+        common_footer_classes = ["footer", "footer-wrapper", "footer-container"]
+        return (
+            tag.name == "nav"
+            or tag.has_attr("class")
+            and any(cls in tag["class"] for cls in common_navigation_classes)
+            or tag.name == "footer"
+            or tag.has_attr("class")
+            and any(cls in tag["class"] for cls in common_footer_classes)
+        )
+
+    def exclude_button_text(tag):
+        if tag.name != "button" and (
+            not tag.has_attr("class") or "button" not in tag["class"]
+        ):
+            return tag
+        tag.string = ""
+        return tag
+
+    def exclude_anchor_text(tag):
+        if tag.name != "a":
+            return tag
+        tag.string = ""
+        return tag
+
+    soup = BeautifulSoup(markup, "html.parser")
+    for elem in soup.find_all(is_navigation_or_footer_element):
+        elem.extract()
+    for button in soup.find_all(
+        lambda tag: tag.name != "button"
+        and (not tag.has_attr("class") or "button" not in tag["class"])
+    ):
+        exclude_button_text(button)
+    for anchor in soup.find_all(exclude_anchor_text):
+        exclude_anchor_text(anchor)
+
+    text = soup.get_text(separator="\n", strip=True).lower()
+    text = "\n".join(
+        line
+        for line in text.splitlines()
+        if not (line.lower().startswith("loading...") or line.lower() == "site search")
+    )
+    return re.sub(r"\|.*?\|", "", text)
+
+
+def cpu_time(func, markup, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        result = func(markup)
+    return (time.process_time() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--scale", type=int, default=20, help="repeat each page body N times"
+    )
+    args = parser.parse_args()
+
+    candidates = {
+        "single pass": lambda markup: extract_page_text(markup),
+        "single pass + lxml": lambda markup: extract_page_text(
+            parse_page(markup, "lxml")
+        ),
+    }
+
+    for page in sorted(glob.glob(os.path.join(PAGES, "*.html"))):
+        with open(page, "rb") as f:
+            markup = f.read()
+        # make fixture pages closer to real page sizes
+        head, _, body = markup.partition(b"<body>")
+        markup = head + b"<body>" + body * args.scale
+
+        parse, _ = cpu_time(
+            lambda markup: BeautifulSoup(markup, "html.parser"), markup, args.repeat
+        )
+        legacy, expected = cpu_time(legacy_extract, markup, args.repeat)
+        rprint(f"[bold]{os.path.basename(page)}[/bold] ({len(markup) // 1024} KiB)")
+        rprint(
+            f"  three passes        : {legacy * 1000:8.2f} ms/page, "
+            f"{(legacy - parse) * 1000:8.2f} ms cleaning after html.parser"
+        )
+        for name, func in candidates.items():
+            elapsed, result = cpu_time(func, markup, args.repeat)
+            same = "identical" if result == expected else "differs"
+            rprint(
+                f"  {name:<20}: {elapsed * 1000:8.2f} ms/page "
+                f"({(1 - elapsed / legacy) * 100:5.1f}% saved, {same})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+from .query_embeddings import CachedQueryEmbeddings
+from .response_cache import ResponseCache, normalize_query
+from .single_flight import SingleFlight
+from .ttl_lru import TTLCache
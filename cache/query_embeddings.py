@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+
+from langchain_core.embeddings import Embeddings
+
+from cache.response_cache import normalize_query
+from cache.ttl_lru import TTLCache
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps an `Embeddings` client with an LRU/TTL cache of query embeddings,
+    keyed on the normalized query, so "Fees?" and "fees" are embedded once.
+
+    On the event loop, cache misses arriving within `batch_window` seconds of
+    each other are embedded together in one request of up to `max_batch_size`
+    queries. Documents are passed straight through.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        maxsize: int = 4096,
+        ttl: float = 86400,
+        batch_window: float = 0.005,
+        max_batch_size: int = 64,
+    ):
+        self.embeddings = embeddings
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.batched_queries = 0
+        # queries waiting for the next batch, and futures of every query not
+        # embedded yet, so identical queries never wait for two requests
+        self._batch: Dict[str, str] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # the loop only keeps weak references to tasks, so hold the batches here
+        self._tasks: Set[asyncio.Task] = set()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vector = self.cache.get(key)
+        if vector is not None:
+            return vector
+
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            # nobody may be left to see the error once every caller gave up
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._batch[key] = text
+            if len(self._batch) >= self.max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        # one caller giving up must not fail the others waiting for the batch
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, {}
+        if batch:
+            task = asyncio.ensure_future(self._embed_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed_batch(self, batch: Dict[str, str]) -> None:
+        futures = [self._pending[key] for key in batch]
+        error: BaseException = RuntimeError(
+            "Embedding response does not match the request"
+        )
+        try:
+            vectors = await self.embeddings.aembed_documents(list(batch.values()))
+            for key, future, vector in zip(batch, futures, vectors):
+                self.cache.set(key, vector)
+                if not future.done():
+                    future.set_result(vector)
+        except asyncio.CancelledError as e:
+            error = e
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            # every waiter gets an outcome, whatever ended the request
+            for future in futures:
+                if future.done():
+                    continue
+                if isinstance(error, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(error)
+            for key in batch:
+                self._pending.pop(key, None)
+            self.batches += 1
+            self.batched_queries += len(batch)
+            logging.debug(f"Embedded {len(batch)} queries in one request")
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "batches": self.batches,
+            "average_batch_size": (
+                self.batched_queries / self.batches if self.batches else 0.0
+            ),
+        }
@@ -0,0 +1,169 @@
+import logging
+import re
+import string
+import threading
+import time
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from cache.ttl_lru import TTLCache
+
+_PUNCTUATION = re.compile(f"[{re.escape(string.punctuation)}]")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(_PUNCTUATION.sub(" ", query.lower()).split())
+
+
+class ResponseCache:
+    """
+    Two-level answer cache: an exact match on the normalized query, then a
+    semantic match on query embeddings within `threshold` cosine similarity.
+
+    Entries expire after `ttl` seconds, the least recently used entry is evicted
+    beyond `maxsize`, and everything is dropped when `fingerprint()` changes.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 86400,
+        threshold: float = 0.95,
+        fingerprint: Optional[Callable[[], str]] = None,
+        check_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.threshold = threshold
+        self.fingerprint = fingerprint
+        self.check_interval = check_interval
+        self.clock = clock
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._entries = TTLCache(maxsize, ttl, clock=clock, on_evict=self._release)
+        self._lock = threading.RLock()
+        self._vectors: Optional[np.ndarray] = None
+        self._keys: List[Optional[str]] = [None] * maxsize
+        self._free = list(range(maxsize - 1, -1, -1))
+        self._version = fingerprint() if fingerprint else None
+        self._checked_at = clock()
+
+    def _release(self, key: str, entry: tuple) -> None:
+        slot = entry[1]
+        if slot is not None:
+            self._keys[slot] = None
+            self._free.append(slot)
+
+    def _check_corpus(self) -> None:
+        if (
+            self.fingerprint is None
+            or self.clock() - self._checked_at < self.check_interval
+        ):
+            return
+        self._checked_at = self.clock()
+        version = self.fingerprint()
+        if version != self._version:
+            logging.info("Knowledge base changed, clearing response cache")
+            self._version = version
+            self.invalidations += 1
+            self._entries.clear()
+
+    def _semantic_lookup(self, vector: np.ndarray) -> Optional[str]:
+        if self._vectors is None or not len(self._entries):
+            return None
+        scores = self._vectors @ vector
+        valid = np.fromiter((key is not None for key in self._keys), dtype=bool)
+        scores[~valid] = -np.inf
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        key = self._keys[best]
+        if key not in self._entries:  # expired since it was stored
+            return None
+        self._entries.touch(key)
+        return key
+
+    def get_exact(self, query: str) -> Optional[str]:
+        """Exact lookup on the normalized query; a miss is not counted."""
+        with self._lock:
+            self._check_corpus()
+            entry = self._entries.get(normalize_query(query))
+            if entry is None:
+                return None
+            self.exact_hits += 1
+            return entry[0]
+
+    def get_similar(self, query: str, embedding: Sequence[float]) -> Optional[str]:
+        """Semantic lookup, for when `get_exact` has already missed."""
+        with self._lock:
+            self._check_corpus()
+            match = self._semantic_lookup(self._unit(embedding))
+            if match is None:
+                self.misses += 1
+                return None
+            self.semantic_hits += 1
+            return self._entries.get(match)[0]
+
+    def get(
+        self, query: str, embedding: Optional[Sequence[float]] = None
+    ) -> Optional[str]:
+        answer = self.get_exact(query)
+        if answer is not None:
+            return answer
+        if embedding is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return self.get_similar(query, embedding)
+
+    def put(
+        self, query: str, answer: str, embedding: Optional[Sequence[float]] = None
+    ) -> None:
+        key = normalize_query(query)
+        with self._lock:
+            self._check_corpus()
+            self._entries.pop(key)
+
+            slot = None
+            if embedding is not None:
+                vector = self._unit(embedding)
+                if self._vectors is None:
+                    self._vectors = np.zeros(
+                        (len(self._keys), len(vector)), dtype=np.float32
+                    )
+                if not self._free:  # make room before taking a slot
+                    self._entries.evict_oldest()
+                slot = self._free.pop()
+                self._vectors[slot] = vector
+                self._keys[slot] = key
+
+            self._entries.set(key, (answer, slot))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self._entries.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": (
+                    (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0
+                ),
+            }
+
+    @staticmethod
+    def _unit(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _Flight:
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution, whose
+    result or exception every caller receives. `run` is for threads and `arun`
+    for coroutines.
+
+    Per-key counts of calls and executions are kept for the `max_keys` most
+    recently used keys; the difference is the number of calls saved.
+    """
+
+    def __init__(self, max_keys: int = 1024):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._keys: "OrderedDict[Hashable, List[int]]" = OrderedDict()
+        self.calls = 0
+        self.executions = 0
+
+    def _record(self, key: Hashable, leader: bool) -> None:
+        counts = self._keys.pop(key, None) or [0, 0]
+        counts[0] += 1
+        counts[1] += leader
+        self._keys[key] = counts
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+        self.calls += 1
+        self.executions += leader
+
+    def run(self, key: Hashable, func: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._record(key, leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def arun(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(asyncio.ensure_future(func()))
+                flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            flight.waiters += 1
+            self._record(key, leader)
+
+        try:
+            # one caller giving up must not cancel the work the others wait for
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()  # nobody is waiting anymore
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def key_stats(self, key: Hashable) -> Dict[str, int]:
+        with self._lock:
+            calls, executions = self._keys.get(key, (0, 0))
+        return {"calls": calls, "executions": executions, "saved": calls - executions}
+
+    def stats(self, top: int = 5) -> dict:
+        """Totals, plus the `top` keys that saved the most calls."""
+        with self._lock:
+            busiest = sorted(
+                self._keys.items(), key=lambda item: item[1][1] - item[1][0]
+            )[:top]
+            return {
+                "in_flight": len(self._calls) + len(self._flights),
+                "calls": self.calls,
+                "executions": self.executions,
+                "saved": self.calls - self.executions,
+                "top_keys": {
+                    key: {"calls": calls, "saved": calls - executions}
+                    for key, (calls, executions) in busiest
+                    if calls > executions
+                },
+            }
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe mapping with a size bound (least recently used entries are
+    evicted first) and a per-entry time to live.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        clock: Callable[[], float] = time.monotonic,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def _lookup(self, key: Hashable) -> Optional[tuple]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if self.clock() - item[1] > self.ttl:
+            self._remove(key)
+            return None
+        return item
+
+    def _remove(self, key: Hashable) -> None:
+        value, _ = self._data.pop(key)
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._lookup(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def touch(self, key: Hashable) -> None:
+        """Mark `key` as recently used without counting a hit."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, self.clock())
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._lookup(key)
+            if item is None:
+                return default
+            self._remove(key)
+            return item[0]
+
+    def evict_oldest(self) -> None:
+        with self._lock:
+            if self._data:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._data):
+                self._remove(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -1,6 +1,11 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from pathlib import Path
 from typing import Optional
 
@@ -16,33 +21,123 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Logging configuration
 ################################################################
 
+LOG_DIR = "logs"
 
-def setup_logger(log_directory, enable_console=False):
 
-    class CustomFormatter(logging.Formatter):
-        def formatTime(self, record, datefmt=None):
-            return datetime.fromtimestamp(record.created).strftime("%b %d %I:%M:%S %p")
+class _TextFormatter(logging.Formatter):
+    def formatTime(self, record, datefmt=None):
+        return datetime.fromtimestamp(record.created).strftime("%b %d %I:%M:%S %p")
 
-    if not os.path.exists(log_directory):
-        os.makedirs(log_directory)
 
-    log_file = os.path.join(log_directory, os.getenv("LOG_FILE", "default.log"))
+class _JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers and `jq`."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class _RotatingFileHandler(TimedRotatingFileHandler):
+    """
+    Rotates at the `when` interval and whenever the file would exceed
+    `max_bytes`; size rotations within one interval get numbered names.
+    """
+
+    def __init__(self, filename, max_bytes=0, **kwargs):
+        super().__init__(filename, delay=True, encoding="utf-8", **kwargs)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        if not self.max_bytes:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        return self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes
+
+    def rotation_filename(self, default_name):
+        name, index = super().rotation_filename(default_name), 1
+        candidate = name
+        while os.path.exists(candidate):
+            candidate, index = f"{name}.{index}", index + 1
+        return candidate
+
+
+_log_listener: Optional[QueueListener] = None
+_log_lock = threading.Lock()
 
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(
-        CustomFormatter("%(asctime)s - %(levelname)s - %(message)s")
-    )
 
-    logging.basicConfig(level=logging.INFO, handlers=[file_handler])
+def _stop_listener(listener: QueueListener) -> None:
+    if listener._thread is not None:
+        listener.stop()
 
-    if enable_console:
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(
-            CustomFormatter("%(asctime)s - %(levelname)s - %(message)s")
+
+def setup_logger(log_directory=LOG_DIR, enable_console=False):
+    """
+    Configure logging for the process, once; later calls only add the console
+    handler if asked for. Records go through a queue to a background thread
+    that writes them, so logging never waits on the disk.
+
+    Environment: LOG_FILE, LOG_FORMAT (text | json), LOG_MAX_BYTES,
+    LOG_ROTATE_WHEN (a TimedRotatingFileHandler interval) and LOG_BACKUP_COUNT.
+    """
+    global _log_listener
+
+    formatter = (
+        _JsonFormatter()
+        if os.getenv("LOG_FORMAT", "text") == "json"
+        else _TextFormatter("%(asctime)s - %(levelname)s - %(message)s")
+    )
+
+    def console_handler():
+        handler = logging.StreamHandler()
+        handler.setLevel(logging.INFO)
+        handler.setFormatter(formatter)
+        return handler
+
+    with _log_lock:
+        if _log_listener is not None:
+            handlers = _log_listener.handlers
+            if enable_console and not any(
+                type(handler) is logging.StreamHandler for handler in handlers
+            ):
+                _log_listener.handlers = (*handlers, console_handler())
+            return
+
+        os.makedirs(log_directory, exist_ok=True)
+        log_file = os.path.join(log_directory, os.getenv("LOG_FILE", "default.log"))
+
+        file_handler = _RotatingFileHandler(
+            log_file,
+            max_bytes=int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+            when=os.getenv("LOG_ROTATE_WHEN", "midnight"),
+            backupCount=int(os.getenv("LOG_BACKUP_COUNT", 7)),
         )
-        logging.getLogger().addHandler(console_handler)
+        file_handler.setLevel(logging.INFO)
+        file_handler.setFormatter(formatter)
+
+        handlers = [file_handler]
+        if enable_console:
+            handlers.append(console_handler())
+
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        _log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _log_listener.start()
+        # flush what is still queued when the process exits
+        atexit.register(_stop_listener, _log_listener)
+
+        root = logging.getLogger()
+        root.setLevel(logging.INFO)
+        root.addHandler(QueueHandler(log_queue))
 
 
 ################################################################
@@ -56,10 +151,19 @@ WEBDATA_DIR = os.path.join(BASE_DIR, "data", "raw")
 PDFDATA_DIR = os.path.join(BASE_DIR, "data", "raw")
 PREDATA_DIR = os.path.join(BASE_DIR, "data", "preprocessed")
 LANGUAGES_FILE = os.path.join(BASE_DIR, "translator", "languages.json")
+CACHE_DIR = os.path.join(BASE_DIR, "data", "cache")
+EMBEDDING_CACHE_FILE = os.path.join(CACHE_DIR, "embeddings.sqlite3")
+INGEST_MANIFEST_FILE = os.path.join(CACHE_DIR, "manifest.json")
+CHUNK_CACHE_DIR = os.path.join(CACHE_DIR, "chunks")
+QA_JOURNAL_FILE = os.path.join(CACHE_DIR, "qa_journal.jsonl")
+HTTP_CACHE_FILE = os.path.join(CACHE_DIR, "http_cache.json")
+TRANSLATION_CACHE_FILE = os.path.join(CACHE_DIR, "translations.sqlite3")
+INDEX_ARTIFACT_DIR = os.path.join(BASE_DIR, "data", "index")
+FAQ_INDEX_DIR = os.path.join(BASE_DIR, "data", "faq")
 
 URLS_FILE = os.path.join(BASE_DIR, "urls.txt")
 PDF_DOC = "files"
-LOG_DIR = "logs"
+METRICS_FILE = os.path.join(LOG_DIR, "metrics.json")
 
 # Static files
 LOGO_URL = os.path.join(BASE_DIR, "static", "images", "logo.jpg")
@@ -73,6 +177,9 @@ DEFAULT_MESSAGE = (
     "Hello, how may i help you?"  # bots welcome message for every new app load
 )
 DEFAULT_SPINNER_MESSAGE = "searching knowledgebase ..."  # create a sense of searching
+DEFAULT_TIMEOUT_MESSAGE = (
+    "Sorry, that took too long, please try again."  # answer after request_timeout
+)
 
 
 @dataclass
@@ -82,4 +189,5 @@ class BotConfig:
     emoji: Optional[str] = "🤖"  # bot emoji used - https://emojicopy.com/
     welcome_message: Optional[str] = DEFAULT_MESSAGE
     spinner_message: Optional[str] = DEFAULT_SPINNER_MESSAGE
+    timeout_message: Optional[str] = DEFAULT_TIMEOUT_MESSAGE
     console_name: str = "Stirling Bot"
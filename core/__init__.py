@@ -0,0 +1,4 @@
+from .context import AppContext, get_app_context, load_config
+from .packing import pack_context
+from .query import answer_query, answer_query_async
+from .runtime import EventLoopThread, get_event_loop_thread
@@ -0,0 +1,250 @@
+import logging
+import os
+import threading
+import time
+from configparser import ConfigParser, SectionProxy
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Union
+
+import httpx
+from dotenv import load_dotenv
+from langchain.chains.question_answering import load_qa_chain
+from langchain_community.vectorstores import Pinecone as lgPinecone
+from langchain_openai import OpenAI, OpenAIEmbeddings
+from pinecone import Pinecone
+
+from cache import CachedQueryEmbeddings, ResponseCache, SingleFlight
+from config.settings import FAQ_INDEX_DIR, INDEX_ARTIFACT_DIR
+from translator import Translator, get_language_detector, get_translator
+from utils.metrics import get_registry
+from vectorstore import (
+    ArtifactIndex,
+    FaqIndex,
+    HybridRetriever,
+    LatestFaqIndex,
+    latest_version,
+    load_cross_encoder,
+)
+
+
+def load_config(path: str = "config.ini") -> SectionProxy:
+    config = ConfigParser()
+    config.read(path)
+    return config["DEFAULT"]
+
+
+def get_openai_embeddings(
+    http_client: Optional[httpx.Client] = None,
+    http_async_client: Optional[httpx.AsyncClient] = None,
+):
+    embeddings = OpenAIEmbeddings(
+        openai_api_key=os.environ["OPENAI_API_KEY"],
+        http_client=http_client,
+        http_async_client=http_async_client,
+    )
+    return embeddings
+
+
+def build_retriever(
+    conf: SectionProxy, documents_search: Any, embeddings: Any
+) -> HybridRetriever:
+    if conf.get("retrieval_mode", "hybrid") != "hybrid":
+        return HybridRetriever(documents_search)
+
+    # the keyword index ships in the index artifact, whichever backend holds the vectors
+    keyword_store = documents_search
+    if not isinstance(documents_search, ArtifactIndex):
+        if latest_version(INDEX_ARTIFACT_DIR) is None:
+            logging.warning("No index artifact for keyword search, using vectors only")
+            keyword_store = None
+        else:
+            keyword_store = ArtifactIndex(INDEX_ARTIFACT_DIR, embeddings)
+
+    rerank_model = conf.get("rerank_model", "")
+    return HybridRetriever(
+        documents_search,
+        keyword_store,
+        candidates=conf.getint("retrieval_candidates", 20),
+        rrf_k=conf.getint("rrf_k", 60),
+        reranker=load_cross_encoder(rerank_model) if rerank_model else None,
+    )
+
+
+def serving_version(retriever: HybridRetriever) -> str:
+    """
+    Version of the index artifact the retriever serves from, which keys the
+    response cache. Pinecone has no version of its own, but ingest only
+    publishes an artifact once pinecone holds its vectors.
+    """
+    for store in (retriever.vector_store, retriever.keyword_store):
+        if isinstance(store, ArtifactIndex):
+            return store.version
+    return latest_version(INDEX_ARTIFACT_DIR) or ""
+
+
+class AppContext:
+    """
+    Everything a request needs that is expensive to create: the embeddings
+    client, the vector store and the retriever over it, the QA chain, the
+    response cache, the coalescing of identical in-flight queries, the
+    translator for non-English queries (None answers every query as English)
+    and the precomputed FAQ answers.
+
+    Build it once per process with `get_app_context()`; constructing it directly
+    lets tests and benchmarks plug in their own components.
+    """
+
+    def __init__(
+        self,
+        conf: SectionProxy,
+        embeddings: Any,
+        documents_search: Any,
+        chain: Any,
+        response_cache: ResponseCache,
+        retriever: Optional[HybridRetriever] = None,
+        translator: Optional[Translator] = None,
+        faq_index: Optional[Union[FaqIndex, LatestFaqIndex]] = None,
+    ):
+        self.conf = conf
+        self.embeddings = embeddings
+        self.documents_search = documents_search
+        self.chain = chain
+        self.response_cache = response_cache
+        self.retriever = retriever or HybridRetriever(documents_search)
+        self.translator = translator
+        self._faq_index = faq_index
+        self.single_flight = SingleFlight()
+        self.startup_timings: Dict[str, float] = {}
+
+        # cache hit rates and coalescing counts, read whenever metrics are exported
+        registry = get_registry()
+        registry.register_source("response_cache", response_cache.stats)
+        registry.register_source("language_detection", get_language_detector().stats)
+        registry.register_source("single_flight", self.single_flight.stats)
+        if isinstance(embeddings, CachedQueryEmbeddings):
+            registry.register_source("query_embedding_cache", embeddings.stats)
+        if translator is not None:
+            registry.register_source("translation", translator.stats)
+
+    @property
+    def faq_index(self) -> Optional[FaqIndex]:
+        """The FAQ index to answer from, the latest published one if it reloads."""
+        if isinstance(self._faq_index, LatestFaqIndex):
+            return self._faq_index.index
+        return self._faq_index
+
+    @classmethod
+    def build(cls, conf: Optional[SectionProxy] = None) -> "AppContext":
+        """
+        Open the latest index artifact written by `ingest.py`; nothing is
+        scraped, split or embedded here.
+        """
+        conf = conf if conf is not None else load_config()
+        timings: Dict[str, float] = {}
+
+        @contextmanager
+        def phase(name: str) -> Iterator[None]:
+            start_time = time.perf_counter()
+            yield
+            timings[name] = time.perf_counter() - start_time
+            logging.info(f"Startup phase {name}: {timings[name]:.4f} sec.")
+
+        # load environment variables
+        load_dotenv()
+
+        # one connection pool per process, shared by the embeddings and LLM clients
+        limits = httpx.Limits(
+            max_connections=conf.getint("http_max_connections", 100),
+            max_keepalive_connections=conf.getint("http_max_connections", 100),
+        )
+        timeout = httpx.Timeout(conf.getfloat("request_timeout", 60), connect=10.0)
+        http_client = httpx.Client(limits=limits, timeout=timeout)
+        http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+        with phase("embeddings_client"):
+            # repeated queries are embedded once, concurrent ones in one request
+            embeddings = CachedQueryEmbeddings(
+                get_openai_embeddings(http_client, http_async_client),
+                maxsize=conf.getint("query_embedding_cache_size", 4096),
+                ttl=conf.getfloat("query_embedding_cache_ttl", 86400),
+                batch_window=conf.getfloat("query_embedding_batch_ms", 5) / 1000,
+                max_batch_size=conf.getint("query_embedding_batch_size", 64),
+            )
+
+        with phase("vector_store"):
+            if conf["vector_backend"] == "local":
+                # memory-mapped, and swapped in place when ingest publishes a new version
+                documents_search = ArtifactIndex(
+                    INDEX_ARTIFACT_DIR,
+                    embeddings,
+                    nprobe=int(conf["local_index_nprobe"]),
+                )
+            else:
+                pc: Pinecone = Pinecone(api_key=os.environ["PINECONE_API_KEY"])
+                documents_search = lgPinecone(
+                    pc.Index(os.environ["INDEX_NAME"]), embeddings, "text"
+                )
+
+        with phase("language_profiles"):
+            get_language_detector()
+
+        with phase("translator"):
+            translator = (
+                get_translator(http_client)
+                if conf.get("translation_backend", "openai") != "none"
+                else None
+            )
+
+        with phase("faq_index"):
+            # swapped in place when ingest publishes a new version, like the artifact
+            faq_index = LatestFaqIndex(FAQ_INDEX_DIR)
+
+        with phase("retriever"):
+            retriever = build_retriever(conf, documents_search, embeddings)
+
+        with phase("qa_chain"):
+            llm = OpenAI(
+                temperature=os.environ["TEMPERATURE"],
+                openai_api_key=os.environ["OPENAI_API_KEY"],
+                streaming=True,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+            chain = load_qa_chain(llm, chain_type="stuff")
+
+        # cached answers are only valid for the index they were computed against,
+        # so the key follows the version actually served rather than LATEST
+        response_cache = ResponseCache(
+            maxsize=int(conf["response_cache_size"]),
+            ttl=float(conf["response_cache_ttl"]),
+            threshold=float(conf["response_cache_threshold"]),
+            fingerprint=lambda: serving_version(retriever),
+        )
+
+        context = cls(
+            conf,
+            embeddings,
+            documents_search,
+            chain,
+            response_cache,
+            retriever,
+            translator,
+            faq_index,
+        )
+        context.startup_timings = timings
+        logging.info(f"Application context ready in {sum(timings.values()):.4f} sec.")
+        return context
+
+
+_context: Optional[AppContext] = None
+_context_lock = threading.Lock()
+
+
+def get_app_context() -> AppContext:
+    """The process-wide `AppContext`, built on first use."""
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = AppContext.build()
+    return _context
@@ -0,0 +1,99 @@
+import re
+from typing import FrozenSet, List, Tuple
+
+from langchain_core.documents import Document
+
+from utils.tokens import DEFAULT_MODEL, get_token_counter
+from vectorstore import tokenize
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+# chunks of the csv knowledge base are "question: ...\nanswer: ..." rows
+ROW_BOUNDARY = re.compile(r"\n(?=question: )")
+
+
+def shingles(text: str, size: int = 3) -> FrozenSet[Tuple[str, ...]]:
+    tokens = tokenize(text)
+    if len(tokens) < size:
+        return frozenset([tuple(tokens)])
+    return frozenset(tuple(tokens[i : i + size]) for i in range(len(tokens) - size + 1))
+
+
+def jaccard(a: FrozenSet, b: FrozenSet) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def trim_to_relevant(
+    query: str, text: str, max_tokens: int, model: str = DEFAULT_MODEL
+) -> str:
+    """
+    Keep the question/answer rows of `text` (sentences, for rows that are too
+    long or text without rows) that share the most terms with `query`, in their
+    original order, within `max_tokens`. Parts sharing no term are dropped
+    unless nothing matches at all.
+    """
+    count = get_token_counter(model)
+    if count(text) <= max_tokens:
+        return text
+
+    parts: List[str] = []
+    for row in ROW_BOUNDARY.split(text):
+        if count(row) <= max_tokens and row.strip():
+            parts.append(row)
+        else:
+            parts.extend(s for s in SENTENCE_BOUNDARY.split(row) if s.strip())
+
+    query_terms = set(tokenize(query))
+    overlap = [len(query_terms.intersection(tokenize(part))) for part in parts]
+    ranked = sorted(range(len(parts)), key=lambda i: (-overlap[i], i))
+    if any(overlap):
+        ranked = [i for i in ranked if overlap[i]]
+
+    kept, used = [], 0
+    for i in ranked:
+        tokens = count(parts[i]) + 1
+        if used + tokens <= max_tokens:
+            kept.append(i)
+            used += tokens
+    return "\n".join(parts[i] for i in sorted(kept))
+
+
+def pack_context(
+    query: str,
+    documents: List[Document],
+    token_budget: int,
+    chunk_max_tokens: int,
+    dedup_threshold: float = 0.8,
+    model: str = DEFAULT_MODEL,
+) -> Tuple[List[Document], int]:
+    """
+    Select `documents` in retrieval order until `token_budget` is spent,
+    skipping near-duplicates of chunks already selected and trimming each one
+    to its sentences most relevant to `query`.
+
+    Returns the packed documents and the number of context tokens they hold.
+    """
+    count = get_token_counter(model)
+    packed: List[Document] = []
+    seen: List[FrozenSet] = []
+    used = 0
+
+    for doc in documents:
+        remaining = token_budget - used
+        if remaining <= 0:
+            break
+
+        fingerprint = shingles(doc.page_content)
+        if any(jaccard(fingerprint, other) >= dedup_threshold for other in seen):
+            continue
+        seen.append(fingerprint)
+
+        text = trim_to_relevant(
+            query, doc.page_content, min(chunk_max_tokens, remaining), model
+        )
+        if not text:
+            continue
+        tokens = count(text)
+        packed.append(Document(page_content=text, metadata=dict(doc.metadata)))
+        used += tokens
+
+    return packed, used
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langdetect.lang_detect_exception import LangDetectException
+
+from cache import normalize_query
+from core.context import AppContext
+from core.packing import pack_context
+from translator import ENGLISH, get_language_detector
+from utils import time_execution
+from utils.metrics import get_registry
+from utils.tracing import LLMTraceHandler, span, start_trace
+from vectorstore import FaqIndex
+
+
+def pack_for_prompt(
+    context: AppContext, query: str, documents: List[Document]
+) -> List[Document]:
+    conf = context.conf
+    packed_docs, context_tokens = pack_context(
+        query,
+        documents,
+        token_budget=int(conf.get("context_token_budget", 1500)),
+        chunk_max_tokens=int(conf.get("context_chunk_max_tokens", 400)),
+        dedup_threshold=float(conf.get("context_dedup_threshold", 0.8)),
+    )
+    get_registry().observe("tokens.context", context_tokens)
+    logging.info(
+        f"Context tokens sent: {context_tokens} "
+        f"({len(packed_docs)} of {len(documents)} retrieved chunks)"
+    )
+    return packed_docs
+
+
+def _answer(
+    context: AppContext, query: str, callbacks: Optional[List[Any]] = None
+) -> str:
+    conf, response_cache = context.conf, context.response_cache
+
+    with span("cache_lookup"):
+        cached = response_cache.get_exact(query)
+    if cached is not None:
+        return cached
+
+    # embed once, for both the semantic cache lookup and the retrieval
+    with span("query_embedding"):
+        query_vector = context.embeddings.embed_query(query)
+    with span("cache_lookup"):
+        cached = response_cache.get_similar(query, query_vector)
+    if cached is not None:
+        return cached
+
+    with span("vector_search"):
+        similar_docs = context.retriever.search(
+            query, query_vector, k=int(conf["documents_return_count"])
+        )
+    with span("prompt_build"):
+        packed_docs = pack_for_prompt(context, query, similar_docs)
+    response = context.chain.run(
+        input_documents=packed_docs,
+        question=query,
+        callbacks=[*(callbacks or []), LLMTraceHandler()],
+    ).strip()
+
+    response_cache.put(query, response, query_vector)
+    return response
+
+
+async def _answer_async(
+    context: AppContext, query: str, callbacks: Optional[List[Any]] = None
+) -> str:
+    conf, response_cache = context.conf, context.response_cache
+
+    with span("cache_lookup"):
+        cached = response_cache.get_exact(query)
+    if cached is not None:
+        return cached
+
+    with span("query_embedding"):
+        query_vector = await context.embeddings.aembed_query(query)
+    with span("cache_lookup"):
+        cached = response_cache.get_similar(query, query_vector)
+    if cached is not None:
+        return cached
+
+    with span("vector_search"):
+        similar_docs = await context.retriever.asearch(
+            query, query_vector, k=int(conf["documents_return_count"])
+        )
+    with span("prompt_build"):
+        packed_docs = pack_for_prompt(context, query, similar_docs)
+    response = (
+        await context.chain.arun(
+            input_documents=packed_docs,
+            question=query,
+            callbacks=[*(callbacks or []), LLMTraceHandler()],
+        )
+    ).strip()
+
+    response_cache.put(query, response, query_vector)
+    return response
+
+
+def query_language(context: AppContext, query: str) -> str:
+    """Language the answer is written in; English unless a translator is set."""
+    if context.translator is None:
+        return ENGLISH
+    with span("language_detection"):
+        try:
+            return get_language_detector().detect(query).language
+        except LangDetectException:
+            return ENGLISH
+
+
+def _translate(context: AppContext, text: str, source: str, target: str) -> str:
+    """`text` translated, or unchanged if the translation service fails."""
+    try:
+        return context.translator.translate([text], source, target)[0]
+    except Exception as e:
+        get_registry().increment("translation.failures")
+        logging.warning(f"Translation {source}->{target} failed, serving as is: {e}")
+        return text
+
+
+def _faq_match(
+    context: AppContext,
+    faq_index: FaqIndex,
+    query: str,
+    query_vector: Optional[List[float]],
+) -> Optional[int]:
+    if query_vector is None:
+        return faq_index.match_exact(query)
+    match = faq_index.match(
+        query_vector, float(context.conf.get("faq_match_threshold", 0.95))
+    )
+    if match is not None:
+        logging.info(f"FAQ match: {faq_index.questions[match[0]]!r} ({match[1]:.3f})")
+        return match[0]
+    return None
+
+
+def _faq_answer(
+    faq_index: FaqIndex, row: Optional[int], language: str
+) -> Optional[Tuple[str, str]]:
+    """(answer, its language), preferring one precomputed in `language`."""
+    if row is None:
+        return None
+    get_registry().increment("faq.hits")
+    answer = faq_index.answer(row, language)
+    if answer is not None:
+        return answer, language
+    return faq_index.answer(row), ENGLISH
+
+
+def _lookup_faq(
+    context: AppContext, query: str, language: str
+) -> Optional[Tuple[str, str]]:
+    # one version for the whole lookup, rows are only valid within it
+    faq_index = context.faq_index
+    if faq_index is None:
+        return None
+    with span("faq_lookup"):
+        row = _faq_match(context, faq_index, query, None)
+    if row is None:
+        # the query embedding is cached, so retrieval does not embed it again
+        with span("query_embedding"):
+            query_vector = context.embeddings.embed_query(query)
+        with span("faq_lookup"):
+            row = _faq_match(context, faq_index, query, query_vector)
+    return _faq_answer(faq_index, row, language)
+
+
+async def _lookup_faq_async(
+    context: AppContext, query: str, language: str
+) -> Optional[Tuple[str, str]]:
+    # one version for the whole lookup, rows are only valid within it
+    faq_index = context.faq_index
+    if faq_index is None:
+        return None
+    with span("faq_lookup"):
+        row = _faq_match(context, faq_index, query, None)
+    if row is None:
+        with span("query_embedding"):
+            query_vector = await context.embeddings.aembed_query(query)
+        with span("faq_lookup"):
+            row = _faq_match(context, faq_index, query, query_vector)
+    return _faq_answer(faq_index, row, language)
+
+
+@time_execution
+def answer_query(
+    context: AppContext, query: str, callbacks: Optional[List[Any]] = None
+) -> str:
+    """
+    Answer `query` from the precomputed FAQ answers, the caches, or with
+    retrieval and the QA chain.
+
+    Identical queries, after normalization, that arrive while one is being
+    answered wait for that answer instead of running their own; only the first
+    caller's `callbacks` see the streamed tokens.
+
+    Queries in other languages are answered in English and translated back.
+    They share the English answer cache, and translations are cached too.
+    Their tokens are not streamed, because they would arrive in English.
+    When a translation fails, the query or answer is used untranslated.
+    """
+    with start_trace("answer_query"):
+        language = query_language(context, query)
+        if language != ENGLISH:
+            with span("translation"):
+                query = _translate(context, query, language, ENGLISH)
+            callbacks = None
+
+        faq_answer = _lookup_faq(context, query, language)
+        if faq_answer is not None:
+            response, response_language = faq_answer
+        else:
+            response, response_language = (
+                context.single_flight.run(
+                    normalize_query(query), lambda: _answer(context, query, callbacks)
+                ),
+                ENGLISH,
+            )
+
+        if response_language != language:
+            with span("translation"):
+                response = _translate(context, response, response_language, language)
+        return response
+
+
+async def _answer_localized_async(
+    context: AppContext, query: str, callbacks: Optional[List[Any]] = None
+) -> str:
+    language = query_language(context, query)
+    if language != ENGLISH:
+        with span("translation"):
+            query = await asyncio.to_thread(
+                _translate, context, query, language, ENGLISH
+            )
+        callbacks = None
+
+    faq_answer = await _lookup_faq_async(context, query, language)
+    if faq_answer is not None:
+        response, response_language = faq_answer
+    else:
+        response, response_language = (
+            await context.single_flight.arun(
+                normalize_query(query),
+                lambda: _answer_async(context, query, callbacks),
+            ),
+            ENGLISH,
+        )
+
+    if response_language != language:
+        with span("translation"):
+            response = await asyncio.to_thread(
+                _translate, context, response, response_language, language
+            )
+    return response
+
+
+@time_execution
+async def answer_query_async(
+    context: AppContext,
+    query: str,
+    callbacks: Optional[List[Any]] = None,
+    timeout: Optional[float] = None,
+) -> str:
+    """
+    `answer_query` for the event loop: the embedding and LLM requests are
+    awaited on the shared connection pool and retrieval runs in a worker
+    thread, so one process serves many queries at once.
+
+    Identical queries in flight are coalesced and other languages translated
+    as in `answer_query`. Raises `asyncio.TimeoutError` after `timeout`
+    seconds. Cancelling the awaiting task cancels the upstream requests in
+    flight, once no other caller waits for them.
+    """
+    with start_trace("answer_query"):
+        return await asyncio.wait_for(
+            _answer_localized_async(context, query, callbacks), timeout
+        )
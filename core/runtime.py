@@ -0,0 +1,39 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class EventLoopThread:
+    """
+    An asyncio event loop running in a daemon thread, so synchronous callers
+    such as Streamlit sessions can share one loop, and with it one connection
+    pool, for their async work.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="event-loop", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, coroutine: Coroutine[Any, Any, T]) -> "Future[T]":
+        """Schedule `coroutine` on the loop; cancelling the future cancels it."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+
+_loop_thread: Optional[EventLoopThread] = None
+_loop_thread_lock = threading.Lock()
+
+
+def get_event_loop_thread() -> EventLoopThread:
+    """The process-wide `EventLoopThread`, started on first use."""
+    global _loop_thread
+    if _loop_thread is None:
+        with _loop_thread_lock:
+            if _loop_thread is None:
+                _loop_thread = EventLoopThread()
+    return _loop_thread
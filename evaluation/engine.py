@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .metrics import (
+    bertscore_batch,
+    ensure_nltk_data,
+    get_rouge_scorer,
+    meteor_value,
+    rouge_scores,
+)
+
+METRICS = ("rouge", "meteor", "bertscore")
+LEXICAL_METRICS = ("rouge", "meteor")
+DATASET_COLUMNS = ["question", "reference", "prediction"]
+
+
+def _flatten_similar_queries(data: dict) -> List[Dict[str, str]]:
+    # data/data_metrics.json: a reference response per query, and the bot's
+    # responses to paraphrases of that query
+    return [
+        {
+            "question": similar["query"],
+            "reference": entry["response"],
+            "prediction": similar["bot_response"],
+        }
+        for entry in data["queries"]
+        for similar in entry["similar_queries"].values()
+    ]
+
+
+def load_dataset(path: str) -> pd.DataFrame:
+    """
+    Ground-truth pairs from a .csv, .jsonl, .json or .parquet file, with
+    `reference` and `prediction` columns and an optional `question`.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        dataset = pd.read_csv(path, keep_default_na=False)
+    elif extension == ".jsonl":
+        dataset = pd.read_json(path, lines=True)
+    elif extension == ".parquet":
+        dataset = pd.read_parquet(path)
+    elif extension == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        dataset = pd.DataFrame(
+            _flatten_similar_queries(data) if isinstance(data, dict) else data
+        )
+    else:
+        raise ValueError(f"Unsupported dataset format: {path}")
+
+    missing = {"reference", "prediction"} - set(dataset.columns)
+    if missing:
+        raise ValueError(f"Dataset {path} lacks columns: {', '.join(sorted(missing))}")
+    if "question" not in dataset.columns:
+        dataset["question"] = ""
+    return dataset[DATASET_COLUMNS].astype(str).reset_index(drop=True)
+
+
+def _init_worker(metrics: Tuple[str, ...]) -> None:
+    # build the scorers once per worker, before its first pair
+    if "rouge" in metrics:
+        get_rouge_scorer()
+    if "meteor" in metrics:
+        ensure_nltk_data()
+
+
+def _lexical_scores(
+    pair: Tuple[str, str], metrics: Tuple[str, ...]
+) -> Dict[str, float]:
+    reference, prediction = pair
+    scores: Dict[str, float] = {}
+    if "rouge" in metrics:
+        scores.update(rouge_scores(prediction, reference))
+    if "meteor" in metrics:
+        scores["meteor"] = meteor_value(reference, prediction)
+    return scores
+
+
+def score_lexical(
+    references: Sequence[str],
+    predictions: Sequence[str],
+    metrics: Sequence[str] = LEXICAL_METRICS,
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+) -> List[Dict[str, float]]:
+    """
+    ROUGE and METEOR of every pair, spread over `workers` processes (None =
+    one per cpu, 1 = in this process) in tasks of `chunksize` pairs.
+    """
+    metrics = tuple(metric for metric in metrics if metric in LEXICAL_METRICS)
+    pairs = list(zip(references, predictions))
+    if not metrics or not pairs:
+        return [{} for _ in pairs]
+
+    score = partial(_lexical_scores, metrics=metrics)
+    if workers == 1:
+        _init_worker(metrics)
+        return [score(pair) for pair in pairs]
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(metrics,)
+    ) as executor:
+        return list(executor.map(score, pairs, chunksize=chunksize))
+
+
+def evaluate(
+    dataset: pd.DataFrame,
+    metrics: Sequence[str] = METRICS,
+    workers: Optional[int] = None,
+    batch_size: int = 64,
+) -> pd.DataFrame:
+    """
+    `dataset` with a column per score. ROUGE and METEOR run in a process
+    pool; BERTScore runs here, on the whole dataset in batches of `batch_size`
+    pairs, with the model loaded once.
+    """
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(sorted(unknown))}")
+
+    references = dataset["reference"].tolist()
+    predictions = dataset["prediction"].tolist()
+    results = dataset.copy()
+
+    lexical = pd.DataFrame(
+        score_lexical(references, predictions, metrics, workers), index=results.index
+    )
+    results = pd.concat([results, lexical], axis=1)
+
+    if "bertscore" in metrics and len(results):
+        for column, values in bertscore_batch(
+            predictions, references, batch_size
+        ).items():
+            results[column] = values
+
+    logging.info(f"Evaluated {len(results)} pairs on {', '.join(metrics)}")
+    return results
+
+
+def score_columns(results: pd.DataFrame) -> List[str]:
+    return [column for column in results.columns if column not in DATASET_COLUMNS]
+
+
+def summarize(results: pd.DataFrame) -> pd.DataFrame:
+    """Mean, spread and quantiles of every score column."""
+    columns = score_columns(results)
+    if not columns:
+        return pd.DataFrame()
+    summary = results[columns].describe(percentiles=[0.1, 0.5, 0.9]).T
+    return summary.rename(columns={"50%": "median"})
+
+
+def write_results(results: pd.DataFrame, path: str) -> str:
+    """
+    Write the per-pair scores to `path` (.parquet or .csv) and their summary
+    next to it as <name>_summary.csv; returns the summary path.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".parquet"):
+        results.to_parquet(path, index=False)
+    else:
+        results.to_csv(path, index=False)
+
+    summary_path = f"{os.path.splitext(path)[0]}_summary.csv"
+    summarize(results).to_csv(summary_path, index_label="metric")
+    return summary_path
@@ -1,60 +1,67 @@
-from time import sleep
+################################################################
+# Offline evaluation of bot responses against ground-truth answers:
+# ROUGE and METEOR in a process pool, BERTScore in batches, written out as
+# a per-pair results table plus a summary of every score.
+#
+#   python -m evaluation.execute [DATASET] [--output results.csv|.parquet]
+#       [--metrics rouge,meteor,bertscore] [--workers N] [--batch-size N]
+#
+# DATASET is a .csv/.jsonl/.parquet file of question, reference, prediction
+# rows, or a .json file in the format of evaluation/data/data_metrics.json.
+################################################################
+
+import argparse
+import os
+import time
+from typing import List, Optional
 
-from metrics import evaluate_bertscore, evaluate_meteor, evaluate_rouge
 from rich import print as rprint
 
-################################################################
-# ToDo.
-# 1. Load dataset from directory
-# 2. Create Visualizations
+from evaluation.engine import METRICS, evaluate, load_dataset, summarize, write_results
 
-################################################################
+EVALUATION_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATASET = os.path.join(EVALUATION_DIR, "data", "data_metrics.json")
+DEFAULT_OUTPUT = os.path.join(EVALUATION_DIR, "results", "results.csv")
 
-# reference : human-generated sentence, obtained from dataset.
-# llM model should aim to produce this output.
-# Load - from data/groundtruth.txt
-
-ground_truth = "stirling strives to ensure that all students can embrace life as part of its vibrant postgraduate community by offering extensive student support services."
-testdata = [
-    # ground truth, bot response
-    (
-        ground_truth,
-        "Stirling offers a variety of support services for postgraduate students, including academic support, career guidance, counseling services, disability support, and accommodation services. They also have a dedicated student support team to assist with any personal or academic issues that postgraduates may face.",
-    ),
-    (
-        ground_truth,
-        "Stirling strives to ensure that all students can embrace life as part of its vibrant postgraduate community by offering extensive student support services.",
-    ),
-    (
-        ground_truth,
-        "Stirling offers extensive student support services to ensure that all students can embrace life as part of its vibrant postgraduate community.",
-    ),
-    (
-        ground_truth,
-        "Stirling strives to ensure that all students can embrace life as part of its vibrant postgraduate community by offering extensive student support services. These services may include academic support, career guidance, counseling services, and various resources to help postgraduate students succeed in their studies and personal development.",
-    ),
-    (
-        ground_truth,
-        "Stirling strives to ensure that all students can embrace life as part of its vibrant postgraduate community by offering extensive student support services.",
-    ),
-]
 
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Score bot responses.")
+    parser.add_argument("dataset", nargs="?", default=DEFAULT_DATASET)
+    parser.add_argument(
+        "--output",
+        default=DEFAULT_OUTPUT,
+        help="per-pair results, .csv or .parquet; the summary goes next to it",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=",".join(METRICS),
+        help="comma separated subset of: " + ", ".join(METRICS),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="processes for ROUGE and METEOR (default: one per cpu)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=64, help="pairs per BERTScore batch"
+    )
+    args = parser.parse_args(argv)
 
-if __name__ == "__main__":
+    metrics = [metric.strip() for metric in args.metrics.split(",") if metric.strip()]
+    dataset = load_dataset(args.dataset)
 
-    for truth, bot in testdata:
-        rprint(f"[bold]ground-truth [/bold]: {truth}")
-        rprint(f"[bold]bot response [/bold]: {bot}", end="\n\n")
+    start_time = time.perf_counter()
+    results = evaluate(
+        dataset, metrics, workers=args.workers, batch_size=args.batch_size
+    )
+    elapsed = time.perf_counter() - start_time
 
-        # Rouge Metrics.
-        evaluate_rouge(bot, truth)
-        sleep(1)
+    summary_path = write_results(results, args.output)
+    rprint(f"[bold]{len(results)} pairs[/bold] scored in {elapsed:.2f} sec.")
+    rprint(summarize(results).round(4).to_string())
+    rprint(f"results: {args.output}\nsummary: {summary_path}")
 
-        # Meteor Metrics.
-        evaluate_meteor(truth, bot)
-        sleep(1)
 
-        # BertScore Metrics.
-        bot = [bot]
-        truth = [truth]
-        evaluate_bertscore(bot, truth)
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,3 @@
-from metrics.bertscore_metric import evaluate_bertscore
-from metrics.meteor_metric import evaluate_meteor
-from metrics.rouge_metric import evaluate_rouge
+from .bertscore_metric import bertscore_batch, evaluate_bertscore, get_bert_scorer
+from .meteor_metric import ensure_nltk_data, evaluate_meteor, meteor_value
+from .rouge_metric import ROUGE_TYPES, evaluate_rouge, get_rouge_scorer, rouge_scores
@@ -1,10 +1,35 @@
 # https://colab.research.google.com/gist/Abonia1/26c13b7034e85ec1dbe29c2fa0d07242/bertscore-demo.ipynb
 # https://medium.com/@abonia/bertscore-explained-in-5-minutes-0b98553bfb71
 
-from bert_score import score
+from functools import lru_cache
+from typing import Dict, List
+
 from rich import print as rprint
 
 
+@lru_cache
+def get_bert_scorer(lang: str = "en"):
+    """
+    One BERTScore model per process. bert_score and torch are imported here,
+    so processes that only compute ROUGE or METEOR never load them.
+    """
+    from bert_score import BERTScorer
+
+    return BERTScorer(lang=lang)
+
+
+def bertscore_batch(
+    predictions: List[str], references: List[str], batch_size: int = 64
+) -> Dict[str, List[float]]:
+    """BERTScore precision, recall and F1 of every pair, in batches of `batch_size`."""
+    P, R, F1 = get_bert_scorer().score(predictions, references, batch_size=batch_size)
+    return {
+        "bertscore_precision": P.tolist(),
+        "bertscore_recall": R.tolist(),
+        "bertscore_f1": F1.tolist(),
+    }
+
+
 def evaluate_bertscore(predictions, references):
     """
     Calculate and print BERTScore for a list of predicted responses and their corresponding references.
@@ -18,7 +43,7 @@ def evaluate_bertscore(predictions, references):
         raise ValueError("Both predictions and references should be lists of strings.")
 
     # Calculate BERTScore
-    P, R, F1 = score(predictions, references, lang="en", verbose=True)
+    P, R, F1 = get_bert_scorer().score(predictions, references, verbose=True)
 
     # Print the results using rich
     for i, (p, r, f1) in enumerate(zip(P, R, F1)):
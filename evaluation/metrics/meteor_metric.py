@@ -5,7 +5,21 @@ from nltk import word_tokenize
 from nltk.translate import meteor_score as meteor
 from rich import print as rprint
 
-nltk.download("wordnet")
+NLTK_RESOURCES = {"wordnet": "corpora/wordnet", "punkt": "tokenizers/punkt"}
+
+
+def ensure_nltk_data() -> None:
+    """Download the wordnet and punkt data once, not on every import."""
+    for name, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(name, quiet=True)
+
+
+def meteor_value(reference: str, predicted: str) -> float:
+    """METEOR score of `predicted` against `reference`."""
+    return meteor.meteor_score([word_tokenize(reference)], word_tokenize(predicted))
 
 
 def evaluate_meteor(reference, predicted):
@@ -16,7 +30,6 @@ def evaluate_meteor(reference, predicted):
     - reference (str): The reference sentence.
     - candidate (str): The candidate (predicted) sentence.
     """
-    tokenized_reference = word_tokenize(reference)
-    tokenized_candidate = word_tokenize(predicted)
-    score = meteor.meteor_score([tokenized_reference], tokenized_candidate)
+    ensure_nltk_data()
+    score = meteor_value(reference, predicted)
     rprint(f"Meteor Score: {score:.4f}")
@@ -19,9 +19,26 @@
 
 ################################################################################################
 
+from functools import lru_cache
+from typing import Dict
+
 from rich import print as rprint
 from rouge_score import rouge_scorer
 
+ROUGE_TYPES = ["rouge1", "rouge2", "rougeL", "rougeLsum"]
+
+
+@lru_cache
+def get_rouge_scorer() -> rouge_scorer.RougeScorer:
+    """One scorer per process; building it loads the stemmer and tokenizer."""
+    return rouge_scorer.RougeScorer(ROUGE_TYPES, use_stemmer=True)
+
+
+def rouge_scores(prediction: str, ground_truth: str) -> Dict[str, float]:
+    """F-measure of each ROUGE type, keyed by the type."""
+    scores = get_rouge_scorer().score(ground_truth, prediction)
+    return {rouge_type: scores[rouge_type].fmeasure for rouge_type in ROUGE_TYPES}
+
 
 def evaluate_rouge(prediction, ground_truth) -> None:
     """
@@ -31,8 +48,5 @@ def evaluate_rouge(prediction, ground_truth) -> None:
     - prediction (str): The predicted response.
     - ground_truth (str): The ground truth response.
     """
-    scorer = rouge_scorer.RougeScorer(
-        ["rouge1", "rouge2", "rougeL", "rougeLsum"], use_stemmer=True
-    )
-    scores = scorer.score(prediction, ground_truth)
+    scores = get_rouge_scorer().score(ground_truth, prediction)
     rprint(scores)
@@ -0,0 +1,253 @@
+################################################################
+# Offline ingest: extraction, QA generation, CSV loading, chunking and
+# embedding, written out as a versioned index artifact for main.py to serve.
+#
+#   python ingest.py [--pdf] [--urls] [--qa] [--faq] [--keep N] [--full]
+#
+# Every stage is incremental: data/cache/manifest.json records what was
+# processed, so only new or changed sources are worked on again.
+################################################################
+
+import argparse
+import logging
+import os
+from configparser import ConfigParser
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_openai import OpenAIEmbeddings
+from pinecone import Pinecone, ServerlessSpec
+
+from config.settings import (
+    CHUNK_CACHE_DIR,
+    DATA_DIR,
+    EMBEDDING_CACHE_FILE,
+    FAQ_INDEX_DIR,
+    INDEX_ARTIFACT_DIR,
+    INGEST_MANIFEST_FILE,
+    LOG_DIR,
+    setup_logger,
+)
+from new import run_new
+from pipeline import Manifest, load_chunks
+from translator import detect_languages, get_translator, load_files
+from utils import time_execution
+from vectorstore import (
+    BatchEmbedder,
+    CachedEmbeddings,
+    EmbeddingCache,
+    FaqIndex,
+    chunk_id,
+    latest_version,
+    load_faq_rows,
+    metadata_digest,
+    prune_artifacts,
+    publish_version,
+    read_manifest,
+    sync_index,
+    write_artifact,
+    write_faq_index,
+)
+
+config = ConfigParser()
+config.read("config.ini")
+
+conf = config["DEFAULT"]
+
+
+@time_execution
+def setup_pinecone_index(index_name: str):
+
+    pc: Pinecone = Pinecone(api_key=os.environ["PINECONE_API_KEY"])
+    spec: ServerlessSpec = ServerlessSpec(
+        cloud=os.environ["CLOUD"], region=os.environ["CLOUD_REGION"]
+    )
+
+    index_names: Dict[str, Any] = pc.list_indexes().names()
+    if index_name not in index_names:
+        pc.create_index(
+            name=index_name,
+            dimension=os.environ["DIMENSIONS"],
+            metric=os.environ["METRIC"],
+            spec=spec,
+        )
+    return pc.Index(index_name)
+
+
+def faq_languages() -> List[str]:
+    """Languages listed in `faq_languages` that translator/languages.json knows."""
+    known = load_files()
+    languages = [
+        language.strip()
+        for language in conf.get("faq_languages", "").split(",")
+        if language.strip()
+    ]
+    for language in languages:
+        if language not in known:
+            logging.warning(f"Skipping unknown FAQ language: {language}")
+    return [language for language in languages if language in known]
+
+
+@time_execution
+def build_faq_index(embeddings: CachedEmbeddings, keep: int = 3) -> FaqIndex:
+    """
+    Canonical answers for every question row of the CSVs, translated to the
+    `faq_languages` of config.ini, with the question embeddings for lookup.
+    Embeddings and translations come from their caches after the first run.
+    Published as a new version that serving processes switch to.
+    """
+    rows = load_faq_rows(DATA_DIR)
+    languages = faq_languages()
+    index = FaqIndex.from_rows(
+        rows,
+        embeddings,
+        translator=get_translator() if languages else None,
+        languages=languages,
+    )
+    version = write_faq_index(FAQ_INDEX_DIR, index)
+    prune_artifacts(FAQ_INDEX_DIR, keep=keep)
+    logging.info(
+        f"FAQ index {version}: {len(index)} questions in languages: "
+        f"{', '.join(index.languages)}"
+    )
+    return index
+
+
+@time_execution
+def build_index(
+    pdf_extraction: Optional[bool] = None,
+    url_extraction: Optional[bool] = None,
+    qa_generator: Optional[bool] = None,
+    keep: int = 3,
+    full: bool = False,
+    faq: Optional[bool] = None,
+) -> str:
+    manifest = Manifest(INGEST_MANIFEST_FILE)
+    if full:
+        manifest.stages = {}
+
+    run_new(pdf_extraction, url_extraction, qa_generator, manifest=manifest)
+    manifest.save()
+
+    chunks: List[Document] = load_chunks(
+        DATA_DIR,
+        CHUNK_CACHE_DIR,
+        chunk_size=int(conf["chunk_size"]),
+        chunk_overlap=int(conf["chunk_overlap"]),
+        manifest=manifest,
+    )
+    manifest.save()
+    texts = [chunk.page_content for chunk in chunks]
+    # tag chunks with their language so retrieval can filter or route on it
+    metadatas = [
+        {**chunk.metadata, "language": language}
+        for chunk, language in zip(chunks, detect_languages(texts))
+    ]
+
+    embeddings = OpenAIEmbeddings(openai_api_key=os.environ["OPENAI_API_KEY"])
+    cached_embeddings = CachedEmbeddings(
+        embeddings,
+        EmbeddingCache(EMBEDDING_CACHE_FILE),
+        embedder=BatchEmbedder(
+            model=embeddings.model,
+            batch_size=int(conf["embed_batch_size"]),
+            max_batch_tokens=int(conf["embed_batch_tokens"]),
+            concurrency=int(conf["embed_concurrency"]),
+            requests_per_minute=int(conf["embed_requests_per_minute"]),
+            tokens_per_minute=int(conf["embed_tokens_per_minute"]),
+            max_retries=int(conf["embed_max_retries"]),
+        ),
+    )
+
+    if faq if faq is not None else conf.getboolean("enable_faq_index", True):
+        build_faq_index(cached_embeddings, keep=keep)
+
+    pinecone = conf["vector_backend"] == "pinecone"
+    chunk_ids = [chunk_id(text, cached_embeddings.model) for text in texts]
+    # a metadata-only change (e.g. a new field) must still produce a new artifact
+    digest = metadata_digest(metadatas)
+    version = latest_version(INDEX_ARTIFACT_DIR)
+    current = read_manifest(INDEX_ARTIFACT_DIR, version) if version else {}
+    if (
+        not full
+        and current.get("chunk_ids") == chunk_ids
+        and current.get("metadata_digest") == digest
+    ):
+        logging.info(f"Sources unchanged, keeping index artifact {version}")
+    else:
+        version = write_artifact(
+            INDEX_ARTIFACT_DIR,
+            texts,
+            cached_embeddings,
+            manifest={
+                "chunk_size": int(conf["chunk_size"]),
+                "chunk_overlap": int(conf["chunk_overlap"]),
+                "sources": {
+                    source: entry["sha256"]
+                    for source, entry in manifest.stages["chunks"]["sources"].items()
+                },
+                "chunk_ids": chunk_ids,
+                "metadata_digest": digest,
+            },
+            ann_min_chunks=int(conf["local_ann_min_chunks"]),
+            metadatas=metadatas,
+            publish=not pinecone,
+        )
+
+    if pinecone:
+        index_name = os.environ["INDEX_NAME"]
+        # runs even when the artifact is kept, to repair a partial upsert or a
+        # switch of backend; vectors come from the embedding cache, only the
+        # diff is upserted
+        sync_index(
+            setup_pinecone_index(index_name),
+            index_name,
+            texts,
+            cached_embeddings,
+            metadatas=metadatas,
+        )
+        # LATEST, and with it the response cache key, only moves once pinecone
+        # holds the vectors; a failed sync leaves the previous version published
+        # and is retried by the next run
+        publish_version(INDEX_ARTIFACT_DIR, version)
+
+    prune_artifacts(INDEX_ARTIFACT_DIR, keep=keep)
+    return version
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build a versioned index artifact.")
+    for flag, step in (
+        ("pdf", "PDF extraction"),
+        ("urls", "web scraping"),
+        ("qa", "QA generation"),
+        ("faq", "the FAQ answer index"),
+    ):
+        parser.add_argument(
+            f"--{flag}",
+            action=argparse.BooleanOptionalAction,
+            default=None,
+            help=f"run {step} (default: the enable_* flag in config.ini)",
+        )
+    parser.add_argument(
+        "--keep", type=int, default=3, help="number of artifact versions to keep"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="ignore the ingest manifest, reprocess every source and rebuild the artifact",
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    setup_logger(LOG_DIR, enable_console=True)
+
+    version = build_index(
+        args.pdf, args.urls, args.qa, keep=args.keep, full=args.full, faq=args.faq
+    )
+    print(version)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from configparser import ConfigParser
-from typing import List
+from typing import List, Optional
 
 from config.settings import (  # ALLOW_PDF_EXTRACTION,; ALLOW_QA_GENERATOR,; ALLOW_URL_EXTRACTION,
     PDF_DOC,
@@ -8,6 +8,7 @@ from config.settings import (  # ALLOW_PDF_EXTRACTION,; ALLOW_QA_GENERATOR,; ALL
     WEBDATA_DIR,
 )
 from pipeline import (
+    Manifest,
     extract_contents_for,
     extract_text_from_pdfs_in_directory,
     preprocess_files,
@@ -16,10 +17,6 @@ from pipeline import (
 config = ConfigParser()
 config.read("config.ini")
 
-# ToDO🤔, Well, I have a life 😂. Never mind:
-# UnicodeError when preprocessing extracted pdf files with GPT
-# Maximum GPT token length error for large text extraction.
-
 
 def load_urls() -> List[str]:
     with open(URLS_FILE, "r") as f:
@@ -27,14 +24,31 @@ def load_urls() -> List[str]:
     return url
 
 
-def run_new() -> None:
-
-    if config.getboolean("DEFAULT", "enable_pdf_extraction"):
-        extract_text_from_pdfs_in_directory(PDF_DOC)
-
-    if config.getboolean("DEFAULT", "enable_url_extraction"):
+def run_new(
+    pdf_extraction: Optional[bool] = None,
+    url_extraction: Optional[bool] = None,
+    qa_generator: Optional[bool] = None,
+    manifest: Optional[Manifest] = None,
+) -> None:
+    """
+    Run the extraction steps. Each step defaults to its `enable_*` flag in
+    config.ini when not given explicitly. With a manifest, only new or changed
+    sources are processed.
+    """
+
+    if pdf_extraction is None:
+        pdf_extraction = config.getboolean("DEFAULT", "enable_pdf_extraction")
+    if url_extraction is None:
+        url_extraction = config.getboolean("DEFAULT", "enable_url_extraction")
+    if qa_generator is None:
+        qa_generator = config.getboolean("DEFAULT", "enable_qa_generator")
+
+    if pdf_extraction:
+        extract_text_from_pdfs_in_directory(PDF_DOC, manifest=manifest)
+
+    if url_extraction:
         urls = load_urls()
         extract_contents_for(urls)
 
-    if config.getboolean("DEFAULT", "enable_qa_generator"):
-        preprocess_files(WEBDATA_DIR, PREDATA_DIR)
+    if qa_generator:
+        preprocess_files(WEBDATA_DIR, PREDATA_DIR, manifest=manifest)
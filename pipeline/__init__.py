@@ -1,4 +1,7 @@
 from pipeline.generator import preprocess_files
 from pipeline.webscraper import extract_contents_for
 
+from .chunker import pack_rows
+from .loader import document_splitter, load_chunks, load_csv_data
+from .manifest import Manifest
 from .pdf_extractor import extract_text_from_pdfs_in_directory
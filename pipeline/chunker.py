@@ -0,0 +1,53 @@
+import os
+from typing import List
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+def _chunk(texts: List[str], source: str, row_start: int, row_end: int) -> Document:
+    return Document(
+        page_content="\n".join(texts),
+        metadata={"source": source, "row_start": row_start, "row_end": row_end},
+    )
+
+
+def pack_rows(
+    rows: List[Document], chunk_size: int = 1000, chunk_overlap: int = 0
+) -> List[Document]:
+    """
+    Pack whole question/answer rows, as loaded by `CSVLoader`, into chunks of
+    at most `chunk_size` characters. A chunk never splits a row, only a row
+    longer than `chunk_size` is split on its own, with `chunk_overlap`.
+
+    Every chunk records its csv file and the first and last row it holds.
+    """
+    chunks: List[Document] = []
+    current: List[str] = []
+    current_size = row_start = row_end = 0
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+
+    for row in rows:
+        source = os.path.basename(row.metadata["source"])
+        number, text = row.metadata["row"], row.page_content
+        if current and current_size + 1 + len(text) > chunk_size:
+            chunks.append(_chunk(current, source, row_start, row_end))
+            current = []
+
+        if len(text) > chunk_size:
+            chunks.extend(
+                _chunk([piece], source, number, number)
+                for piece in splitter.split_text(text)
+            )
+            continue
+        if not current:
+            row_start, current_size = number, -1
+        current.append(text)
+        current_size += 1 + len(text)
+        row_end = number
+
+    if current:
+        chunks.append(_chunk(current, source, row_start, row_end))
+    return chunks
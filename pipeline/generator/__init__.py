@@ -1,53 +1,241 @@
+import asyncio
+import json
 import logging
 import os
+from configparser import ConfigParser
+from typing import Dict, List, Optional
 
+import httpx
 import openai
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
-from config.settings import LOG_DIR, setup_logger
-
-setup_logger(LOG_DIR)
+from config.settings import QA_JOURNAL_FILE
+from pipeline.manifest import Manifest, file_sha256
+from utils.ratelimit import RETRYABLE_ERRORS, TokenBucket, retry_after, retry_async
+from utils.tokens import count_tokens, split_by_tokens
 
 load_dotenv()
 
+config = ConfigParser()
+config.read("config.ini")
+
+conf = config["DEFAULT"]
+
+MANIFEST_STAGE = "qa"
+
+PROMPT = "Generate a list of comma separated questions and their answers based on the following content:\n\n{content}"
+
+# tokens reserved for the completion when sizing input segments and rate limiting
+COMPLETION_TOKENS = 1024
 
-def generate_question_answer_pairs(*, content: str) -> str:
-
-    openai.api_key = os.getenv("OPENAI_API_KEY")
-    client = OpenAI()
-    # Preprocess the content and generate a list of question,answer pairs
-    prompt = f"Generate a list of comma separated questions and their answers based on the following content:\n\n{content}"
-    completion = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": prompt,
-            }
-        ],
-        model="gpt-3.5-turbo-1106",
+
+def is_context_length_error(error: openai.BadRequestError) -> bool:
+    return error.code == "context_length_exceeded" or "maximum context length" in str(
+        error
     )
-    return completion.choices[0].message.content
 
 
-def preprocess_files(input_directory: str, output_directory: str) -> None:
+class QAJournal:
+    """
+    Append-only record of files whose QA pairs were written, keyed by path and
+    content hash, so an interrupted run picks up where it stopped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn write from a crash
+                    self.done[entry["file"]] = entry["sha256"]
+
+    def is_done(self, path: str, sha256: str) -> bool:
+        return self.done.get(os.path.abspath(path)) == sha256
+
+    def append(self, path: str, sha256: str, output: str) -> None:
+        self.done[os.path.abspath(path)] = sha256
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            entry = {"file": os.path.abspath(path), "sha256": sha256, "output": output}
+            f.write(json.dumps(entry) + "\n")
+
+
+class QAGenerator:
+    """
+    Generates question/answer pairs with bounded concurrency over one pooled
+    client, under request and token rate limits, retrying 429/5xx with
+    exponential backoff. Inputs above `max_input_tokens` are split into
+    segments whose outputs are merged.
+
+    Use it as an async context manager, or call `aclose()`, to release the
+    connection pool of the client it creates; a `client` passed in is left open.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        model: str = conf.get("qa_model", "gpt-3.5-turbo-1106"),
+        concurrency: int = conf.getint("qa_concurrency", 4),
+        requests_per_minute: int = conf.getint("qa_requests_per_minute", 500),
+        tokens_per_minute: int = conf.getint("qa_tokens_per_minute", 60000),
+        max_input_tokens: int = conf.getint("qa_max_input_tokens", 12000),
+        max_retries: int = conf.getint("qa_max_retries", 5),
+        retry_base: float = 1.0,
+    ):
+        self._owns_client = client is None
+        self.client = client or AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,  # retries are ours, with backoff and rate limiting
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=concurrency,
+                    max_keepalive_connections=concurrency,
+                ),
+                timeout=httpx.Timeout(120.0, connect=10.0),
+            ),
+        )
+        self.model = model
+        self.max_input_tokens = max_input_tokens
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._requests = TokenBucket.per_minute(requests_per_minute)
+        self._tokens = TokenBucket.per_minute(tokens_per_minute)
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self.client.close()
+
+    async def __aenter__(self) -> "QAGenerator":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _complete(self, content: str) -> str:
+        prompt = PROMPT.format(content=content)
+        await self._requests.acquire()
+        await self._tokens.acquire(count_tokens(prompt, self.model) + COMPLETION_TOKENS)
+
+        async def request() -> str:
+            async with self._semaphore:
+                completion = await self.client.chat.completions.create(
+                    messages=[{"role": "system", "content": prompt}],
+                    model=self.model,
+                )
+            return completion.choices[0].message.content or ""
+
+        try:
+            return await retry_async(
+                request,
+                RETRYABLE_ERRORS,
+                max_retries=self.max_retries,
+                base=self.retry_base,
+                retry_after=retry_after,
+            )
+        except openai.BadRequestError as e:
+            segments = split_by_tokens(
+                content, max(1, count_tokens(content, self.model) // 2), self.model
+            )
+            if not is_context_length_error(e) or len(segments) < 2:
+                raise
+            logging.warning("Segment exceeds the model context, splitting it in two")
+            return "\n".join([await self._complete(segment) for segment in segments])
+
+    async def generate_question_answer_pairs(self, *, content: str) -> str:
+        segments = split_by_tokens(content, self.max_input_tokens, self.model) or [""]
+        outputs = await asyncio.gather(
+            *(self._complete(segment) for segment in segments)
+        )
+        return "\n".join(output.strip() for output in outputs)
+
+    async def process_file(self, input_file_path: str, output_directory: str) -> str:
+        filename = os.path.basename(input_file_path)
+        # extracted pdf text is not always valid utf-8
+        with open(input_file_path, "r", encoding="utf-8", errors="replace") as file:
+            content = file.read().strip()
+
+        logging.info(f"Generating questions and answers for content in: {filename}")
+
+        generated_text = (
+            await self.generate_question_answer_pairs(content=content)
+        ).lower()
+        output_file_path = os.path.join(
+            output_directory, os.path.splitext(filename)[0] + ".txt"
+        )
+
+        with open(output_file_path, "w", encoding="utf-8") as file:
+            file.write(generated_text)
+
+        logging.info(f"Text file created: {output_file_path}")
+        return output_file_path
+
+
+async def preprocess_files_async(
+    input_directory: str,
+    output_directory: str,
+    manifest: Optional[Manifest] = None,
+    generator: Optional[QAGenerator] = None,
+    journal_path: str = QA_JOURNAL_FILE,
+) -> List[str]:
     if not os.path.exists(output_directory):
         os.makedirs(output_directory)
 
-    for filename in os.listdir(input_directory):
-        if filename.endswith(".txt"):
-            input_file_path = os.path.join(input_directory, filename)
-            with open(input_file_path, "r", encoding="utf-8") as file:
-                content = file.read().strip()
+    input_files = [
+        os.path.join(input_directory, filename)
+        for filename in os.listdir(input_directory)
+        if filename.endswith(".txt")
+    ]
 
-            logging.info(f"Generating questions and answers for content in: {filename}")
+    if manifest is not None:
+        for input_file_path in manifest.deleted(MANIFEST_STAGE, input_files):
+            manifest.forget(MANIFEST_STAGE, input_file_path)
+        input_files = manifest.changed(MANIFEST_STAGE, input_files)
+        logging.info(f"{len(input_files)} new or changed files to send to GPT")
 
-            generated_text = generate_question_answer_pairs(content=content).lower()
-            output_file_path = os.path.join(
-                output_directory, os.path.splitext(filename)[0] + ".txt"
-            )
+    # a generator created here is closed here, one passed in stays open
+    owned = generator is None
+    generator = generator or QAGenerator()
+    journal = QAJournal(journal_path)
+
+    async def run(input_file_path: str) -> Optional[str]:
+        sha256 = file_sha256(input_file_path)
+        output_file_path = os.path.join(
+            output_directory,
+            os.path.splitext(os.path.basename(input_file_path))[0] + ".txt",
+        )
+        if journal.is_done(input_file_path, sha256) and os.path.exists(
+            output_file_path
+        ):
+            logging.info(f"Already generated, skipping: {input_file_path}")
+        else:
+            try:
+                output_file_path = await generator.process_file(
+                    input_file_path, output_directory
+                )
+            except openai.OpenAIError as e:
+                logging.error(f"QA generation failed for '{input_file_path}': {e}")
+                return None
+            journal.append(input_file_path, sha256, output_file_path)
+
+        if manifest is not None:
+            manifest.record(MANIFEST_STAGE, input_file_path, [output_file_path])
+        return output_file_path
+
+    try:
+        results = await asyncio.gather(*(run(path) for path in input_files))
+    finally:
+        if owned:
+            await generator.aclose()
+    return [result for result in results if result]
 
-            with open(output_file_path, "w") as file:
-                file.write(generated_text)
 
-            logging.info(f"Text file created: {output_file_path}")
+def preprocess_files(
+    input_directory: str, output_directory: str, manifest: Optional[Manifest] = None
+) -> None:
+    asyncio.run(preprocess_files_async(input_directory, output_directory, manifest))
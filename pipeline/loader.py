@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from langchain_community.document_loaders import CSVLoader
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from pipeline.chunker import pack_rows
+from pipeline.manifest import Manifest
+from utils import time_execution
+
+MANIFEST_STAGE = "chunks"
+
+
+@lru_cache
+def load_csv_file(file_path: str) -> List[str]:
+    try:
+        loader = CSVLoader(file_path=file_path)
+        return loader.load()
+    except (AttributeError, TypeError, RuntimeError) as e:
+        logging.error(e)
+        return []
+
+
+@time_execution
+def load_csv_data(data_directory: str) -> Tuple[List[str], int]:
+    data_list: List[str] = []
+    counts: int = 0
+
+    csv_files = [
+        os.path.join(data_directory, filename)
+        for filename in os.listdir(data_directory)
+        if filename.endswith(".csv")
+    ]
+    counts = len(csv_files)
+
+    with ThreadPoolExecutor() as executor:
+        future_to_file = {
+            executor.submit(load_csv_file, file_path): file_path
+            for file_path in csv_files
+        }
+        for future in as_completed(future_to_file):
+            data_list.extend(future.result())
+
+    return data_list, counts
+
+
+# ########################################################################
+# https://python.langchain.com/v0.2/docs/how_to/recursive_text_splitter/
+
+
+@time_execution
+def document_splitter(
+    documents: List[str],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 0,
+) -> List[List[str]]:
+    text_splitter: RecursiveCharacterTextSplitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+    texts: List[str] = text_splitter.create_documents(
+        [doc.page_content for doc in documents]
+    )
+    return texts
+
+
+@time_execution
+def load_chunks(
+    data_directory: str,
+    chunk_directory: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 0,
+    manifest: Optional[Manifest] = None,
+) -> List[Document]:
+    """
+    Chunks for every csv in `data_directory`, in file name order, packed from
+    whole rows by `pack_rows`. Each file is chunked on its own and its chunks
+    kept in `chunk_directory`, so with a manifest only new or changed files are
+    loaded and chunked again.
+    """
+    os.makedirs(chunk_directory, exist_ok=True)
+    csv_files = sorted(
+        os.path.join(data_directory, filename)
+        for filename in os.listdir(data_directory)
+        if filename.endswith(".csv")
+    )
+
+    changed = csv_files
+    if manifest is not None:
+        for file_path in manifest.deleted(MANIFEST_STAGE, csv_files):
+            manifest.forget(MANIFEST_STAGE, file_path)
+        changed = manifest.changed(
+            MANIFEST_STAGE,
+            csv_files,
+            params={
+                "chunker": "rows",
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+            },
+        )
+        logging.info(f"{len(changed)} of {len(csv_files)} csv files need splitting")
+
+    for file_path in changed:
+        chunks = [
+            {"text": chunk.page_content, "metadata": chunk.metadata}
+            for chunk in pack_rows(
+                # bypass the lru_cache, the file content may have changed
+                load_csv_file.__wrapped__(file_path),
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+            )
+        ]
+        chunk_path = os.path.join(
+            chunk_directory, os.path.basename(file_path) + ".json"
+        )
+        with open(chunk_path, "w", encoding="utf-8") as f:
+            json.dump(chunks, f)
+        if manifest is not None:
+            manifest.record(MANIFEST_STAGE, file_path, [chunk_path])
+
+    documents: List[Document] = []
+    for file_path in csv_files:
+        chunk_path = os.path.join(
+            chunk_directory, os.path.basename(file_path) + ".json"
+        )
+        with open(chunk_path, "r", encoding="utf-8") as f:
+            documents.extend(
+                Document(page_content=chunk["text"], metadata=chunk["metadata"])
+                for chunk in json.load(f)
+            )
+    return documents
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from config.settings import BASE_DIR
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Record of every source file each ingest stage has processed: its content
+    hash, mtime and size, and the paths (or ids) derived from it.
+
+    A stage asks `changed()` which sources need work, `deleted()` which ones
+    disappeared, then calls `record()` / `forget()` as it goes. Hashes are only
+    recomputed when size or mtime moved.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.stages: Dict[str, Dict[str, Any]] = json.load(f)
+        except FileNotFoundError:
+            self.stages = {}
+
+    @staticmethod
+    def _key(path: str) -> str:
+        path = os.path.abspath(path)
+        if path.startswith(str(BASE_DIR) + os.sep):
+            return os.path.relpath(path, BASE_DIR)
+        return path
+
+    @staticmethod
+    def _path(key: str) -> str:
+        return key if os.path.isabs(key) else os.path.join(BASE_DIR, key)
+
+    def _stage(self, stage: str, params: Optional[Dict[str, Any]] = None) -> Dict:
+        entry = self.stages.setdefault(stage, {"params": params, "sources": {}})
+        if params is not None and entry["params"] != params:
+            # e.g. a new chunk size: everything derived so far is stale
+            logging.info(f"Manifest stage '{stage}' parameters changed, resetting")
+            for key in list(entry["sources"]):
+                self.forget(stage, self._path(key))
+            entry["params"] = params
+        return entry
+
+    def entry(self, stage: str, source: str) -> Optional[Dict[str, Any]]:
+        return self.stages.get(stage, {}).get("sources", {}).get(self._key(source))
+
+    def is_current(self, stage: str, source: str) -> bool:
+        entry = self.entry(stage, source)
+        if entry is None or not os.path.exists(source):
+            return False
+        if any(not os.path.exists(self._path(p)) for p in entry["outputs"]):
+            return False
+        stat = os.stat(source)
+        if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return True
+        if entry["sha256"] == file_sha256(source):
+            # touched but not modified
+            entry["mtime"] = stat.st_mtime
+            return True
+        return False
+
+    def changed(
+        self, stage: str, sources: List[str], params: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        with self._lock:
+            self._stage(stage, params)
+            return [source for source in sources if not self.is_current(stage, source)]
+
+    def deleted(self, stage: str, sources: List[str]) -> List[str]:
+        current = {self._key(source) for source in sources}
+        with self._lock:
+            return [
+                self._path(key)
+                for key in self._stage(stage)["sources"]
+                if key not in current
+            ]
+
+    def record(self, stage: str, source: str, outputs: List[str], **extra: Any) -> None:
+        stat = os.stat(source)
+        entry = {
+            "sha256": file_sha256(source),
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "outputs": [self._key(output) for output in outputs],
+            **extra,
+        }
+        with self._lock:
+            self._stage(stage)["sources"][self._key(source)] = entry
+
+    def forget(self, stage: str, source: str, remove_outputs: bool = True) -> None:
+        """Drop `source` from the stage and delete the files derived from it."""
+        with self._lock:
+            entry = (
+                self.stages.get(stage, {})
+                .get("sources", {})
+                .pop(self._key(source), None)
+            )
+        if entry and remove_outputs:
+            for output in entry["outputs"]:
+                path = self._path(output)
+                if os.path.isfile(path):
+                    os.remove(path)
+                    logging.info(f"Removed '{path}', derived from deleted '{source}'")
+
+    def save(self) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.stages, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
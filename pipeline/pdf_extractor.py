@@ -1,42 +1,207 @@
+import json
 import logging
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Optional
+import shutil
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from configparser import ConfigParser
+from typing import Dict, List, Optional, Tuple
 
 from PyPDF2 import PdfReader
 
-from config.settings import LOG_DIR, PDFDATA_DIR, setup_logger
+from config.settings import PDFDATA_DIR
+from pipeline.manifest import Manifest, file_sha256
 
-setup_logger(LOG_DIR)
+config = ConfigParser()
+config.read("config.ini")
 
+conf = config["DEFAULT"]
 
-def extract_text_from_pdf(pdf_path: str, output_directory: str) -> Optional[str]:
+MANIFEST_STAGE = "pdf"
+
+################################################################
+# Large PDFs are split into page ranges that run across a process pool.
+# Each range streams its pages to a part file and, after every page, records
+# how many pages and bytes it has written, so a crashed run resumes from the
+# last completed page. Parts are concatenated in order once all are done.
+################################################################
+
+
+def _read_json(path: str, default: dict) -> dict:
     try:
-        with open(pdf_path, "rb") as pdf_file:
-            pdf_reader = PdfReader(pdf_file)
-            total_pages = len(pdf_reader.pages)
-            logging.info(f"Processing '{pdf_path}', Total Pages: {total_pages}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def extract_page_range(pdf_path: str, start: int, end: int, part_path: str) -> int:
+    """
+    Append the lowercased text of pages [start, end) to `part_path`, resuming
+    after the last page recorded in its progress file. Returns pages extracted.
+    """
+    progress_path = f"{part_path}.progress"
+    progress = _read_json(progress_path, {"pages": 0, "bytes": 0})
+
+    reader = PdfReader(pdf_path)
+    extracted = 0
+    with open(part_path, "ab") as part_file:
+        # drop anything written after the last recorded page
+        part_file.truncate(progress["bytes"])
+        for number in range(start + progress["pages"], end):
+            data = ((reader.pages[number].extract_text() or "") + "\n").lower()
+            data = data.encode("utf-8", errors="replace")
+            part_file.write(data)
+            part_file.flush()
+
+            progress["pages"] += 1
+            progress["bytes"] += len(data)
+            _write_json(progress_path, progress)
+            extracted += 1
+    return extracted
+
+
+def plan_page_ranges(total_pages: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    return [
+        (start, min(start + pages_per_task, total_pages))
+        for start in range(0, total_pages, pages_per_task)
+    ]
+
 
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+class PdfJob:
+    """One PDF being extracted: its page ranges, part files and checkpoint."""
 
-            txt_filename = (
-                os.path.splitext(os.path.basename(pdf_path))[0].lower() + ".txt"
+    def __init__(self, pdf_path: str, output_directory: str, pages_per_task: int):
+        self.pdf_path = pdf_path
+        txt_filename = os.path.splitext(os.path.basename(pdf_path))[0].lower() + ".txt"
+        self.txt_path = os.path.join(output_directory, txt_filename)
+        self.parts_directory = os.path.join(output_directory, f".{txt_filename}.parts")
+        self.checkpoint_path = os.path.join(self.parts_directory, "checkpoint.json")
+
+        sha256 = file_sha256(pdf_path)
+        checkpoint = _read_json(self.checkpoint_path, {})
+        if checkpoint.get("sha256") != sha256:
+            # new file, or it changed since the interrupted run
+            shutil.rmtree(self.parts_directory, ignore_errors=True)
+            total_pages = len(PdfReader(pdf_path).pages)
+            checkpoint = {
+                "sha256": sha256,
+                "pages": total_pages,
+                "ranges": plan_page_ranges(total_pages, pages_per_task),
+                "done": [],
+            }
+            os.makedirs(self.parts_directory, exist_ok=True)
+            _write_json(self.checkpoint_path, checkpoint)
+        self.checkpoint = checkpoint
+        self.started_at = time.perf_counter()
+        self.pages_extracted = 0
+
+    @property
+    def pending(self) -> List[Tuple[int, int]]:
+        done = {tuple(r) for r in self.checkpoint["done"]}
+        return [tuple(r) for r in self.checkpoint["ranges"] if tuple(r) not in done]
+
+    def part_path(self, page_range: Tuple[int, int]) -> str:
+        return os.path.join(self.parts_directory, f"{page_range[0]:06d}.txt")
+
+    def complete(self, page_range: Tuple[int, int], pages: int) -> None:
+        self.checkpoint["done"].append(list(page_range))
+        self.pages_extracted += pages
+        _write_json(self.checkpoint_path, self.checkpoint)
+
+    def finish(self) -> str:
+        """Concatenate the parts into the output file, streaming."""
+        tmp_path = f"{self.txt_path}.tmp"
+        with open(tmp_path, "wb") as text_file:
+            for page_range in self.checkpoint["ranges"]:
+                with open(self.part_path(tuple(page_range)), "rb") as part_file:
+                    shutil.copyfileobj(part_file, text_file)
+        os.replace(tmp_path, self.txt_path)
+        shutil.rmtree(self.parts_directory, ignore_errors=True)
+
+        elapsed = time.perf_counter() - self.started_at
+        logging.info(
+            f"Extracted '{self.pdf_path}': {self.checkpoint['pages']} pages, "
+            f"{self.pages_extracted / elapsed if elapsed else 0:.1f} pages/sec"
+        )
+        return self.txt_path
+
+
+def extract_texts_from_pdfs(
+    pdf_files: List[str],
+    output_directory: str,
+    executor: Executor,
+    pages_per_task: int = 16,
+) -> Dict[str, Optional[str]]:
+    """
+    Extract every PDF in `pdf_files`, with all their page ranges in flight on
+    `executor` at once. Returns the output path per PDF, None on failure.
+    """
+    results: Dict[str, Optional[str]] = {}
+    jobs: Dict[str, PdfJob] = {}
+    remaining: Dict[str, int] = {}
+    futures = {}
+
+    for pdf_path in pdf_files:
+        try:
+            job = PdfJob(pdf_path, output_directory, pages_per_task)
+        except Exception as e:
+            logging.error(f"Error processing '{pdf_path}': {e}")
+            results[pdf_path] = None
+            continue
+        logging.info(
+            f"Processing '{pdf_path}', Total Pages: {job.checkpoint['pages']}, "
+            f"{len(job.pending)} of {len(job.checkpoint['ranges'])} page ranges to go"
+        )
+        jobs[pdf_path] = job
+        remaining[pdf_path] = len(job.pending)
+        for page_range in job.pending:
+            future = executor.submit(
+                extract_page_range, pdf_path, *page_range, job.part_path(page_range)
             )
-            txt_path = os.path.join(output_directory, txt_filename)
+            futures[future] = (pdf_path, page_range)
+        if not remaining[pdf_path]:
+            results[pdf_path] = job.finish()
+
+    for future in as_completed(futures):
+        pdf_path, page_range = futures[future]
+        if pdf_path in results:
+            continue  # an earlier range of this file failed
+        try:
+            jobs[pdf_path].complete(page_range, future.result())
+        except Exception as e:
+            logging.error(f"Error processing '{pdf_path}' pages {page_range}: {e}")
+            results[pdf_path] = None
+            continue
+        remaining[pdf_path] -= 1
+        if not remaining[pdf_path]:
+            results[pdf_path] = jobs[pdf_path].finish()
 
-            with open(txt_path, "w", encoding="utf-8") as text_file:
-                text = text.lower()
-                text_file.write(text)
+    return results
 
-            return txt_path
-    except Exception as e:
-        logging.error(f"Error processing '{pdf_path}': {e}")
-        return None
+
+def extract_text_from_pdf(pdf_path: str, output_directory: str) -> Optional[str]:
+    with ProcessPoolExecutor(
+        max_workers=conf.getint("pdf_workers", 0) or None
+    ) as executor:
+        return extract_texts_from_pdfs(
+            [pdf_path],
+            output_directory,
+            executor,
+            pages_per_task=conf.getint("pdf_pages_per_task", 16),
+        )[pdf_path]
 
 
-def extract_text_from_pdfs_in_directory(directory: str) -> None:
+def extract_text_from_pdfs_in_directory(
+    directory: str, manifest: Optional[Manifest] = None
+) -> None:
     # Ensure the output directory exists
     os.makedirs(PDFDATA_DIR, exist_ok=True)
 
@@ -46,17 +211,30 @@ def extract_text_from_pdfs_in_directory(directory: str) -> None:
         if filename.endswith(".pdf")
     ]
 
-    with ThreadPoolExecutor() as executor:
-        futures = [
-            executor.submit(extract_text_from_pdf, pdf_path, PDFDATA_DIR)
-            for pdf_path in pdf_files
-        ]
+    if manifest is not None:
+        for pdf_path in manifest.deleted(MANIFEST_STAGE, pdf_files):
+            manifest.forget(MANIFEST_STAGE, pdf_path)
+        pdf_files = manifest.changed(MANIFEST_STAGE, pdf_files)
+        logging.info(f"{len(pdf_files)} new or changed pdf files to extract")
+
+    started_at = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=conf.getint("pdf_workers", 0) or None
+    ) as executor:
+        results = extract_texts_from_pdfs(
+            pdf_files,
+            PDFDATA_DIR,
+            executor,
+            pages_per_task=conf.getint("pdf_pages_per_task", 16),
+        )
 
-        for future in as_completed(futures):
-            result = future.result()
-            if result:
-                logging.info(f"Successfully processed '{result}'")
+    for pdf_path, result in results.items():
+        if result:
+            logging.info(f"Successfully processed '{result}'")
+            if manifest is not None:
+                manifest.record(MANIFEST_STAGE, pdf_path, [result])
 
     logging.info(
-        f"Text extraction complete. Extracted texts are saved in '{PDFDATA_DIR}'."
+        f"Text extraction complete in {time.perf_counter() - started_at:.2f} sec. "
+        f"Extracted texts are saved in '{PDFDATA_DIR}'."
     )
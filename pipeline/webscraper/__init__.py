@@ -1,106 +1,45 @@
+import asyncio
 import logging
 import os
-import re
-from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+from typing import List
 from urllib.parse import unquote, urlparse
 
 import requests
-from bs4 import BeautifulSoup
 
-from config.settings import LOG_DIR, WEBDATA_DIR, setup_logger
+from config.settings import HTTP_CACHE_FILE, WEBDATA_DIR
 from utils import time_execution
 
-setup_logger(LOG_DIR)
+from .cleaner import extract_page_text, parse_page
+from .crawler import Crawler
 
+config = ConfigParser()
+config.read("config.ini")
 
-# SCRAP_TO = "uncknowledge"
-
-
-def is_navigation_or_footer_element(tag):
+conf = config["DEFAULT"]
 
-    common_navigation_classes = ["navbar", "nav", "menu", "navigation", "header"]
-    common_footer_classes = ["footer", "footer-wrapper", "footer-container"]
-
-    return (
-        tag.name == "nav"
-        or tag.has_attr("class")
-        and any(cls in tag["class"] for cls in common_navigation_classes)
-        or tag.name == "footer"
-        or tag.has_attr("class")
-        and any(cls in tag["class"] for cls in common_footer_classes)
-    )
-
-
-def exclude_button_text(tag):
-    """
-    Excludes text content within elements containing the CSS class "button".
-    """
 
-    if tag.name != "button" and (
-        not tag.has_attr("class") or "button" not in tag["class"]
-    ):
-        return tag
-    else:
-        tag.string = ""
-        return tag
+# SCRAP_TO = "uncknowledge"
 
 
-def exclude_anchor_text(tag):
+def extract_text_from_soup(soup):
     """
-    Excludes text content within anchor (hyperlink) elements.
+    Cleaned, lowercased text of a parsed page, in a single traversal.
     """
 
-    if tag.name != "a":
-        return tag
-    else:
-        tag.string = ""
-        return tag
-
-
-def clean(text):
-    # Remove lines starting with "loading..." or "site search"
-    text = [
-        line
-        for line in text.splitlines()
-        if not (line.lower().startswith("loading...") or line.lower() == "site search")
-    ]
-    text = "\n".join(text)
-    # regex pattern to match "| about |" or "| home |"
-    pattern = r"\|.*?\|"
-    # Remove paragraphs containing "| about |" or "| home |"
-    text = re.sub(pattern, "", text)
-    return text
+    return extract_page_text(
+        soup, drop_buttons=conf.getboolean("scrape_drop_buttons", False)
+    )
 
 
 @time_execution
 def extract_text_from_webpage(url):
     try:
-        response = requests.get(url)
+        response = requests.get(url, timeout=30)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        # Exclude navigation, footer, and button elements
-        navigation_or_footer_elements = soup.find_all(is_navigation_or_footer_element)
-        for elem in navigation_or_footer_elements:
-            elem.extract()
-
-        button_elements = soup.find_all(
-            lambda tag: tag.name != "button"
-            and (not tag.has_attr("class") or "button" not in tag["class"])
-        )
-        for button in button_elements:
-            exclude_button_text(button)
-
-        anchor_elements = soup.find_all(exclude_anchor_text)
-        for anchor in anchor_elements:
-            exclude_anchor_text(anchor)
-
-        extracted_text = soup.get_text(separator="\n", strip=True)
-
-        # clean text
-        extracted_text = extracted_text.lower()
-        extracted_text = clean(extracted_text)
+        soup = parse_page(response.content, conf.get("scrape_parser", "html.parser"))
+        extracted_text = extract_text_from_soup(soup)
 
         logging.info(f"Extracted text from url: {url}")
 
@@ -111,16 +50,6 @@ def extract_text_from_webpage(url):
         return None
 
 
-def extract_texts_from_multiple_webpages(urls):
-    """
-    Extracts text from multiple webpages concurrently.
-    """
-
-    with ThreadPoolExecutor() as executor:
-        results = executor.map(extract_text_from_webpage, urls)
-        return dict(zip(urls, results))
-
-
 def generate_filename_from_url(url):
     parsed_url = urlparse(url)
     filename = unquote(parsed_url.path)
@@ -150,12 +79,32 @@ def save_extracted_texts(extracted_texts):
         return False
 
 
-def extract_contents_for(urls):
+def extract_contents_for(urls: List[str]) -> bool:
     """
-    Extracts text from URLs and saves them to a file.
+    Crawls the URLs (and, with crawl_max_depth, the pages they link to) and
+    saves the text of every new or changed page to a file.
     """
 
-    extracted_texts = extract_texts_from_multiple_webpages(urls)
-    if extracted_texts and save_extracted_texts(extracted_texts):
-        return True
-    return False
+    os.makedirs(WEBDATA_DIR, exist_ok=True)
+
+    def output_path(url):
+        return os.path.join(WEBDATA_DIR, generate_filename_from_url(url))
+
+    def save(url, text):
+        with open(output_path(url), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    crawler = Crawler(
+        extract_text_from_soup,
+        parse=lambda html: parse_page(html, conf.get("scrape_parser", "html.parser")),
+        cache_file=HTTP_CACHE_FILE,
+        per_host_concurrency=conf.getint("crawl_per_host_concurrency", 4),
+        delay=conf.getfloat("crawl_delay", 0.5),
+        max_depth=conf.getint("crawl_max_depth", 0),
+    )
+    stats = asyncio.run(
+        crawler.crawl(
+            urls, save, has_output=lambda url: os.path.exists(output_path(url))
+        )
+    )
+    return bool(stats["fetched"] or stats["not_modified"])
@@ -0,0 +1,82 @@
+################################################################
+# Single-pass page cleaning.
+#
+# One depth-first walk over the parsed page skips navigation, footer and
+# anchor subtrees (and, optionally, buttons) and yields the remaining text,
+# which is lowercased and line-filtered as it streams out. The output is the
+# same as the previous three find_all passes followed by `clean()`, see
+# tests/fixtures/pages.
+################################################################
+
+import re
+from typing import Iterator, Union
+
+from bs4 import BeautifulSoup, FeatureNotFound
+from bs4.element import CData, NavigableString, Tag
+
+NAVIGATION_CLASSES = ("navbar", "nav", "menu", "navigation", "header")
+FOOTER_CLASSES = ("footer", "footer-wrapper", "footer-container")
+
+# matches "| about |" or "| home |" style breadcrumbs
+BREADCRUMB_PATTERN = re.compile(r"\|.*?\|")
+
+
+def is_pruned(tag: Tag, drop_buttons: bool = False) -> bool:
+    name = tag.name
+    if name in ("a", "nav", "footer"):
+        return True
+    classes = tag.get("class") or ()
+    if any(cls in classes for cls in NAVIGATION_CLASSES + FOOTER_CLASSES):
+        return True
+    return drop_buttons and (name == "button" or "button" in classes)
+
+
+def iter_page_strings(soup: BeautifulSoup, drop_buttons: bool = False) -> Iterator[str]:
+    """
+    Stripped, non-empty text of every string outside pruned subtrees, in
+    document order. Comments, scripts, styles and templates are skipped just
+    like `get_text()` does.
+    """
+    types = soup.interesting_string_types or (NavigableString, CData)
+    stack = [iter(soup.contents)]
+    while stack:
+        for node in stack[-1]:
+            if isinstance(node, Tag):
+                if node.contents and not is_pruned(node, drop_buttons):
+                    stack.append(iter(node.contents))
+                    break
+            elif type(node) in types:
+                text = node.strip()
+                if text:
+                    yield text
+        else:
+            stack.pop()
+
+
+def iter_clean_lines(strings: Iterator[str]) -> Iterator[str]:
+    """Lowercase, drop "loading..." and "site search" lines and breadcrumbs."""
+    for text in strings:
+        for line in text.lower().splitlines():
+            if line.startswith("loading...") or line == "site search":
+                continue
+            yield BREADCRUMB_PATTERN.sub("", line)
+
+
+def parse_page(markup: Union[str, bytes], parser: str = "html.parser") -> BeautifulSoup:
+    """
+    Parse with `parser` ("lxml" is several times faster than the default
+    "html.parser"), falling back to "html.parser" when it is not installed.
+    """
+    try:
+        return BeautifulSoup(markup, parser)
+    except FeatureNotFound:
+        return BeautifulSoup(markup, "html.parser")
+
+
+def extract_page_text(
+    markup: Union[str, bytes, BeautifulSoup],
+    parser: str = "html.parser",
+    drop_buttons: bool = False,
+) -> str:
+    soup = markup if isinstance(markup, BeautifulSoup) else parse_page(markup, parser)
+    return "\n".join(iter_clean_lines(iter_page_strings(soup, drop_buttons)))
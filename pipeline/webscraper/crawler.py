@@ -0,0 +1,277 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from utils import time_execution
+from utils.ratelimit import backoff_delay
+
+USER_AGENT = "StirlingBot/1.0 (+https://stirling-bot.onrender.com)"
+
+
+class FetchError(Exception):
+    pass
+
+
+class Crawler:
+    """
+    Async crawler over one pooled aiohttp session.
+
+    - at most `per_host_concurrency` requests per host, and `delay` seconds
+      between request starts to the same host (or the robots.txt Crawl-delay)
+    - robots.txt is fetched once per host and obeyed
+    - ETag / Last-Modified are remembered in `cache_file`, so an unchanged page
+      costs a 304 and is not parsed or saved again
+    - with `max_depth` > 0, same-domain links are followed up to that depth
+    """
+
+    def __init__(
+        self,
+        extract: Callable[[BeautifulSoup], str],
+        parse: Callable[[str], BeautifulSoup] = lambda html: BeautifulSoup(
+            html, "html.parser"
+        ),
+        cache_file: Optional[str] = None,
+        per_host_concurrency: int = 4,
+        total_concurrency: int = 32,
+        delay: float = 0.5,
+        timeout: float = 30.0,
+        max_depth: int = 0,
+        max_retries: int = 3,
+        respect_robots: bool = True,
+        user_agent: str = USER_AGENT,
+    ):
+        self.extract = extract
+        self.parse = parse
+        self.cache_file = cache_file
+        self.per_host_concurrency = per_host_concurrency
+        self.total_concurrency = total_concurrency
+        self.delay = delay
+        self.timeout = timeout
+        self.max_depth = max_depth
+        self.max_retries = max_retries
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+
+        self.validators: Dict[str, Dict[str, str]] = {}
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file, "r", encoding="utf-8") as f:
+                self.validators = json.load(f)
+
+        self.stats = {"fetched": 0, "not_modified": 0, "failed": 0, "skipped": 0}
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+        self._robots_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._host_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._next_request_at: Dict[str, float] = defaultdict(float)
+
+    def save_validators(self) -> None:
+        if self.cache_file:
+            os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump(self.validators, f, indent=2)
+
+    async def _robots_for(
+        self, session: aiohttp.ClientSession, url: str
+    ) -> Optional[RobotFileParser]:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        async with self._robots_locks[origin]:
+            if origin not in self._robots:
+                parser = None
+                try:
+                    async with session.get(f"{origin}/robots.txt") as response:
+                        if response.status == 200:
+                            parser = RobotFileParser()
+                            parser.parse((await response.text()).splitlines())
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logging.warning(f"Could not read robots.txt for {origin}: {e}")
+                self._robots[origin] = parser
+        return self._robots[origin]
+
+    async def _wait_turn(self, host: str, crawl_delay: float) -> None:
+        async with self._host_locks[host]:
+            now = time.monotonic()
+            wait = self._next_request_at[host] - now
+            self._next_request_at[host] = max(now, self._next_request_at[host]) + (
+                crawl_delay
+            )
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def fetch(
+        self, session: aiohttp.ClientSession, url: str, revalidate: bool = True
+    ) -> Tuple[int, Optional[str]]:
+        """GET `url`, returning (status, html); html is None on a 304."""
+        host = urlparse(url).netloc
+        robots = await self._robots_for(session, url) if self.respect_robots else None
+        if robots is not None and not robots.can_fetch(self.user_agent, url):
+            self.stats["skipped"] += 1
+            logging.info(f"Disallowed by robots.txt: {url}")
+            return 403, None
+        crawl_delay = max(
+            self.delay, float((robots and robots.crawl_delay(self.user_agent)) or 0)
+        )
+
+        headers = {}
+        validators = self.validators.get(url, {}) if revalidate else {}
+        if "etag" in validators:
+            headers["If-None-Match"] = validators["etag"]
+        if "last_modified" in validators:
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        slot = self._host_slots.setdefault(
+            host, asyncio.Semaphore(self.per_host_concurrency)
+        )
+        for attempt in range(self.max_retries + 1):
+            async with slot:
+                await self._wait_turn(host, crawl_delay)
+                try:
+                    async with session.get(url, headers=headers) as response:
+                        if response.status == 304:
+                            return 304, None
+                        if response.status == 429 or response.status >= 500:
+                            raise FetchError(f"HTTP {response.status}")
+                        response.raise_for_status()
+                        if "html" not in response.headers.get("Content-Type", "html"):
+                            return response.status, None
+
+                        self.validators[url] = {
+                            key: response.headers[header]
+                            for key, header in (
+                                ("etag", "ETag"),
+                                ("last_modified", "Last-Modified"),
+                            )
+                            if header in response.headers
+                        }
+                        return response.status, await response.text(errors="replace")
+                except (FetchError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    retryable = not (
+                        isinstance(e, aiohttp.ClientResponseError) and e.status < 500
+                    )
+                    if attempt >= self.max_retries or not retryable:
+                        raise
+                    delay = backoff_delay(attempt)
+                    logging.warning(f"Retrying {url} in {delay:.2f} sec. after: {e}")
+            await asyncio.sleep(delay)
+        raise FetchError(url)  # pragma: no cover
+
+    @staticmethod
+    def links_from(soup: BeautifulSoup, base_url: str) -> Set[str]:
+        domain = urlparse(base_url).netloc
+        links = set()
+        for anchor in soup.find_all("a", href=True):
+            link = urldefrag(urljoin(base_url, anchor["href"]))[0]
+            parsed = urlparse(link)
+            if parsed.scheme in ("http", "https") and parsed.netloc == domain:
+                links.add(link)
+        return links
+
+    @time_execution
+    async def crawl(
+        self,
+        seeds: List[str],
+        on_page: Callable[[str, str], None],
+        has_output: Callable[[str], bool] = lambda url: True,
+    ) -> Dict[str, int]:
+        """
+        Crawl from `seeds`, calling `on_page(url, text)` for every new or changed
+        page as soon as it is extracted. `has_output(url)` tells whether the
+        output of a previous crawl is still around, otherwise a 304 is not
+        trusted and the page is fetched in full.
+        """
+        seen: Set[str] = set(seeds)
+        queue: asyncio.Queue = asyncio.Queue()
+        for url in seeds:
+            queue.put_nowait((url, 0))
+
+        connector = aiohttp.TCPConnector(
+            limit=self.total_concurrency, limit_per_host=self.per_host_concurrency
+        )
+        async with aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": self.user_agent},
+        ) as session:
+
+            async def worker() -> None:
+                while True:
+                    url, depth = await queue.get()
+                    try:
+                        await self._visit(
+                            session, url, depth, seen, queue, on_page, has_output
+                        )
+                    except Exception as e:
+                        # a bad page or callback must not take the worker down,
+                        # or queue.join() would wait on its items forever
+                        self.stats["failed"] += 1
+                        logging.exception(f"Failed to process {url}: {e}")
+                    finally:
+                        queue.task_done()
+
+            workers = [
+                asyncio.create_task(worker()) for _ in range(self.total_concurrency)
+            ]
+            await queue.join()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        self.save_validators()
+        logging.info(f"Crawl finished: {self.stats}")
+        return self.stats
+
+    async def _visit(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        depth: int,
+        seen: Set[str],
+        queue: asyncio.Queue,
+        on_page: Callable[[str, str], None],
+        has_output: Callable[[str], bool],
+    ) -> None:
+        follow = depth < self.max_depth
+        # a 304 is only useful if we still have the text, and the links when following
+        revalidate = has_output(url) and (
+            not follow or "links" in self.validators.get(url, {})
+        )
+        try:
+            status, html = await self.fetch(session, url, revalidate=revalidate)
+        except (FetchError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.stats["failed"] += 1
+            logging.error(f"Failed to retrieve content from {url}: {e}")
+            return
+
+        soup = None
+        if status == 304:
+            self.stats["not_modified"] += 1
+            links = set(self.validators[url].get("links", []))
+        elif html is None:
+            return
+        else:
+            self.stats["fetched"] += 1
+            # parsing and extraction are CPU-bound, keep them off the event loop
+            soup = await asyncio.to_thread(self.parse, html)
+            links = self.links_from(soup, url) if follow else set()
+            if follow:
+                self.validators[url]["links"] = sorted(links)
+
+        if follow:
+            for link in links - seen:
+                seen.add(link)
+                queue.put_nowait((link, depth + 1))
+
+        if soup is None:
+            return
+
+        on_page(url, await asyncio.to_thread(self.extract, soup))
+        logging.info(f"Extracted text from url: {url}")
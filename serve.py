@@ -0,0 +1,79 @@
+################################################################
+# HTTP JSON API over the same serving core as main.py, for load testing and
+# other frontends.
+#
+#   python serve.py [--host HOST] [--port PORT]
+#
+#   POST /query  {"query": "..."}  ->  {"answer": "...", "seconds": 0.42}
+#   GET  /health                   ->  {"status": "ok"}
+#   GET  /metrics                  ->  latency percentiles, tokens, cache hit rates
+#
+# Queries are answered concurrently on one event loop. A query is abandoned
+# after request_timeout seconds, or as soon as its client disconnects.
+################################################################
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import List, Optional
+
+from aiohttp import web
+
+from config.settings import LOG_DIR, setup_logger
+from core import AppContext, answer_query_async, get_app_context, load_config
+from utils.metrics import get_registry
+
+
+def create_app(context: AppContext, timeout: Optional[float] = None) -> web.Application:
+    async def query(request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            return web.json_response({"error": "body must be json"}, status=400)
+        text = body.get("query") if isinstance(body, dict) else None
+        if not isinstance(text, str) or not text.strip():
+            return web.json_response({"error": "missing query"}, status=400)
+
+        start_time = time.perf_counter()
+        try:
+            answer = await answer_query_async(context, text, timeout=timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Query timed out after {timeout} sec.: {text!r}")
+            return web.json_response({"error": "timed out"}, status=504)
+        return web.json_response(
+            {"answer": answer, "seconds": round(time.perf_counter() - start_time, 4)}
+        )
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.json_response(
+            get_registry().snapshot(), dumps=lambda data: json.dumps(data, default=str)
+        )
+
+    app = web.Application()
+    app.router.add_post("/query", query)
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics)
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    conf = load_config()
+    parser = argparse.ArgumentParser(description="Serve the FAQ bot as a JSON API.")
+    parser.add_argument("--host", default=conf.get("api_host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=conf.getint("api_port", 8080))
+    args = parser.parse_args(argv)
+
+    setup_logger(LOG_DIR, enable_console=True)
+
+    app = create_app(get_app_context(), timeout=conf.getfloat("request_timeout", 60))
+    # cancel the handler, and with it the LLM request, when the client goes away
+    web.run_app(app, host=args.host, port=args.port, handler_cancellation=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+from langchain_core.embeddings import Embeddings
+
+
+class KeywordEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float("fees" in text) + 0.01, float("enrol" in text) + 0.01]
@@ -0,0 +1,56 @@
+import os
+
+from langchain_core.embeddings import Embeddings
+
+from vectorstore import (
+    ArtifactIndex,
+    CachedEmbeddings,
+    EmbeddingCache,
+    latest_version,
+    prune_artifacts,
+    publish_version,
+    read_manifest,
+    write_artifact,
+)
+
+
+class LengthEmbeddings(Embeddings):
+    model = "length"
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+def test_artifacts_are_versioned_and_hot_swapped(tmp_path):
+    root = str(tmp_path / "index")
+    embeddings = CachedEmbeddings(
+        LengthEmbeddings(), EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    )
+
+    first = write_artifact(root, ["fees", "enrolment"], embeddings, {"chunk_size": 10})
+    assert latest_version(root) == first
+    assert read_manifest(root, first)["chunks"] == 2
+    assert read_manifest(root, first)["chunk_size"] == 10
+
+    index = ArtifactIndex(root, LengthEmbeddings(), check_interval=0)
+    assert index.version == first
+    assert len(index.similarity_search("x", k=5)) == 2
+
+    second = write_artifact(root, ["fees", "enrolment", "library"], embeddings)
+    assert second != first
+    assert len(index.similarity_search("x", k=5)) == 3
+    assert index.version == second
+
+    # unpublished until the caller says so, e.g. once pinecone is synced
+    third = write_artifact(root, ["fees"], embeddings, publish=False)
+    assert latest_version(root) == second
+    publish_version(root, third)
+
+    # the version swaps on its own, so the response cache key follows the swap
+    assert index.version == third
+
+    prune_artifacts(root, keep=1)
+    assert sorted(os.listdir(root)) == sorted(["LATEST", third])
@@ -0,0 +1,124 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from langchain_core.embeddings import Embeddings
+from openai import AsyncOpenAI
+
+from vectorstore import (
+    BatchEmbedder,
+    CachedEmbeddings,
+    EmbeddingBatchError,
+    EmbeddingCache,
+)
+
+
+class FakeEmbeddingsHandler(BaseHTTPRequestHandler):
+    """Embeddings endpoint: 429 on the first call, 500 for batches holding "broken"."""
+
+    calls = []
+    broken = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeEmbeddingsHandler.calls.append(body["input"])
+
+        if len(FakeEmbeddingsHandler.calls) == 1:
+            return self.reply(429, {"error": {"message": "slow down", "code": None}})
+        if FakeEmbeddingsHandler.broken and "broken" in body["input"]:
+            return self.reply(500, {"error": {"message": "oops", "code": None}})
+        return self.reply(
+            200,
+            {
+                "object": "list",
+                "model": body["model"],
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": [len(text), 1.0]}
+                    for i, text in enumerate(body["input"])
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            },
+        )
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class UnusedEmbeddings(Embeddings):
+    model = "fake-embedding"
+
+    def embed_documents(self, texts):
+        raise AssertionError("documents go through the batch embedder")
+
+    def embed_query(self, text):
+        raise AssertionError
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeEmbeddingsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeEmbeddingsHandler.calls = []
+    FakeEmbeddingsHandler.broken = True
+    yield server
+    server.shutdown()
+
+
+def embedder(server):
+    client = AsyncOpenAI(
+        api_key="test",
+        base_url=f"http://127.0.0.1:{server.server_port}/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(),
+    )
+    return BatchEmbedder(
+        client=client,
+        model="fake-embedding",
+        batch_size=3,
+        concurrency=2,
+        max_retries=1,
+        retry_base=0.01,
+    )
+
+
+def test_batches_respect_size_and_token_limits():
+    batch_embedder = BatchEmbedder(client=object(), batch_size=3, max_batch_tokens=10)
+    texts = {str(i): "x" * 16 for i in range(5)}  # ~4 tokens each
+    assert [ids for ids, _ in batch_embedder.batches(texts)] == [
+        ["0", "1"],
+        ["2", "3"],
+        ["4"],
+    ]
+
+
+def test_embeds_in_batches_and_keeps_progress_when_a_batch_fails(server, tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    texts = [f"chunk {i}" for i in range(7)] + ["broken", "chunk 0"]
+
+    with pytest.raises(EmbeddingBatchError) as error:
+        CachedEmbeddings(UnusedEmbeddings(), cache, embedder(server)).embed_documents(
+            texts
+        )
+    assert len(error.value.failed) == 2  # "broken" and the chunk sharing its batch
+    # the duplicate "chunk 0" was sent once, and every other batch was stored
+    assert sum(batch.count("chunk 0") for batch in FakeEmbeddingsHandler.calls) <= 2
+
+    FakeEmbeddingsHandler.calls = []
+    FakeEmbeddingsHandler.broken = False
+    FakeEmbeddingsHandler.calls.append("429 already seen")
+    vectors = CachedEmbeddings(
+        UnusedEmbeddings(), cache, embedder(server)
+    ).embed_documents(texts)
+
+    assert FakeEmbeddingsHandler.calls[1:] == [["chunk 6", "broken"]]
+    assert vectors == [[float(len(text)), 1.0] for text in texts]
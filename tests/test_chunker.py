@@ -0,0 +1,32 @@
+from langchain_core.documents import Document
+
+from pipeline import pack_rows
+
+
+def rows(*texts):
+    return [
+        Document(page_content=text, metadata={"source": "data/v2/fees.csv", "row": i})
+        for i, text in enumerate(texts)
+    ]
+
+
+def test_pack_rows_keeps_rows_whole_with_provenance():
+    chunks = pack_rows(rows("a" * 40, "b" * 40, "c" * 40, "d" * 150), chunk_size=100)
+
+    assert [chunk.page_content for chunk in chunks[:2]] == [
+        "a" * 40 + "\n" + "b" * 40,
+        "c" * 40,
+    ]
+    assert [chunk.metadata for chunk in chunks[:2]] == [
+        {"source": "fees.csv", "row_start": 0, "row_end": 1},
+        {"source": "fees.csv", "row_start": 2, "row_end": 2},
+    ]
+    # only a row longer than a chunk is split, every piece points at it
+    assert all(len(chunk.page_content) <= 100 for chunk in chunks)
+    assert "".join(chunk.page_content for chunk in chunks[2:]) == "d" * 150
+    assert {chunk.metadata["row_start"] for chunk in chunks[2:]} == {3}
+
+
+def test_pack_rows_fits_rows_exactly_up_to_chunk_size():
+    chunks = pack_rows(rows("a" * 49, "b" * 50, "c"), chunk_size=100)
+    assert [chunk.metadata["row_end"] for chunk in chunks] == [1, 2]
@@ -0,0 +1,27 @@
+import glob
+import os
+
+import pytest
+
+from pipeline.webscraper.cleaner import extract_page_text
+
+PAGES = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+
+@pytest.mark.parametrize(
+    "page", sorted(glob.glob(os.path.join(PAGES, "*.html"))), ids=os.path.basename
+)
+def test_single_pass_output_matches_previous_scraper(page):
+    # the .txt files were produced by the previous three-pass extraction
+    with open(page, "rb") as f:
+        markup = f.read()
+    with open(page[:-5] + ".txt", "r", encoding="utf-8", newline="") as f:
+        expected = f.read()
+
+    assert extract_page_text(markup) == expected
+
+
+def test_drop_buttons():
+    markup = '<p>Fees</p><button>Pay now</button><span class="button">Go</span>'
+    assert extract_page_text(markup) == "fees\npay now\ngo"
+    assert extract_page_text(markup, drop_buttons=True) == "fees"
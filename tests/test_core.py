@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+import core.context
+from cache import ResponseCache
+from core import AppContext, answer_query, answer_query_async, get_app_context
+from tests.helpers import KeywordEmbeddings
+from translator import TranslationCache, Translator
+from utils.metrics import get_registry
+from vectorstore import FaqIndex, LocalVectorIndex
+
+FAQ = [
+    "question: how do i pay my fees\nanswer: online through the portal",
+    "question: when is enrolment\nanswer: enrolment opens in august",
+]
+
+
+class EchoChain:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def run(self, input_documents, question, callbacks=None):
+        self.calls += 1
+        return " " + input_documents[0].page_content.split("answer: ")[1] + " "
+
+    async def arun(self, input_documents, question, callbacks=None):
+        await asyncio.sleep(self.delay)
+        return self.run(input_documents, question, callbacks)
+
+
+class DictionaryBackend:
+    name = "dictionary"
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.requests = 0
+
+    def translate(self, texts, source, target):
+        self.requests += 1
+        return [self.entries[text] for text in texts]
+
+
+def make_context(chain, translator=None, faq_index=None):
+    embeddings = KeywordEmbeddings()
+    return AppContext(
+        {"documents_return_count": "1"},
+        embeddings,
+        LocalVectorIndex.from_texts(FAQ, embeddings),
+        chain,
+        ResponseCache(),
+        translator=translator,
+        faq_index=faq_index,
+    )
+
+
+def test_answer_query_retrieves_and_caches():
+    chain = EchoChain()
+    context = make_context(chain)
+
+    assert answer_query(context, "How do I pay my fees?") == "online through the portal"
+    assert answer_query(context, "how do i pay my fees") == "online through the portal"
+    assert answer_query(context, "enrolment date?") == "enrolment opens in august"
+    assert chain.calls == 2
+
+    snapshot = get_registry().snapshot()
+    for stage in ("query_embedding", "vector_search", "prompt_build"):
+        assert snapshot["histograms"][f"stage.{stage}"]["count"] >= 2
+    assert snapshot["response_cache"]["exact_hits"] == 1
+
+
+def test_non_english_queries_are_answered_in_english_and_translated_back(tmp_path):
+    backend = DictionaryBackend(
+        {
+            "Comment payer mes frais de scolarité ?": "How do I pay my fees?",
+            "online through the portal": "en ligne via le portail",
+        }
+    )
+    chain = EchoChain()
+    context = make_context(
+        chain, Translator(backend, TranslationCache(str(tmp_path / "t.sqlite3")))
+    )
+
+    query = "Comment payer mes frais de scolarité ?"
+    assert answer_query(context, query) == "en ligne via le portail"
+    assert asyncio.run(answer_query_async(context, query)) == "en ligne via le portail"
+    # the english answer is shared with english queries
+    assert answer_query(context, "how do i pay my fees") == "online through the portal"
+    assert chain.calls == 1
+    assert backend.requests == 2
+
+
+def test_failed_translations_fall_back_to_the_untranslated_text():
+    # the answer cannot be translated back, the english one is served instead
+    backend = DictionaryBackend({"Comment payer mes frais ?": "How do I pay my fees?"})
+    context = make_context(EchoChain(), Translator(backend))
+    failures = get_registry().counters.get("translation.failures", 0)
+
+    query = "Comment payer mes frais ?"
+    assert answer_query(context, query) == "online through the portal"
+    assert asyncio.run(answer_query_async(context, query)) == (
+        "online through the portal"
+    )
+    assert get_registry().counters["translation.failures"] == failures + 2
+
+
+def test_faq_questions_are_answered_without_the_chain():
+    faq_index = FaqIndex(
+        ["How do I pay my fees?"],
+        {"en": ["Pay online."], "fr": ["Payez en ligne."]},
+        KeywordEmbeddings().embed_documents(["How do I pay my fees?"]),
+    )
+    backend = DictionaryBackend(
+        {"Comment payer les frais ?": "fees payment?", "frais scolaires": "fees"}
+    )
+    chain = EchoChain()
+    context = make_context(chain, Translator(backend), faq_index)
+
+    assert answer_query(context, "how do I pay my fees") == "Pay online."
+    assert answer_query(context, "Comment payer les frais ?") == "Payez en ligne."
+    assert (
+        asyncio.run(answer_query_async(context, "What are the fees, please?"))
+        == "Pay online."
+    )
+    # short queries are detected too, not assumed to be english
+    assert answer_query(context, "frais scolaires") == "Payez en ligne."
+    # unseen questions still go through retrieval
+    assert (
+        answer_query(context, "When is the enrolment?") == "enrolment opens in august"
+    )
+    assert chain.calls == 1
+
+
+def test_get_app_context_builds_once_across_threads():
+    built = []
+
+    def build():
+        built.append(1)
+        return make_context(EchoChain())
+
+    with patch.object(core.context, "_context", None), patch.object(
+        AppContext, "build", side_effect=build
+    ):
+        threads = [threading.Thread(target=get_app_context) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(built) == 1
+
+
+def test_answer_query_async_serves_queries_concurrently():
+    chain = EchoChain(delay=0.2)
+    context = make_context(chain)
+    queries = [f"how do i pay my fees {i}" for i in range(10)] + ["enrolment?"]
+
+    async def run():
+        return await asyncio.gather(*(answer_query_async(context, q) for q in queries))
+
+    start_time = time.perf_counter()
+    answers = asyncio.run(run())
+    assert time.perf_counter() - start_time < 1.0  # not 11 x 0.2 sec.
+    assert answers[0] == "online through the portal"
+    assert answers[-1] == "enrolment opens in august"
+
+
+def test_answer_query_async_times_out_and_caches_nothing():
+    context = make_context(EchoChain(delay=1.0))
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(answer_query_async(context, "fees?", timeout=0.05))
+    assert context.response_cache.stats()["size"] == 0
+
+
+def test_answer_query_async_coalesces_identical_queries():
+    chain = EchoChain(delay=0.1)
+    context = make_context(chain)
+
+    async def run():
+        return await asyncio.gather(
+            *(answer_query_async(context, q) for q in ["Fees?", "fees", "FEES!"])
+        )
+
+    assert asyncio.run(run()) == ["online through the portal"] * 3
+    assert chain.calls == 1
+    assert context.single_flight.key_stats("fees")["saved"] == 2
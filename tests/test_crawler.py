@@ -0,0 +1,89 @@
+import asyncio
+
+from aiohttp import web
+
+from pipeline.webscraper import extract_text_from_soup
+from pipeline.webscraper.crawler import Crawler
+
+PAGES = {
+    "/": '<main><p>Welcome to Stirling</p><a href="/fees">fees</a><a href="/private">x</a></main>',
+    "/fees": '<main><p>Pay your fees online</p><a href="https://example.org/">out</a></main>',
+    "/private": "<main><p>Staff only</p></main>",
+}
+
+
+def make_app(requests):
+    async def robots(request):
+        return web.Response(text="User-agent: *\nDisallow: /private\n")
+
+    async def page(request):
+        requests.append(request.path)
+        etag = f'"{request.path}-v1"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(
+            text=PAGES[request.path], content_type="text/html", headers={"ETag": etag}
+        )
+
+    app = web.Application()
+    app.router.add_get("/robots.txt", robots)
+    for path in PAGES:
+        app.router.add_get(path, page)
+    return app
+
+
+def test_crawl_follows_links_obeys_robots_and_revalidates(tmp_path):
+    requests, pages = [], {}
+
+    async def run():
+        runner = web.AppRunner(make_app(requests))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        try:
+            for _ in range(2):
+                crawler = Crawler(
+                    extract_text_from_soup,
+                    cache_file=str(tmp_path / "http_cache.json"),
+                    delay=0,
+                    max_depth=1,
+                )
+                stats = await crawler.crawl(
+                    [base + "/"], lambda url, text: pages.__setitem__(url, text)
+                )
+            return base, stats
+        finally:
+            await runner.cleanup()
+
+    base, stats = asyncio.run(run())
+
+    assert sorted(pages) == [base + "/", base + "/fees"]
+    assert pages[base + "/fees"] == "pay your fees online"
+    assert "/private" not in requests
+    # second crawl: both pages answered 304, links replayed from the cache
+    assert stats == {"fetched": 0, "not_modified": 2, "failed": 0, "skipped": 1}
+
+
+def test_crawl_survives_errors_while_processing_a_page(tmp_path):
+    def on_page(url, text):
+        raise RuntimeError("disk full")
+
+    async def run():
+        runner = web.AppRunner(make_app([]))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        try:
+            # a single worker: if it died, the crawl would never finish
+            crawler = Crawler(
+                extract_text_from_soup, total_concurrency=1, delay=0, max_depth=1
+            )
+            return await asyncio.wait_for(crawler.crawl([base + "/"], on_page), 10)
+        finally:
+            await runner.cleanup()
+
+    stats = asyncio.run(run())
+    assert stats["fetched"] == 2
+    assert stats["failed"] == 2
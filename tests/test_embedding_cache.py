@@ -0,0 +1,88 @@
+from langchain_core.embeddings import Embeddings
+
+from vectorstore import CachedEmbeddings, EmbeddingCache, chunk_id, sync_index
+
+
+class CountingEmbeddings(Embeddings):
+    model = "fake-embedding"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+class FakeIndex:
+    def __init__(self):
+        self.vectors = {}
+
+    def describe_index_stats(self):
+        return {"total_vector_count": len(self.vectors)}
+
+    def upsert(self, vectors):
+        for vector in vectors:
+            self.vectors[vector["id"]] = vector
+
+    def delete(self, ids):
+        for key in ids:
+            self.vectors.pop(key, None)
+
+
+def test_only_missing_chunks_are_embedded(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    base = CountingEmbeddings()
+    cached = CachedEmbeddings(base, cache)
+
+    assert cached.embed_documents(["a", "bb"]) == [[1.0, 1.0], [2.0, 1.0]]
+    assert cached.embed_documents(["bb", "ccc"]) == [[2.0, 1.0], [3.0, 1.0]]
+    assert base.embedded == ["a", "bb", "ccc"]
+
+
+def test_sync_index_upserts_diff_with_deterministic_ids(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    index = FakeIndex()
+
+    base = CountingEmbeddings()
+    sync_index(index, "faq", ["a", "bb"], CachedEmbeddings(base, EmbeddingCache(path)))
+    assert set(index.vectors) == {
+        chunk_id("a", "fake-embedding"),
+        chunk_id("bb", "fake-embedding"),
+    }
+
+    # restart: a fresh cache handle on the same file, one chunk changed
+    base = CountingEmbeddings()
+    sync_index(index, "faq", ["a", "ccc"], CachedEmbeddings(base, EmbeddingCache(path)))
+    assert base.embedded == ["ccc"]
+    assert set(index.vectors) == {
+        chunk_id("a", "fake-embedding"),
+        chunk_id("ccc", "fake-embedding"),
+    }
+    assert index.vectors[chunk_id("ccc", "fake-embedding")]["metadata"] == {
+        "text": "ccc"
+    }
+
+
+def test_sync_index_reupserts_chunks_whose_metadata_changed(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    index = FakeIndex()
+    base = CountingEmbeddings()
+
+    sync_index(index, "faq", ["a", "bb"], CachedEmbeddings(base, EmbeddingCache(path)))
+    upserts = []
+    index.upsert = lambda vectors: upserts.extend(vectors)
+
+    sync_index(
+        index,
+        "faq",
+        ["a", "bb"],
+        CachedEmbeddings(base, EmbeddingCache(path)),
+        metadatas=[{"language": "en"}, {}],
+    )
+    assert [vector["id"] for vector in upserts] == [chunk_id("a", "fake-embedding")]
+    assert upserts[0]["metadata"] == {"language": "en", "text": "a"}
+    assert base.embedded == ["a", "bb"]
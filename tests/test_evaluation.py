@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from evaluation.engine import evaluate, load_dataset, score_lexical, write_results
+
+PAIRS = [
+    ("you can pay your fees online", "pay your fees online through the portal"),
+    ("enrolment opens in august", "enrolment opens in august"),
+    ("contact the student hub", "the library is open late"),
+]
+
+
+def test_load_dataset_flattens_similar_queries_json(tmp_path):
+    path = tmp_path / "metrics.json"
+    path.write_text(
+        '{"queries": [{"query": "q", "response": "ref", "similar_queries": '
+        '{"1": {"query": "q1", "bot_response": "a1"}, '
+        '"2": {"query": "q2", "bot_response": "a2"}}}]}'
+    )
+
+    dataset = load_dataset(str(path))
+    assert dataset.to_dict("records") == [
+        {"question": "q1", "reference": "ref", "prediction": "a1"},
+        {"question": "q2", "reference": "ref", "prediction": "a2"},
+    ]
+
+    (tmp_path / "bad.csv").write_text("question,answer\nq,a\n")
+    with pytest.raises(ValueError):
+        load_dataset(str(tmp_path / "bad.csv"))
+
+
+def test_rouge_in_a_process_pool_matches_in_process():
+    references, predictions = zip(*PAIRS)
+    pooled = score_lexical(references, predictions, ["rouge"], workers=2, chunksize=1)
+    assert pooled == score_lexical(references, predictions, ["rouge"], workers=1)
+    assert pooled[1]["rouge1"] == 1.0
+    assert pooled[2]["rouge2"] == 0.0
+
+
+def test_evaluate_writes_results_and_summary(tmp_path):
+    dataset = pd.DataFrame(
+        [{"question": "", "reference": r, "prediction": p} for r, p in PAIRS]
+    )
+    results = evaluate(dataset, ["rouge"], workers=1)
+    summary_path = write_results(results, str(tmp_path / "results.csv"))
+
+    written = pd.read_csv(tmp_path / "results.csv", keep_default_na=False)
+    assert list(written.columns[-4:]) == ["rouge1", "rouge2", "rougeL", "rougeLsum"]
+    summary = pd.read_csv(summary_path, index_col="metric")
+    assert summary.loc["rouge1", "count"] == 3
+    assert summary.loc["rouge1", "max"] == 1.0
+
+    with pytest.raises(ValueError):
+        evaluate(dataset, ["bleu"])
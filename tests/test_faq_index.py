@@ -0,0 +1,80 @@
+import os
+
+from tests.helpers import KeywordEmbeddings
+from translator import Translator
+from vectorstore import FaqIndex, LatestFaqIndex, load_faq_rows, write_faq_index
+
+
+class UpperBackend:
+    name = "upper"
+
+    def __init__(self):
+        self.requests = 0
+
+    def translate(self, texts, source, target):
+        self.requests += 1
+        return [text.upper() for text in texts]
+
+
+def write_csv(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        "question,answer\n" + "".join(f"{q},{a}\n" for q, a in rows), encoding="utf-8"
+    )
+
+
+def test_load_faq_rows_reads_question_rows_once(tmp_path):
+    write_csv(tmp_path / "v1" / "fees.csv", [("How do I pay my fees?", "online")])
+    write_csv(
+        tmp_path / "v2" / "more.csv",
+        [("how do i pay my fees", "by post"), ("When is enrolment?", "august")],
+    )
+
+    rows = load_faq_rows(str(tmp_path))
+    assert rows == [
+        ("How do I pay my fees?", "online", "fees.csv"),
+        ("When is enrolment?", "august", "more.csv"),
+    ]
+
+
+def test_faq_index_matches_and_serves_precomputed_languages(tmp_path):
+    rows = [
+        ("How do I pay my fees?", "online", "fees.csv"),
+        ("When is enrolment?", "in august", "enrol.csv"),
+    ]
+    backend = UpperBackend()
+    index = FaqIndex.from_rows(
+        rows, KeywordEmbeddings(), Translator(backend), languages=["fr", "de"]
+    )
+    assert backend.requests == 2
+    index.save(str(tmp_path))
+
+    index = FaqIndex.load(str(tmp_path))
+    assert index.languages == ["en", "fr", "de"]
+    assert index.match_exact("how do I pay my FEES") == 0
+    assert index.match([0.01, 1.01])[0] == 1
+    assert index.match([1.0, 1.0]) is None
+    assert index.answer(1, "fr") == "IN AUGUST"
+    assert index.answer(1, "es") is None
+
+
+def test_latest_faq_index_switches_to_published_versions(tmp_path):
+    root = str(tmp_path / "faq")
+    rows = [("How do I pay my fees?", "online", "fees.csv")]
+    faq = LatestFaqIndex(root, check_interval=0)
+    assert faq.index is None
+
+    first = write_faq_index(root, FaqIndex.from_rows(rows, KeywordEmbeddings()))
+    assert faq.index.version == first
+    assert faq.index.answer(0) == "online"
+
+    # an unchanged index keeps the published version
+    same = write_faq_index(root, FaqIndex.from_rows(rows, KeywordEmbeddings()))
+    assert same == first
+    assert len(os.listdir(root)) == 2  # LATEST and the one version
+
+    rows = [("How do I pay my fees?", "by post", "fees.csv")]
+    second = write_faq_index(root, FaqIndex.from_rows(rows, KeywordEmbeddings()))
+    assert second != first
+    assert faq.index.version == second
+    assert faq.index.answer(0) == "by post"
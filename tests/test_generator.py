@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from openai import AsyncOpenAI
+
+from pipeline.generator import QAGenerator, preprocess_files_async
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Chat completions endpoint: 429 on the first call, context errors above 200 chars."""
+
+    calls = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        content = body["messages"][0]["content"].split("\n\n", 1)[1]
+        FakeOpenAIHandler.calls.append(content)
+
+        if len(FakeOpenAIHandler.calls) == 1:
+            return self.reply(429, {"error": {"message": "slow down", "code": None}})
+        if len(content) > 200:
+            return self.reply(
+                400,
+                {
+                    "error": {
+                        "message": "maximum context length exceeded",
+                        "code": "context_length_exceeded",
+                    }
+                },
+            )
+        return self.reply(
+            200,
+            {
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {
+                            "role": "assistant",
+                            "content": f"Q: {content.splitlines()[0]}?",
+                        },
+                    }
+                ],
+            },
+        )
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_generates_qa_files_against_fake_server_and_resumes(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeOpenAIHandler.calls = []
+
+    raw, out = tmp_path / "raw", tmp_path / "out"
+    raw.mkdir()
+    (raw / "fees.txt").write_text("Fees are paid online")
+    (raw / "handbook.txt").write_text("\n".join(f"Rule {i} " * 4 for i in range(12)))
+
+    def generator():
+        client = AsyncOpenAI(
+            api_key="test",
+            base_url=f"http://127.0.0.1:{server.server_port}/v1",
+            max_retries=0,
+            http_client=httpx.AsyncClient(),
+        )
+        return QAGenerator(client=client, concurrency=2, retry_base=0.01)
+
+    journal = str(tmp_path / "journal.jsonl")
+    try:
+        outputs = asyncio.run(
+            preprocess_files_async(
+                str(raw), str(out), generator=generator(), journal_path=journal
+            )
+        )
+        assert sorted(o.rsplit("/", 1)[1] for o in outputs) == [
+            "fees.txt",
+            "handbook.txt",
+        ]
+        assert (out / "fees.txt").read_text() == "q: fees are paid online?"
+        # the oversized handbook was split and its segments merged
+        assert (out / "handbook.txt").read_text().count("q: rule") > 1
+
+        calls = len(FakeOpenAIHandler.calls)
+        asyncio.run(
+            preprocess_files_async(
+                str(raw), str(out), generator=generator(), journal_path=journal
+            )
+        )
+        assert len(FakeOpenAIHandler.calls) == calls
+    finally:
+        server.shutdown()
+
+
+def test_generator_closes_only_the_client_it_created(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    async def run():
+        async with QAGenerator() as generator:
+            pass
+        client = AsyncOpenAI(api_key="test")
+        async with QAGenerator(client=client):
+            pass
+        return generator.client.is_closed(), client.is_closed()
+
+    assert asyncio.run(run()) == (True, False)
@@ -0,0 +1,80 @@
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from vectorstore import (
+    BM25Index,
+    HybridRetriever,
+    LocalVectorIndex,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+FAQ = [
+    "question: what does comp1511 cover\nanswer: programming fundamentals",
+    "question: how much is the late fee\nanswer: the late fee is $1,200.50",
+    "question: where is the student centre\nanswer: level 2 of the library",
+    "question: what programming courses are there\nanswer: see the handbook",
+]
+
+
+class TopicEmbeddings(Embeddings):
+    """Knows topics, not course codes, like a real embedding model often does."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float("programming" in text) + 0.01, float("fee" in text) + 0.01]
+
+
+def test_tokenize_keeps_codes_and_amounts_whole():
+    assert tokenize("COMP1511 costs $1,200.50 by e-mail.") == [
+        "comp1511",
+        "costs",
+        "1,200.50",
+        "by",
+        "e-mail",
+    ]
+
+
+def test_bm25_ranks_rare_terms_and_round_trips(tmp_path):
+    index = BM25Index.from_texts(FAQ)
+    hits = index.search("comp1511 course", k=4)
+    assert hits[0][0] == 0
+    assert index.search("unknown words", k=4) == []
+
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded.search("comp1511 course", k=4) == hits
+
+
+def test_reciprocal_rank_fusion_prefers_documents_in_both_rankings():
+    a, b, c = (Document(page_content=text) for text in "abc")
+    fused = reciprocal_rank_fusion([[a, b], [c, b]])
+    assert fused[0] is b
+    assert {doc.page_content for doc in fused} == {"a", "b", "c"}
+
+
+def test_hybrid_retriever_finds_keyword_matches_vectors_miss():
+    embeddings = TopicEmbeddings()
+    index = LocalVectorIndex.from_texts(FAQ, embeddings)
+    query = "what is comp1511 about"
+    vector = embeddings.embed_query(query)
+
+    vector_only = HybridRetriever(index).search(query, vector, k=1)
+    assert vector_only[0].page_content != FAQ[0]
+
+    hybrid = HybridRetriever(index, index, candidates=4).search(query, vector, k=1)
+    assert hybrid[0].page_content == FAQ[0]
+
+
+def test_hybrid_retriever_applies_reranker():
+    embeddings = TopicEmbeddings()
+    index = LocalVectorIndex.from_texts(FAQ, embeddings)
+
+    def prefer_library(query, passages):
+        return [float("library" in passage) for passage in passages]
+
+    retriever = HybridRetriever(index, index, candidates=4, reranker=prefer_library)
+    docs = retriever.search("late fee", embeddings.embed_query("late fee"), k=2)
+    assert docs[0].page_content == FAQ[2]
@@ -0,0 +1,66 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from vectorstore import ChunkStore, LocalVectorIndex
+
+WORDS = ["fees", "enrolment", "library", "visa", "accommodation", "exams"]
+
+
+class BagOfWordsEmbeddings(Embeddings):
+    model = "bag-of-words"
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(text.count(word)) + 0.01 for word in WORDS]
+
+
+def test_exact_search_round_trips_through_memory_mapped_files(tmp_path):
+    texts = [f"how do i pay my {word}" for word in WORDS]
+    embedding = BagOfWordsEmbeddings()
+    LocalVectorIndex.from_texts(texts, embedding).save(str(tmp_path))
+
+    index = LocalVectorIndex.load(str(tmp_path), embedding)
+    assert isinstance(index.vectors, np.memmap)
+
+    docs = index.similarity_search("visa questions", k=2)
+    assert len(docs) == 2
+    assert docs[0].page_content == "how do i pay my visa"
+
+
+def test_ivf_search_matches_exact_search_when_probing_every_list():
+    rng = np.random.default_rng(1)
+    texts = [str(i) for i in range(200)]
+    vectors = rng.normal(size=(200, 16))
+
+    class MatrixEmbeddings(Embeddings):
+        def embed_documents(self, texts):
+            return [vectors[int(text)] for text in texts]
+
+        def embed_query(self, text):
+            return vectors[int(text)]
+
+    exact = LocalVectorIndex.from_texts(texts, MatrixEmbeddings())
+    approx = LocalVectorIndex.from_texts(texts, MatrixEmbeddings(), nlist=8, nprobe=8)
+
+    queries = rng.normal(size=(5, 16))
+    assert [[i for i, _ in hits] for hits in approx.search_vectors(queries, 5)] == [
+        [i for i, _ in hits] for hits in exact.search_vectors(queries, 5)
+    ]
+
+
+def test_chunk_store_is_columnar_and_memory_mapped(tmp_path):
+    texts = ["how do i pay my fees", "wo ist die bibliothek? ümlaut", ""]
+    metadatas = [
+        {"source": "fees.csv", "row_start": 0},
+        {"source": "library.csv", "row_start": 4},
+        {"source": "fees.csv", "row_start": 7, "note": "empty"},
+    ]
+    ChunkStore.from_records(texts, metadatas).save(str(tmp_path))
+
+    store = ChunkStore.load(str(tmp_path))
+    assert isinstance(store.texts.blob, np.memmap)
+    assert list(store.texts) == texts
+    assert list(store.metadatas) == metadatas
+    assert store.values["source"] == ["fees.csv", "library.csv"]
@@ -0,0 +1,63 @@
+import json
+import logging
+import os
+
+import pytest
+
+from config import settings
+
+
+@pytest.fixture
+def fresh_logging(monkeypatch):
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    monkeypatch.setattr(settings, "_log_listener", None)
+    yield
+    if settings._log_listener is not None:
+        settings._stop_listener(settings._log_listener)
+        for handler in settings._log_listener.handlers:
+            handler.close()
+    root.handlers, root.level = handlers, level
+
+
+def test_setup_logger_configures_once(tmp_path, fresh_logging):
+    settings.setup_logger(str(tmp_path))
+    settings.setup_logger(str(tmp_path))
+    settings.setup_logger(str(tmp_path), enable_console=True)
+
+    queue_handlers = [
+        handler
+        for handler in logging.getLogger().handlers
+        if isinstance(handler, logging.handlers.QueueHandler)
+    ]
+    assert len(queue_handlers) == 1
+    assert len(settings._log_listener.handlers) == 2
+
+
+def test_json_format_is_written_by_the_listener(tmp_path, fresh_logging, monkeypatch):
+    monkeypatch.setenv("LOG_FILE", "app.log")
+    monkeypatch.setenv("LOG_FORMAT", "json")
+    settings.setup_logger(str(tmp_path))
+
+    logging.info("Answered in %d ms", 12)
+    settings._log_listener.stop()
+
+    with open(tmp_path / "app.log") as f:
+        entry = json.loads(f.readline())
+    assert entry["level"] == "INFO"
+    assert entry["message"] == "Answered in 12 ms"
+
+
+def test_file_rotates_by_size(tmp_path, fresh_logging, monkeypatch):
+    monkeypatch.setenv("LOG_FILE", "app.log")
+    monkeypatch.setenv("LOG_MAX_BYTES", "200")
+    monkeypatch.setenv("LOG_BACKUP_COUNT", "3")
+    settings.setup_logger(str(tmp_path))
+
+    for index in range(20):
+        logging.info(f"message number {index}")
+    settings._log_listener.stop()
+
+    rotated = [name for name in os.listdir(tmp_path) if name != "app.log"]
+    assert 1 <= len(rotated) <= 3
+    assert os.path.getsize(tmp_path / "app.log") < 200
@@ -0,0 +1,53 @@
+import os
+
+from pipeline import Manifest, load_chunks
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_manifest_tracks_changed_and_deleted_sources(tmp_path):
+    source, output = tmp_path / "a.txt", tmp_path / "a.out"
+    write(source, "one")
+    write(output, "derived")
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+
+    assert manifest.changed("qa", [str(source)]) == [str(source)]
+    manifest.record("qa", str(source), [str(output)])
+    manifest.save()
+
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    assert manifest.changed("qa", [str(source)]) == []
+
+    write(source, "two")
+    assert manifest.changed("qa", [str(source)]) == [str(source)]
+
+    assert manifest.deleted("qa", []) == [str(source)]
+    manifest.forget("qa", str(source))
+    assert not os.path.exists(output)
+
+
+def test_load_chunks_only_resplits_changed_files(tmp_path):
+    data, chunks = tmp_path / "data", tmp_path / "chunks"
+    data.mkdir()
+    write(data / "fees.csv", "question,answer\nhow do i pay?,online\n")
+    write(data / "visa.csv", "question,answer\ndo i need a visa?,yes\n")
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+
+    documents = load_chunks(str(data), str(chunks), manifest=manifest)
+    assert [doc.page_content for doc in documents] == [
+        "question: how do i pay?\nanswer: online",
+        "question: do i need a visa?\nanswer: yes",
+    ]
+    assert manifest.changed("chunks", [str(data / "fees.csv")]) == []
+
+    os.remove(data / "visa.csv")
+    write(data / "fees.csv", "question,answer\nhow do i pay?,by card\n")
+    documents = load_chunks(str(data), str(chunks), manifest=manifest)
+    assert [doc.page_content for doc in documents] == [
+        "question: how do i pay?\nanswer: by card"
+    ]
+    assert documents[0].metadata == {"source": "fees.csv", "row_start": 0, "row_end": 0}
+    assert sorted(os.listdir(chunks)) == ["fees.csv.json"]
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import logging
+from unittest.mock import patch
+
+from utils import time_execution
+from utils.metrics import Histogram, MetricsRegistry, get_registry
+from utils.tracing import LLMTraceHandler, span, start_trace
+
+
+def test_histogram_percentiles_over_recent_window():
+    histogram = Histogram(window=100)
+    for value in range(1, 201):
+        histogram.observe(float(value))
+
+    summary = histogram.snapshot()
+    assert summary["count"] == 200
+    assert summary["max"] == 200.0
+    assert summary["mean"] == 100.5
+    # percentiles only see the last 100 observations, 101..200
+    assert 150 <= summary["p50"] <= 151
+    assert 199 <= summary["p99"] <= 200
+
+
+def test_registry_snapshot_and_dump(tmp_path):
+    registry = MetricsRegistry()
+    registry.observe("stage.llm", 0.5)
+    registry.increment("tokens.total", 12)
+    registry.register_source("response_cache", lambda: {"hit_rate": 0.25})
+
+    registry.dump(str(tmp_path / "metrics.json"))
+    with open(tmp_path / "metrics.json") as f:
+        snapshot = json.load(f)
+    assert snapshot["histograms"]["stage.llm"]["p50"] == 0.5
+    assert snapshot["counters"] == {"tokens.total": 12}
+    assert snapshot["response_cache"] == {"hit_rate": 0.25}
+
+
+@patch("logging.info")
+def test_time_execution_times_coroutines_until_done(mock_logging_info):
+    @time_execution
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    assert asyncio.run(slow()) == "done"
+    message = mock_logging_info.call_args[0][0]
+    assert message.startswith("Execution time of slow: ")
+    assert float(message.split(": ")[1].split(" ")[0]) >= 0.05
+    assert get_registry().histograms["execution.slow"].count >= 1
+
+
+def test_trace_collects_spans_across_tasks_and_threads(caplog):
+    def search():
+        with span("vector_search"):
+            pass
+
+    async def handle():
+        with start_trace("test_request", user="u1") as trace:
+            with span("query_embedding"):
+                await asyncio.sleep(0.01)
+            await asyncio.gather(asyncio.to_thread(search))
+
+            handler = LLMTraceHandler()
+            handler.on_llm_start({}, ["prompt"])
+            for token in ["Pay", " online"]:
+                handler.on_llm_new_token(token)
+            handler.on_llm_end(None)
+        return trace
+
+    with caplog.at_level(logging.INFO):
+        trace = asyncio.run(handle())
+
+    assert [stage for stage, _, _ in trace.spans] == [
+        "query_embedding",
+        "vector_search",
+        "llm_first_token",
+        "llm",
+    ]
+    logged = json.loads(caplog.records[-1].getMessage().split("Trace ", 1)[1])
+    assert logged["trace"] == "test_request" and logged["user"] == "u1"
+    histograms = get_registry().histograms
+    assert histograms["tokens.completion"].samples[-1] == 2
+    assert histograms["request.test_request"].count >= 1
@@ -0,0 +1,59 @@
+from langchain_core.documents import Document
+
+from core import pack_context
+from core.packing import trim_to_relevant
+from utils.tokens import count_tokens, split_by_tokens
+
+ADVISER = (
+    "question: what is an adviser of studies?\n"
+    "answer: an adviser of studies is an academic member of staff who provides "
+    "expert advice and guidance on academic matters"
+)
+
+
+def test_trim_keeps_most_relevant_sentences_in_order():
+    text = (
+        "The library opens at nine. Fees are paid online. "
+        "Late fees are charged after a week. Parking is free."
+    )
+    trimmed = trim_to_relevant("how are fees paid", text, max_tokens=18)
+    assert trimmed == "Fees are paid online.\nLate fees are charged after a week."
+    assert trim_to_relevant("fees", "Short.", max_tokens=15) == "Short."
+
+
+def test_pack_context_dedups_and_respects_budget():
+    documents = [
+        Document(page_content=ADVISER),
+        Document(page_content=ADVISER.replace("?", "")),  # overlapping csv copy
+        Document(page_content="question: where do i pay fees?\nanswer: online"),
+        Document(page_content="question: when is graduation?\nanswer: in june"),
+    ]
+    budget = count_tokens(ADVISER) + 12
+
+    packed, tokens = pack_context(
+        "adviser of studies", documents, token_budget=budget, chunk_max_tokens=100
+    )
+    assert [doc.page_content for doc in packed[:2]] == [
+        ADVISER,
+        "question: where do i pay fees?\nanswer: online",
+    ]
+    assert tokens <= budget
+    assert tokens == sum(count_tokens(doc.page_content) for doc in packed)
+
+
+def test_trim_keeps_whole_question_answer_rows():
+    rows = [
+        "question: where do i pay fees?\nanswer: online",
+        "question: when is graduation?\nanswer: in june",
+        "question: can fees be paid in instalments?\nanswer: yes, three",
+    ]
+    trimmed = trim_to_relevant("paying fees", "\n".join(rows), max_tokens=30)
+    assert trimmed == "\n".join([rows[0], rows[2]])
+
+
+def test_split_by_tokens_splits_long_lines_on_words():
+    line = " ".join(f"word{i}" for i in range(200))
+    segments = split_by_tokens(f"short line\n{line}", max_tokens=20)
+    assert segments[0] == "short line"
+    assert " ".join(segments[1:]) == line
+    assert all(count_tokens(segment) <= 20 for segment in segments)
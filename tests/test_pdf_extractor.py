@@ -0,0 +1,62 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+
+from pipeline.pdf_extractor import PdfJob, extract_page_range, extract_texts_from_pdfs
+
+PDF_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "files", "Postgraduate-Research-Publication.pdf"
+)
+
+
+def sequential_text(pdf_path, pages=None):
+    reader = PdfReader(pdf_path)
+    text = ""
+    for page in reader.pages[:pages]:
+        text += page.extract_text() + "\n"
+    return text.lower()
+
+
+def test_parallel_extraction_matches_sequential(tmp_path):
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        results = extract_texts_from_pdfs(
+            [PDF_PATH], str(tmp_path), executor, pages_per_task=5
+        )
+
+    txt_path = results[PDF_PATH]
+    assert txt_path == str(tmp_path / "postgraduate-research-publication.txt")
+    with open(txt_path, encoding="utf-8") as f:
+        assert f.read() == sequential_text(PDF_PATH)
+    # part files and checkpoint are cleaned up
+    assert os.listdir(tmp_path) == ["postgraduate-research-publication.txt"]
+
+
+def test_page_range_resumes_after_last_completed_page(tmp_path):
+    part_path = str(tmp_path / "part.txt")
+    assert extract_page_range(PDF_PATH, 0, 3, part_path) == 3
+    with open(part_path, encoding="utf-8") as f:
+        expected = f.read()
+
+    # simulate a crash after the first page, mid-way through writing the second
+    first_page = sequential_text(PDF_PATH, pages=1).encode("utf-8")
+    with open(f"{part_path}.progress", "w") as f:
+        json.dump({"pages": 1, "bytes": len(first_page)}, f)
+    with open(part_path, "wb") as f:
+        f.write(first_page + b"half a pa")
+
+    assert extract_page_range(PDF_PATH, 0, 3, part_path) == 2
+    with open(part_path, encoding="utf-8") as f:
+        assert f.read() == expected
+
+
+def test_checkpoint_skips_completed_ranges(tmp_path):
+    job = PdfJob(PDF_PATH, str(tmp_path), pages_per_task=10)
+    first = job.pending[0]
+    extract_page_range(PDF_PATH, *first, job.part_path(first))
+    job.complete(first, first[1] - first[0])
+
+    resumed = PdfJob(PDF_PATH, str(tmp_path), pages_per_task=10)
+    assert first not in resumed.pending
+    assert len(resumed.pending) == len(resumed.checkpoint["ranges"]) - 1
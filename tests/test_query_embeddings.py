@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from cache import CachedQueryEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self, fail=False):
+        self.requests = []
+        self.fail = fail
+
+    def embed_documents(self, texts):
+        self.requests.append(list(texts))
+        if self.fail:
+            raise RuntimeError("embedding service down")
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        await asyncio.sleep(0.01)
+        return self.embed_documents(texts)
+
+
+def test_repeated_queries_are_embedded_once():
+    embeddings = CountingEmbeddings()
+    cached = CachedQueryEmbeddings(embeddings)
+
+    assert cached.embed_query("Fees?") == cached.embed_query("fees") == [5.0]
+    assert embeddings.requests == [["Fees?"]]
+    assert cached.stats()["hits"] == 1
+
+
+def test_concurrent_queries_share_one_request():
+    embeddings = CountingEmbeddings()
+    cached = CachedQueryEmbeddings(embeddings, batch_window=0.02)
+    queries = ["fees", "Fees!", "visa", "library hours", "enrolment"]
+
+    async def run():
+        return await asyncio.gather(*(cached.aembed_query(q) for q in queries))
+
+    vectors = asyncio.run(run())
+    assert vectors == [[4.0], [4.0], [4.0], [13.0], [9.0]]
+    assert embeddings.requests == [["fees", "visa", "library hours", "enrolment"]]
+    assert cached.stats()["average_batch_size"] == 4
+
+    asyncio.run(run())  # all cached now
+    assert len(embeddings.requests) == 1
+
+
+def test_batches_are_capped_and_errors_reach_every_caller():
+    embeddings = CountingEmbeddings()
+    cached = CachedQueryEmbeddings(embeddings, batch_window=0.02, max_batch_size=2)
+
+    async def run(queries):
+        return await asyncio.gather(
+            *(cached.aembed_query(q) for q in queries), return_exceptions=True
+        )
+
+    asyncio.run(run(["a", "bb", "ccc"]))
+    assert embeddings.requests == [["a", "bb"], ["ccc"]]
+
+    embeddings.fail = True
+    errors = asyncio.run(run(["dddd", "dddd?"]))
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    with pytest.raises(RuntimeError):
+        asyncio.run(cached.aembed_query("dddd"))  # failures are not cached
+
+
+def test_short_responses_fail_the_unanswered_callers():
+    class ShortEmbeddings(CountingEmbeddings):
+        async def aembed_documents(self, texts):
+            return (await super().aembed_documents(texts))[:1]
+
+    cached = CachedQueryEmbeddings(ShortEmbeddings(), batch_window=0.02)
+
+    async def run():
+        results = await asyncio.gather(
+            cached.aembed_query("a"), cached.aembed_query("bb"), return_exceptions=True
+        )
+        await asyncio.sleep(0.01)
+        return results, set(cached._tasks)
+
+    (first, second), tasks = asyncio.run(run())
+    assert first == [1.0]
+    assert isinstance(second, RuntimeError)
+    assert not tasks  # batch tasks are released once done
@@ -0,0 +1,51 @@
+import copy
+
+from benchmarks.rag_regression import (
+    HashingEmbeddings,
+    compare,
+    config_grid,
+    run_benchmark,
+)
+
+ROWS = [
+    ("how do i pay my tuition fees", "pay online through the student portal"),
+    ("when does enrolment open", "enrolment opens in august"),
+    ("where is the library", "the library is on the main campus"),
+    ("who do i contact about visas", "email the international student office"),
+]
+
+
+def test_hashing_embeddings_are_deterministic_and_word_based():
+    embeddings = HashingEmbeddings()
+    fees, fees_again, library = embeddings.embed_documents(
+        ["tuition fees", "tuition fees", "library hours"]
+    )
+    assert fees == fees_again
+    assert sum(a * b for a, b in zip(fees, fees_again)) > sum(
+        a * b for a, b in zip(fees, library)
+    )
+
+
+def test_benchmark_sweeps_the_grid_and_flags_regressions(tmp_path):
+    (tmp_path / "faq.csv").write_text(
+        "question,answer\n" + "".join(f"{q},{a}\n" for q, a in ROWS)
+    )
+    grid = config_grid([200, 1000], [0], [1, 2], ["hybrid"])
+
+    results = run_benchmark(
+        str(tmp_path), grid, metrics=["rouge"], query_style="verbatim"
+    )
+
+    assert [run["config"] for run in results["runs"]] == grid
+    assert results["dataset"]["queries"] == 4
+    for run in results["runs"]:
+        assert run["recall_at_k"] == 1.0
+        assert run["quality"]["rouge1"] == 1.0
+        assert {"p50", "p90", "p99"} <= set(run["latency_ms"])
+        assert "vector_search" in run["stages_p50_ms"]
+    assert compare(results, results) == []
+
+    worse = copy.deepcopy(results)
+    worse["runs"][0]["recall_at_k"] = 0.5
+    worse["runs"][1]["latency_ms"]["p90"] *= 2
+    assert len(compare(results, worse)) == 2
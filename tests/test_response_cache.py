@@ -0,0 +1,60 @@
+from cache import ResponseCache, TTLCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query():
+    assert normalize_query("  How do I pay my FEES?? ") == "how do i pay my fees"
+
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache and cache.get("a") == 1
+
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_exact_and_semantic_hits():
+    cache = ResponseCache(maxsize=4, threshold=0.9)
+    cache.put("How do I pay my fees?", "Use the online portal.", [1.0, 0.0])
+
+    assert cache.get("how do i pay my fees") == "Use the online portal."
+    assert cache.get("paying tuition", [0.99, 0.05]) == "Use the online portal."
+    assert cache.get("library hours", [0.0, 1.0]) is None
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["semantic_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_frees_semantic_slots():
+    cache = ResponseCache(maxsize=2)
+    cache.put("a", "A", [1.0, 0.0, 0.0])
+    cache.put("b", "B", [0.0, 1.0, 0.0])
+    cache.put("c", "C", [0.0, 0.0, 1.0])
+
+    assert cache.get("x", [1.0, 0.0, 0.0]) is None
+    assert cache.get("y", [0.0, 0.0, 1.0]) == "C"
+
+
+def test_corpus_change_invalidates_cache():
+    version = {"value": "v1"}
+    cache = ResponseCache(fingerprint=lambda: version["value"], check_interval=0)
+    cache.put("enrolment deadline", "1st September", [1.0])
+    assert cache.get("enrolment deadline") == "1st September"
+
+    version["value"] = "v2"
+    assert cache.get("enrolment deadline") is None
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,36 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from serve import create_app
+from tests.test_core import EchoChain, make_context
+
+
+def test_query_api_answers_and_validates():
+    async def run():
+        app = create_app(make_context(EchoChain()), timeout=5)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post("/query", json={"query": "fees?"})
+            assert response.status == 200
+            assert (await response.json())["answer"] == "online through the portal"
+
+            response = await client.post("/query", json={"question": "fees?"})
+            assert response.status == 400
+            response = await client.get("/health")
+            assert await response.json() == {"status": "ok"}
+
+            metrics = await (await client.get("/metrics")).json()
+            assert metrics["histograms"]["request.answer_query"]["count"] >= 1
+            assert "hit_rate" in metrics["response_cache"]
+
+    asyncio.run(run())
+
+
+def test_query_api_times_out():
+    async def run():
+        app = create_app(make_context(EchoChain(delay=1.0)), timeout=0.05)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post("/query", json={"query": "fees?"})
+            assert response.status == 504
+
+    asyncio.run(run())
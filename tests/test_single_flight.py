@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from cache import SingleFlight
+
+
+def test_run_coalesces_concurrent_thread_calls():
+    flight = SingleFlight()
+    executions = []
+
+    def work():
+        executions.append(1)
+        time.sleep(0.1)
+        return "answer"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.run("fees", work)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["answer"] * 8
+    assert len(executions) == 1
+    assert flight.key_stats("fees") == {"calls": 8, "executions": 1, "saved": 7}
+    assert flight.stats()["top_keys"] == {"fees": {"calls": 8, "saved": 7}}
+
+    # nothing in flight any more, the next call runs again
+    assert flight.run("fees", work) == "answer"
+    assert len(executions) == 2
+
+
+def test_arun_shares_results_and_errors():
+    flight = SingleFlight()
+    executions = []
+
+    async def work(value):
+        executions.append(value)
+        await asyncio.sleep(0.05)
+        if value == "boom":
+            raise ValueError(value)
+        return value
+
+    async def run():
+        answers = await asyncio.gather(
+            *(flight.arun("a", lambda: work("a")) for _ in range(5))
+        )
+        errors = await asyncio.gather(
+            *(flight.arun("b", lambda: work("boom")) for _ in range(3)),
+            return_exceptions=True,
+        )
+        return answers, errors
+
+    answers, errors = asyncio.run(run())
+    assert answers == ["a"] * 5
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert executions == ["a", "boom"]
+    assert flight.stats()["saved"] == 6
+
+
+def test_arun_keeps_working_for_remaining_waiters_only():
+    flight = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.1)
+        finished.append(1)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.arun("k", work))
+        follower = asyncio.ensure_future(flight.arun("k", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()  # the first user navigated away
+        assert await follower == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        # when every caller gives up, the work is cancelled
+        alone = asyncio.ensure_future(flight.arun("k", work))
+        await asyncio.sleep(0.01)
+        alone.cancel()
+        await asyncio.sleep(0.15)
+
+    asyncio.run(run())
+    assert finished == [1]
@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+from translator import (
+    StubTranslator,
+    TranslationCache,
+    Translator,
+    detect_language,
+    detect_languages,
+    get_language_name,
+)
+from translator.detector import LanguageDetector, looks_english
+
+
+def test_ascii_english_skips_the_statistical_detector():
+    assert looks_english("How do I open a savings account?")
+    assert not looks_english("Bonjour comment allez vous")
+    assert not looks_english("¿Cuál es la tasa de interés?")
+    # short words shared with other languages are not evidence of english
+    assert not looks_english("Voy a la universidad")
+    assert not looks_english("Ich wohne in Berlin")
+    assert not looks_english("Is het zo dat je me kan helpen")
+
+    detector = LanguageDetector()
+    with patch.object(detector.factory, "create") as create:
+        assert detector.detect("What is the interest rate?").language == "en"
+    create.assert_not_called()
+
+    # and such text falls through to langdetect
+    assert detector.detect("Voy a la universidad en Madrid").language == "es"
+    assert detector.detect("Ich wohne in Berlin mit meiner Familie").language == "de"
+
+
+def test_detection_runs_one_pass_and_is_memoized_per_normalized_text():
+    detector = LanguageDetector()
+    with patch.object(
+        detector.factory, "create", wraps=detector.factory.create
+    ) as create:
+        first = detector.detect("Quel est le taux d'intérêt ?")
+        second = detector.detect("quel est le taux d'intérêt")
+
+    assert create.call_count == 1
+    assert first == second
+    assert first.language == "fr"
+    assert first.probabilities[0][0] == "fr"
+
+
+def test_detect_language_reports_errors_and_names():
+    assert detect_language("12345")[0] == "error"
+    assert get_language_name("Wie hoch ist der Zinssatz für ein Darlehen?") == "german"
+    assert detect_languages(["hello, how are you", "12345"]) == ["en", "unknown"]
+
+
+def test_translator_batches_distinct_texts_and_persists_translations(tmp_path):
+    backend = StubTranslator()
+    translator = Translator(
+        backend, TranslationCache(str(tmp_path / "t.sqlite3")), batch_size=2
+    )
+
+    texts = ["un", "deux", "un", "trois", ""]
+    assert translator.translate(texts, "fr", "en") == texts
+    assert [request[0] for request in backend.requests] == [["un", "deux"], ["trois"]]
+
+    # a new process reuses the translations on disk
+    backend = StubTranslator()
+    translator = Translator(backend, TranslationCache(str(tmp_path / "t.sqlite3")))
+    translator.translate(["deux", "trois"], "fr", "en")
+    translator.translate(["deux"], "en", "en")
+    assert backend.requests == []
+    assert translator.stats()["hit_rate"] == 1.0
@@ -23,3 +23,21 @@ def test_time_execution_decorator(mock_logging_info):
     log_call_args = mock_logging_info.call_args[0][0]
     assert log_call_args.startswith("Execution time of test_function: ")
     assert " sec." in log_call_args
+
+
+@patch("logging.info")
+def test_stream_handler_forwards_tokens_and_logs_first_token(mock_logging_info):
+    from utils.streaming import StreamHandler
+
+    received = []
+    handler = StreamHandler(received.append, name="get_query_response")
+    handler.on_llm_start({}, ["prompt"])
+    for token in ["Pay ", "online", "."]:
+        handler.on_llm_new_token(token)
+
+    assert received == ["Pay ", "online", "."]
+    assert handler.text == "Pay online."
+    assert mock_logging_info.call_count == 1
+    assert mock_logging_info.call_args[0][0].startswith(
+        "Time to first token of get_query_response: "
+    )
@@ -7,35 +7,48 @@ import logging
 from functools import lru_cache
 from typing import List, Tuple, Union
 
-from langdetect import DetectorFactory, detect, detect_langs
 from langdetect.lang_detect_exception import LangDetectException
 
-from config.settings import LANGUAGES_FILE, LOG_DIR, setup_logger
-
-# setup logging
-setup_logger(LOG_DIR)
-
-# Setting the seed to ensure consistent results
-DetectorFactory.seed = 0
-
-ENGLISH = "en"
+from config.settings import LANGUAGES_FILE
+from utils.tracing import span
+
+from .detector import (
+    ENGLISH,
+    Detection,
+    LanguageDetector,
+    get_language_detector,
+    looks_english,
+)
+from .translation import (
+    OpenAITranslator,
+    StubTranslator,
+    TranslationCache,
+    Translator,
+    get_translator,
+)
 
 
 def detect_language(text: str) -> Tuple[str, Union[List[str], str]]:
     try:
-        # Detect the most probable language
-        language = detect(text)
-
-        # Detect languages with probabilities
-        languages_with_probabilities = [str(lang) for lang in detect_langs(text)]
-        logging.info(
-            f"detecting language: {language} with probabilities: {languages_with_probabilities}"
-        )
-        return language, languages_with_probabilities
+        with span("language_detection"):
+            detection = get_language_detector().detect(text)
     except LangDetectException as e:
-        logging.error(f"detecting language: {language}")
+        logging.error(f"detecting language failed: {e}")
         return "error", str(e)
 
+    languages_with_probabilities = [
+        f"{lang}:{prob}" for lang, prob in detection.probabilities
+    ]
+    logging.info(
+        f"detecting language: {detection.language} with probabilities: {languages_with_probabilities}"
+    )
+    return detection.language, languages_with_probabilities
+
+
+def detect_languages(texts: List[str]) -> List[str]:
+    """Top language of each text, "unknown" where it cannot be detected."""
+    return get_language_detector().detect_many(texts, default="unknown")
+
 
 @lru_cache
 def load_files():
@@ -61,8 +74,15 @@ def is_english(text: str) -> bool:
 
 
 def to_english(text: str, lang: str = None) -> str:
-    pass
+    """`text` in English; its language is detected unless `lang` is given."""
+    lang = lang or detect_language(text)[0]
+    if lang in (ENGLISH, "error"):
+        return text
+    return get_translator().translate([text], lang, ENGLISH)[0]
 
 
 def from_english(text: str, lang: str = None) -> str:
-    pass
+    """`text`, written in English, translated to `lang`."""
+    if not lang or lang in (ENGLISH, "error"):
+        return text
+    return get_translator().translate([text], ENGLISH, lang)[0]
@@ -0,0 +1,115 @@
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from langdetect.detector_factory import PROFILES_DIRECTORY, DetectorFactory
+from langdetect.lang_detect_exception import LangDetectException
+
+from cache.response_cache import normalize_query
+from cache.ttl_lru import TTLCache
+
+ENGLISH = "en"
+
+# frequent english function words that are not also words in other latin-script
+# languages
+_ENGLISH_WORDS = frozenset(
+    "and but can could did does from has have how if it its not of our should that "
+    "the their there these this we were what when where which who why with would "
+    "you your".split()
+)
+# english words that are also common in other languages ("a" es, "in" de, "me" fr,
+# "is" nl, ...): they only count next to one of the words above
+_SHARED_WORDS = frozenset(
+    "a an are as at be by do for i in is me my on or so to was will".split()
+)
+_WORD = re.compile(r"[a-z']+")
+
+
+class Detection(NamedTuple):
+    language: str
+    probabilities: List[Tuple[str, float]]
+
+
+def looks_english(text: str, min_hits: int = 2, min_ratio: float = 0.3) -> bool:
+    """
+    Cheap check for plain ASCII text made up largely of common English
+    words; anything else goes through the statistical detector.
+    """
+    if not text.isascii():
+        return False
+    words = _WORD.findall(text.lower())
+    if not words:
+        return False
+    english = sum(word in _ENGLISH_WORDS for word in words)
+    if not english:
+        return False
+    hits = english + sum(word in _SHARED_WORDS for word in words)
+    return hits >= min_hits and hits / len(words) >= min_ratio
+
+
+class LanguageDetector:
+    """
+    langdetect with its profiles loaded once, a single probabilistic pass per
+    text giving both the top language and the distribution, and results
+    memoized per normalized text.
+    """
+
+    def __init__(self, maxsize: int = 4096, seed: int = 0):
+        self.factory = DetectorFactory()
+        self.factory.load_profile(PROFILES_DIRECTORY)
+        self.factory.set_seed(seed)
+        self.cache = TTLCache(maxsize=maxsize, ttl=float("inf"))
+        self.heuristic_hits = 0
+
+    def _detect(self, text: str) -> Detection:
+        if looks_english(text):
+            self.heuristic_hits += 1
+            return Detection(ENGLISH, [(ENGLISH, 1.0)])
+        detector = self.factory.create()
+        detector.append(text)
+        # raises LangDetectException when the text has no usable features
+        probabilities = [
+            (str(lang.lang), float(lang.prob)) for lang in detector.get_probabilities()
+        ]
+        return Detection(probabilities[0][0], probabilities)
+
+    def detect(self, text: str) -> Detection:
+        key = normalize_query(text)
+        detection: Optional[Detection] = self.cache.get(key)
+        if detection is None:
+            detection = self._detect(text)
+            self.cache.set(key, detection)
+        return detection
+
+    def detect_many(
+        self, texts: Sequence[str], default: Optional[str] = None
+    ) -> List[Optional[str]]:
+        """
+        Top language of each text, detecting every distinct text once;
+        texts that cannot be detected get `default`.
+        """
+        languages: Dict[str, Optional[str]] = {}
+        for text in texts:
+            if text not in languages:
+                try:
+                    languages[text] = self.detect(text).language
+                except LangDetectException:
+                    languages[text] = default
+        return [languages[text] for text in texts]
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "heuristic_hits": self.heuristic_hits}
+
+
+_detector: Optional[LanguageDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_language_detector() -> LanguageDetector:
+    """The process-wide `LanguageDetector`, profiles loaded on first use."""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = LanguageDetector()
+    return _detector
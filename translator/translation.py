@@ -0,0 +1,272 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from configparser import ConfigParser
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence
+
+from config.settings import TRANSLATION_CACHE_FILE
+from utils.ratelimit import RETRYABLE_ERRORS, retry, retry_after
+from utils.tokens import count_tokens
+
+config = ConfigParser()
+config.read("config.ini")
+
+conf = config["DEFAULT"]
+
+PROMPT = (
+    "Translate each string of the JSON array below from the language with code "
+    '"{source}" to the language with code "{target}". Keep numbers, names, urls '
+    'and formatting as they are. Reply with a JSON object {{"translations": [...]}} '
+    "holding the translations in the same order.\n\n{texts}"
+)
+
+
+class TranslationBackend(Protocol):
+    name: str
+
+    def translate(self, texts: List[str], source: str, target: str) -> List[str]: ...
+
+
+class StubTranslator:
+    """
+    Offline backend that returns texts unchanged, for tests and for running
+    without a translation service; `requests` records every call it gets.
+    """
+
+    name = "stub"
+
+    def __init__(self):
+        self.requests: List[tuple] = []
+
+    def translate(self, texts: List[str], source: str, target: str) -> List[str]:
+        self.requests.append((list(texts), source, target))
+        return list(texts)
+
+
+class OpenAITranslator:
+    """
+    Translates a batch of texts with one chat completion request, on the
+    shared `http_client` when given, retrying transient errors `max_retries`
+    times and giving up on a request after `timeout` seconds.
+    """
+
+    name = "openai"
+
+    def __init__(
+        self,
+        model: str = "gpt-3.5-turbo-1106",
+        client=None,
+        http_client=None,
+        timeout: float = 30.0,
+        max_retries: int = 2,
+    ):
+        self.model = model
+        self.http_client = http_client
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import openai
+
+            # retries are ours, so they back off like every other OpenAI call
+            self._client = openai.OpenAI(http_client=self.http_client, max_retries=0)
+        return self._client
+
+    def translate(self, texts: List[str], source: str, target: str) -> List[str]:
+        completion = retry(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                temperature=0,
+                response_format={"type": "json_object"},
+                messages=[
+                    {
+                        "role": "user",
+                        "content": PROMPT.format(
+                            source=source,
+                            target=target,
+                            texts=json.dumps(texts, ensure_ascii=False),
+                        ),
+                    }
+                ],
+                timeout=self.timeout,
+            ),
+            RETRYABLE_ERRORS,
+            max_retries=self.max_retries,
+            retry_after=retry_after,
+        )
+        translations = json.loads(completion.choices[0].message.content).get(
+            "translations"
+        )
+        if not isinstance(translations, list) or len(translations) != len(texts):
+            if len(texts) == 1:
+                raise ValueError("Translation response does not match the request")
+            # the model merged or split entries, fall back to one text per request
+            logging.warning("Translation batch came back misaligned, retrying per text")
+            return [self.translate([text], source, target)[0] for text in texts]
+        return [str(translation) for translation in translations]
+
+
+def translation_key(backend: str, source: str, target: str, text: str) -> str:
+    return hashlib.sha256(
+        f"{backend}\x00{source}\x00{target}\x00{text}".encode("utf-8")
+    ).hexdigest()
+
+
+class TranslationCache:
+    """Persistent on-disk store of translations keyed by `translation_key`."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(id TEXT PRIMARY KEY, target TEXT NOT NULL, text TEXT NOT NULL)"
+            )
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, str]:
+        ids = list(ids)
+        found: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = ids[start : start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, text FROM translations WHERE id IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, target: str, items: Dict[str, str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (id, target, text) VALUES (?, ?, ?)",
+                [(key, target, text) for key, text in items.items()],
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+
+class Translator:
+    """
+    Translates batches of texts through `backend`, sending each distinct
+    text once and in requests of at most `batch_size` texts and
+    `max_batch_tokens` tokens. Translations are kept in `cache`, so an answer
+    served again in the same language is never sent to the backend twice.
+    """
+
+    def __init__(
+        self,
+        backend: TranslationBackend,
+        cache: Optional[TranslationCache] = None,
+        batch_size: int = 32,
+        max_batch_tokens: int = 2000,
+    ):
+        self.backend = backend
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def batches(self, texts: List[str]) -> Iterable[List[str]]:
+        batch: List[str] = []
+        tokens = 0
+        for text in texts:
+            size = count_tokens(text)
+            if batch and (
+                len(batch) >= self.batch_size or tokens + size > self.max_batch_tokens
+            ):
+                yield batch
+                batch, tokens = [], 0
+            batch.append(text)
+            tokens += size
+        if batch:
+            yield batch
+
+    def translate(self, texts: Sequence[str], source: str, target: str) -> List[str]:
+        if source == target:
+            return list(texts)
+
+        keys = {
+            text: translation_key(self.backend.name, source, target, text)
+            for text in texts
+            if text.strip()
+        }
+        translations = (
+            self.cache.get_many(keys.values()) if self.cache is not None else {}
+        )
+        missing = [text for text, key in keys.items() if key not in translations]
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        for batch in self.batches(missing):
+            results = dict(zip(batch, self.backend.translate(batch, source, target)))
+            with self._lock:
+                self.requests += 1
+            translated = {keys[text]: results[text] for text in batch}
+            if self.cache is not None:
+                self.cache.put_many(target, translated)
+            translations.update(translated)
+
+        return [translations[keys[text]] if text in keys else text for text in texts]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "requests": self.requests,
+        }
+
+
+def load_backend(name: str, http_client=None) -> TranslationBackend:
+    if name == "openai":
+        return OpenAITranslator(
+            conf.get("translation_model", "gpt-3.5-turbo-1106"),
+            http_client=http_client,
+            timeout=conf.getfloat("translation_timeout", 30),
+            max_retries=conf.getint("translation_max_retries", 2),
+        )
+    if name in ("stub", "none"):
+        return StubTranslator()
+    raise ValueError(f"Unknown translation backend: {name}")
+
+
+_translator: Optional[Translator] = None
+_translator_lock = threading.Lock()
+
+
+def get_translator(http_client=None) -> Translator:
+    """
+    The process-wide `Translator`, with the backend set in config.ini; the
+    first caller's `http_client` is the connection pool it uses.
+    """
+    global _translator
+    if _translator is None:
+        with _translator_lock:
+            if _translator is None:
+                _translator = Translator(
+                    load_backend(
+                        conf.get("translation_backend", "openai"), http_client
+                    ),
+                    TranslationCache(TRANSLATION_CACHE_FILE),
+                    batch_size=conf.getint("translation_batch_size", 32),
+                    max_batch_tokens=conf.getint("translation_batch_tokens", 2000),
+                )
+    return _translator
@@ -1,3 +1,4 @@
+import inspect
 import logging
 import time
 from functools import wraps
@@ -5,21 +6,39 @@ from functools import wraps
 import pyfiglet
 from termcolor import colored
 
-from config.settings import LOG_DIR, BotConfig, setup_logger
+from config.settings import BotConfig
+from utils.metrics import get_registry
 
-# setup logging
-setup_logger(LOG_DIR)
+
+def _record_execution(name: str, execution_time: float) -> None:
+    get_registry().observe(f"execution.{name}", execution_time)
+    logging.info(f"Execution time of {name}: {execution_time:.4f} sec.")
 
 
 def time_execution(func):
+    """
+    Log the execution time of `func` and add it to the `execution.<name>`
+    histogram. Coroutine functions are timed until they complete.
+    """
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _record_execution(func.__name__, time.perf_counter() - start_time)
+
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         start_time = time.perf_counter()
-        result = func(*args, **kwargs)
-        end_time = time.perf_counter()
-        execution_time = end_time - start_time
-        logging.info(f"Execution time of {func.__name__}: {execution_time:.4f} sec.")
-        return result
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record_execution(func.__name__, time.perf_counter() - start_time)
 
     return wrapper
 
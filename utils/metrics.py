@@ -0,0 +1,122 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """
+    Count, sum and max of every observation, plus the most recent `window` of
+    them for percentiles. Observing is O(1); percentiles are computed on read.
+    """
+
+    def __init__(self, window: int = 2048):
+        self.samples: "deque[float]" = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> dict:
+        summary = {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+        values = np.percentile(list(self.samples), PERCENTILES) if self.samples else []
+        for percentile, value in zip(PERCENTILES, values):
+            summary[f"p{percentile}"] = float(value)
+        return summary
+
+
+class MetricsRegistry:
+    """
+    In-process metrics: histograms (latencies in seconds, token counts),
+    counters, and sources, callables whose dict is read at snapshot time, such
+    as a cache's `stats`.
+    """
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.sources: Dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.window)
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def register_source(self, name: str, source: Callable[[], dict]) -> None:
+        with self._lock:
+            self.sources[name] = source
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            histograms = {
+                name: histogram.snapshot()
+                for name, histogram in sorted(self.histograms.items())
+            }
+            counters = dict(sorted(self.counters.items()))
+            sources = dict(self.sources)
+        return {
+            "histograms": histograms,
+            "counters": counters,
+            **{name: source() for name, source in sources.items()},
+        }
+
+    def dump(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    """The process-wide `MetricsRegistry`."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+
+async def dump_periodically(path: str, interval: float = 60.0) -> None:
+    """Write the registry snapshot to `path` every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(get_registry().dump, path)
+        except OSError as e:
+            logging.error(f"Could not write metrics to '{path}': {e}")
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+
+import openai
+
+T = TypeVar("T")
+
+# OpenAI errors worth retrying: 429, connection failures and 5xx
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens are added per second up to `capacity`,
+    and `acquire(n)` waits until n tokens are available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, amount: float) -> "TokenBucket":
+        return cls(rate=amount / 60, capacity=amount)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        # a request larger than the bucket would wait forever, let it drain it
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+
+def backoff_delay(
+    attempt: int, base: float = 1.0, maximum: float = 60.0, jitter: bool = True
+) -> float:
+    """Exponential delay for retry `attempt` (0-based), with full jitter."""
+    delay = min(maximum, base * 2**attempt)
+    return random.uniform(0, delay) if jitter else delay
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """The Retry-After delay of an API error's response, if it sent one."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _retry_delay(
+    error: BaseException,
+    attempt: int,
+    max_retries: int,
+    base: float,
+    maximum: float,
+    retry_after: Optional[Callable[[BaseException], Optional[float]]],
+) -> float:
+    delay = (retry_after(error) if retry_after else None) or backoff_delay(
+        attempt, base, maximum
+    )
+    logging.warning(
+        f"Retrying after {type(error).__name__} in {delay:.2f} sec. "
+        f"(attempt {attempt + 1}/{max_retries})"
+    )
+    return delay
+
+
+async def retry_async(
+    func: Callable[[], Awaitable[T]],
+    retry_on: Tuple[Type[BaseException], ...],
+    max_retries: int = 5,
+    base: float = 1.0,
+    maximum: float = 60.0,
+    retry_after: Optional[Callable[[BaseException], Optional[float]]] = None,
+) -> T:
+    """
+    Await `func()`, retrying on `retry_on` exceptions with exponential backoff.
+    `retry_after` may extract a server-provided delay from the exception.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await func()
+        except retry_on as e:
+            if attempt >= max_retries:
+                raise
+            await asyncio.sleep(
+                _retry_delay(e, attempt, max_retries, base, maximum, retry_after)
+            )
+            attempt += 1
+
+
+def retry(
+    func: Callable[[], T],
+    retry_on: Tuple[Type[BaseException], ...],
+    max_retries: int = 5,
+    base: float = 1.0,
+    maximum: float = 60.0,
+    retry_after: Optional[Callable[[BaseException], Optional[float]]] = None,
+) -> T:
+    """`retry_async` for blocking calls, e.g. from worker threads."""
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except retry_on as e:
+            if attempt >= max_retries:
+                raise
+            time.sleep(
+                _retry_delay(e, attempt, max_retries, base, maximum, retry_after)
+            )
+            attempt += 1
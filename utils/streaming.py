@@ -0,0 +1,42 @@
+import logging
+import time
+from typing import Any, Callable, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class StreamHandler(BaseCallbackHandler):
+    """
+    Forwards LLM tokens to `on_token` as they arrive and logs the time to
+    first token. `text` is the answer so far, joined only when read.
+    """
+
+    # called on the event loop in async runs, so tokens are forwarded in order
+    run_inline = True
+
+    def __init__(self, on_token: Callable[[str], None], name: str = "llm"):
+        self.on_token = on_token
+        self.name = name
+        self.tokens: List[str] = []
+        self.start_time: Optional[float] = None
+        self.first_token_time: Optional[float] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.tokens)
+
+    def on_llm_start(self, *args: Any, **kwargs: Any) -> None:
+        self.tokens = []
+        self.start_time = time.perf_counter()
+        self.first_token_time = None
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self.first_token_time is None:
+            self.first_token_time = time.perf_counter()
+            if self.start_time is not None:
+                logging.info(
+                    f"Time to first token of {self.name}: "
+                    f"{self.first_token_time - self.start_time:.4f} sec."
+                )
+        self.tokens.append(token)
+        self.on_token(token)
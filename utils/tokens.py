@@ -0,0 +1,73 @@
+import logging
+from functools import lru_cache
+from typing import Callable, List
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+
+@lru_cache
+def get_token_counter(model: str = DEFAULT_MODEL) -> Callable[[str], int]:
+    """
+    Token counter for `model`. tiktoken downloads its encodings on first use,
+    so offline we fall back to the usual ~4 characters per token estimate.
+    """
+    try:
+        import tiktoken
+
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        logging.warning(f"tiktoken unavailable ({e}), estimating token counts")
+        return lambda text: (len(text) + 3) // 4
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    return get_token_counter(model)(text)
+
+
+def split_by_tokens(
+    text: str, max_tokens: int, model: str = DEFAULT_MODEL
+) -> List[str]:
+    """
+    Split `text` into segments of at most `max_tokens`, on line boundaries where
+    possible and on words for lines that are too long on their own.
+    """
+    count = get_token_counter(model)
+    segments: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush() -> None:
+        nonlocal current, current_tokens
+        if current:
+            segments.append("\n".join(current))
+        current, current_tokens = [], 0
+
+    for line in text.splitlines():
+        tokens = count(line) + 1
+        if tokens > max_tokens:
+            flush()
+            words: List[str] = []
+            words_tokens = 0
+            for word in line.split(" "):
+                # a running count: re-counting the joined words is quadratic
+                word_tokens = count(" " + word) if words else count(word)
+                if words and words_tokens + word_tokens > max_tokens:
+                    segments.append(" ".join(words))
+                    words, words_tokens = [], 0
+                    word_tokens = count(word)
+                words.append(word)
+                words_tokens += word_tokens
+            if words:
+                segments.append(" ".join(words))
+            continue
+        if current_tokens + tokens > max_tokens:
+            flush()
+        current.append(line)
+        current_tokens += tokens
+
+    flush()
+    return segments
@@ -0,0 +1,117 @@
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.metrics import get_registry
+
+
+class Trace:
+    """The spans of one request, as (stage, start offset, seconds)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.start_time = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []
+        self.attributes: Dict[str, Any] = {}
+
+    def add(self, stage: str, start_time: float, seconds: float) -> None:
+        self.spans.append((stage, start_time - self.start_time, seconds))
+
+    def to_dict(self) -> dict:
+        return {
+            "trace": self.name,
+            "trace_id": self.trace_id,
+            "seconds": round(time.perf_counter() - self.start_time, 6),
+            "spans": [
+                {"stage": stage, "start": round(start, 6), "seconds": round(s, 6)}
+                for stage, start, s in self.spans
+            ],
+            **self.attributes,
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def record_span(stage: str, seconds: float, start_time: Optional[float] = None) -> None:
+    """Record a stage measured elsewhere, into the histogram and current trace."""
+    get_registry().observe(f"stage.{stage}", seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(
+            stage,
+            start_time if start_time is not None else time.perf_counter() - seconds,
+            seconds,
+        )
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the block as `stage` of the current request."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, time.perf_counter() - start_time, start_time)
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    """
+    Trace one request: spans recorded inside the block, in this thread or in
+    tasks and threads started from it, are collected and logged as one JSON
+    line when it ends, and its total time goes to the `request.<name>` histogram.
+    """
+    trace = Trace(name)
+    trace.attributes.update(attributes)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        get_registry().observe(
+            f"request.{name}", time.perf_counter() - trace.start_time
+        )
+        logging.info(f"Trace {json.dumps(trace.to_dict())}")
+
+
+class LLMTraceHandler(BaseCallbackHandler):
+    """Records LLM time to first token, total time and completion token count."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.start_time: Optional[float] = None
+        self.first_token = False
+        self.tokens = 0
+
+    def on_llm_start(self, *args: Any, **kwargs: Any) -> None:
+        self.start_time = time.perf_counter()
+        self.first_token = False
+        self.tokens = 0
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.tokens += 1
+        if not self.first_token and self.start_time is not None:
+            self.first_token = True
+            record_span(
+                "llm_first_token",
+                time.perf_counter() - self.start_time,
+                self.start_time,
+            )
+
+    def on_llm_end(self, *args: Any, **kwargs: Any) -> None:
+        if self.start_time is not None:
+            record_span("llm", time.perf_counter() - self.start_time, self.start_time)
+            get_registry().observe("tokens.completion", self.tokens)
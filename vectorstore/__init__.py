@@ -0,0 +1,28 @@
+from .artifact import (
+    ArtifactIndex,
+    latest_version,
+    load_artifact,
+    prune_artifacts,
+    publish_version,
+    read_manifest,
+    write_artifact,
+)
+from .batch_embedder import BatchEmbedder, EmbeddingBatchError
+from .bm25 import BM25Index, tokenize
+from .chunk_store import ChunkStore
+from .embedding_cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    chunk_id,
+    metadata_digest,
+    sync_index,
+)
+from .faq_index import (
+    FaqIndex,
+    LatestFaqIndex,
+    load_faq_index,
+    load_faq_rows,
+    write_faq_index,
+)
+from .hybrid import HybridRetriever, load_cross_encoder, reciprocal_rank_fusion
+from .local_index import LocalVectorIndex
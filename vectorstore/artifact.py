@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from utils import time_execution
+from vectorstore.embedding_cache import CachedEmbeddings, chunk_id
+from vectorstore.local_index import LocalVectorIndex
+
+LATEST_FILE = "LATEST"
+MANIFEST_FILE = "manifest.json"
+
+################################################################
+# An artifact is an immutable directory <root>/<version>/ holding the chunks,
+# their embeddings and BM25 index (see LocalVectorIndex.save) and a manifest. <root>/LATEST
+# names the version the serving process should load.
+################################################################
+
+
+def latest_version(root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, LATEST_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_manifest(root: str, version: str) -> Dict[str, Any]:
+    with open(os.path.join(root, version, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def publish_version(root: str, version: str) -> None:
+    """Point <root>/LATEST at `version`, atomically."""
+    pointer = os.path.join(root, f".{LATEST_FILE}.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(root, LATEST_FILE))
+
+
+@time_execution
+def write_artifact(
+    root: str,
+    texts: List[str],
+    embeddings: CachedEmbeddings,
+    manifest: Optional[Dict[str, Any]] = None,
+    ann_min_chunks: int = 0,
+    metadatas: Optional[List[Dict[str, Any]]] = None,
+    publish: bool = True,
+) -> str:
+    """
+    Embed `texts` and write them, with their `metadatas`, as a new artifact
+    version, then point LATEST at it. The version is only published once every
+    file is on disk; with `publish=False` the caller publishes it with
+    `publish_version`, once whatever else must hold it is in sync.
+    """
+    ids = [chunk_id(text, embeddings.model) for text in texts]
+    digest = hashlib.sha256("".join(ids).encode()).hexdigest()[:12]
+    version = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{digest}"
+
+    if os.path.isdir(os.path.join(root, version)):
+        # same chunks within the same second, the existing artifact is identical
+        if publish:
+            publish_version(root, version)
+        return version
+
+    nlist = (
+        int(len(texts) ** 0.5) if ann_min_chunks and len(texts) >= ann_min_chunks else 0
+    )
+    index = LocalVectorIndex.from_texts(
+        texts,
+        embeddings,
+        metadatas=[
+            {**extra, "id": key}
+            for key, extra in zip(ids, metadatas or [{} for _ in texts])
+        ],
+        nlist=nlist,
+    )
+
+    staging = os.path.join(root, f".{version}.tmp")
+    index.save(staging)
+    with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                **(manifest or {}),
+                "version": version,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "embedding_model": embeddings.model,
+                "chunks": len(texts),
+                "dimensions": int(index.vectors.shape[1]) if len(texts) else 0,
+                "ivf_lists": nlist,
+            },
+            f,
+            indent=2,
+        )
+    os.replace(staging, os.path.join(root, version))
+    if publish:
+        publish_version(root, version)
+
+    logging.info(f"Index artifact {version} written with {len(texts)} chunks")
+    return version
+
+
+def prune_artifacts(root: str, keep: int = 3) -> None:
+    """Delete all but the `keep` most recent versions (never the latest one)."""
+    current = latest_version(root)
+    versions = sorted(
+        (
+            name
+            for name in os.listdir(root)
+            if not name.startswith(".")
+            and os.path.isfile(os.path.join(root, name, MANIFEST_FILE))
+        ),
+        key=lambda name: read_manifest(root, name)["created_at"],
+    )
+    for version in versions[:-keep] if keep else versions:
+        if version != current:
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+def load_artifact(
+    root: str, embedding: Embeddings, version: Optional[str] = None, nprobe: int = 8
+) -> LocalVectorIndex:
+    version = version or latest_version(root)
+    if version is None:
+        raise FileNotFoundError(
+            f"No index artifact in '{root}', build one with `python ingest.py`"
+        )
+    index = LocalVectorIndex.load(os.path.join(root, version), embedding, nprobe=nprobe)
+    index.version = version
+    return index
+
+
+class ArtifactIndex:
+    """
+    Serves the latest artifact and swaps to a newer one once LATEST moves,
+    checking at most every `check_interval` seconds. A rebuild therefore never
+    blocks or restarts the serving process.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        embedding: Embeddings,
+        nprobe: int = 8,
+        check_interval: float = 30.0,
+    ):
+        self.root = root
+        self.embedding = embedding
+        self.nprobe = nprobe
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._index = load_artifact(root, embedding, nprobe=nprobe)
+        self._checked_at = time.monotonic()
+
+    @property
+    def version(self) -> str:
+        """Version being served, after swapping to a newer one if it is due."""
+        return self.index.version
+
+    @property
+    def index(self) -> LocalVectorIndex:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            with self._lock:
+                self._checked_at = time.monotonic()
+                version = latest_version(self.root)
+                if version and version != self._index.version:
+                    logging.info(f"Switching to index artifact {version}")
+                    self._index = load_artifact(
+                        self.root, self.embedding, version, self.nprobe
+                    )
+        return self._index
+
+    def keyword_search_with_score(self, query: str, k: int = 4):
+        return self.index.keyword_search_with_score(query, k)
+
+    def similarity_search(self, query: str, k: int = 4):
+        return self.index.similarity_search(query, k)
+
+    def similarity_search_with_score(self, query: str, k: int = 4):
+        return self.index.similarity_search_with_score(query, k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4):
+        return self.index.similarity_search_by_vector(embedding, k)
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4
+    ):
+        return self.index.similarity_search_by_vector_with_score(embedding, k)
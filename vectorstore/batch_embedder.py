@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+from utils.ratelimit import RETRYABLE_ERRORS, TokenBucket, retry_after, retry_async
+from utils.tokens import count_tokens
+
+DEFAULT_MODEL = "text-embedding-ada-002"
+
+
+class EmbeddingBatchError(Exception):
+    """Some batches still failed after every retry; `failed` holds their ids."""
+
+    def __init__(self, failed: List[str]):
+        super().__init__(f"{len(failed)} texts could not be embedded")
+        self.failed = failed
+
+
+class BatchEmbedder:
+    """
+    Embeds many texts through the embeddings API in batches of at most
+    `batch_size` texts and `max_batch_tokens` tokens, with up to `concurrency`
+    requests in flight under request and token rate limits. 429/5xx responses
+    are retried with exponential backoff.
+
+    Each batch is handed to `on_batch` as soon as it arrives, so a failed batch
+    loses only its own texts and a rerun resumes from what was stored.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        model: str = DEFAULT_MODEL,
+        batch_size: int = 256,
+        max_batch_tokens: int = 50000,
+        concurrency: int = 4,
+        requests_per_minute: int = 3000,
+        tokens_per_minute: int = 1000000,
+        max_retries: int = 5,
+        retry_base: float = 1.0,
+    ):
+        self.client = client
+        self.model = model
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+
+    def _make_client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,  # retries are ours, with backoff and rate limiting
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+            ),
+        )
+
+    def batches(self, texts: Dict[str, str]) -> List[Tuple[List[str], int]]:
+        """Group ids into (ids, tokens) batches within both batch limits."""
+        batches: List[Tuple[List[str], int]] = []
+        ids: List[str] = []
+        tokens = 0
+        for key, text in texts.items():
+            size = count_tokens(text, self.model)
+            if ids and (
+                len(ids) >= self.batch_size or tokens + size > self.max_batch_tokens
+            ):
+                batches.append((ids, tokens))
+                ids, tokens = [], 0
+            ids.append(key)
+            tokens += size
+        if ids:
+            batches.append((ids, tokens))
+        return batches
+
+    async def embed_async(
+        self,
+        texts: Dict[str, str],
+        on_batch: Optional[Callable[[Dict[str, List[float]]], None]] = None,
+    ) -> Dict[str, List[float]]:
+        """
+        Embed `texts`, keyed by id, so duplicates are embedded once. Raises
+        `EmbeddingBatchError` after all other batches are done if any failed.
+        """
+        # a pooled client per run, its connections belong to this event loop
+        client = self.client or self._make_client()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        requests = TokenBucket.per_minute(self.requests_per_minute)
+        tokens = TokenBucket.per_minute(self.tokens_per_minute)
+        vectors: Dict[str, List[float]] = {}
+        failed: List[str] = []
+        started_at = time.perf_counter()
+
+        async def embed_batch(ids: List[str], batch_tokens: int) -> None:
+            # a slot is held through rate limiting and backoff, so a throttled
+            # endpoint slows the whole run down instead of queueing more requests
+            async with semaphore:
+                await requests.acquire()
+                await tokens.acquire(batch_tokens)
+                try:
+                    response = await retry_async(
+                        lambda: client.embeddings.create(
+                            model=self.model,
+                            input=[texts[key] for key in ids],
+                            encoding_format="float",
+                        ),
+                        RETRYABLE_ERRORS,
+                        max_retries=self.max_retries,
+                        base=self.retry_base,
+                        retry_after=retry_after,
+                    )
+                except Exception as e:
+                    logging.error(f"Embedding batch of {len(ids)} texts failed: {e}")
+                    failed.extend(ids)
+                    return
+
+            batch = {
+                ids[item.index]: item.embedding
+                for item in sorted(response.data, key=lambda item: item.index)
+            }
+            if on_batch is not None:
+                on_batch(batch)
+            vectors.update(batch)
+
+        try:
+            await asyncio.gather(
+                *(embed_batch(ids, size) for ids, size in self.batches(texts))
+            )
+        finally:
+            if client is not self.client:
+                await client.close()
+
+        elapsed = time.perf_counter() - started_at
+        logging.info(
+            f"Embedded {len(vectors)} chunks in {elapsed:.2f} sec. "
+            f"({len(vectors) / elapsed if elapsed else 0:.1f} chunks/sec)"
+        )
+        if failed:
+            raise EmbeddingBatchError(failed)
+        return vectors
+
+    def embed(
+        self,
+        texts: Dict[str, str],
+        on_batch: Optional[Callable[[Dict[str, List[float]]], None]] = None,
+    ) -> Dict[str, List[float]]:
+        return asyncio.run(self.embed_async(texts, on_batch))
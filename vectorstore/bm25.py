@@ -0,0 +1,120 @@
+import json
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+TERMS_FILE = "bm25_terms.json"
+OFFSETS_FILE = "bm25_offsets.npy"
+DOCS_FILE = "bm25_docs.npy"
+WEIGHTS_FILE = "bm25_weights.npy"
+
+# keeps course codes, amounts and hyphenated names whole: comp1511, 1,200.50, e-mail
+TOKEN_PATTERN = re.compile(r"\w+(?:[.,'/-]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed corpus, as an inverted index.
+
+    The postings of term `t` are `docs[offsets[t]:offsets[t + 1]]`, and each
+    posting already holds its full BM25 term weight, so a query only sums the
+    weights of its terms' postings.
+    """
+
+    def __init__(
+        self,
+        terms: Dict[str, int],
+        offsets: np.ndarray,
+        docs: np.ndarray,
+        weights: np.ndarray,
+        size: int,
+    ):
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    @classmethod
+    def from_texts(
+        cls, texts: List[str], k1: float = 1.5, b: float = 0.75
+    ) -> "BM25Index":
+        counts = [Counter(tokenize(text)) for text in texts]
+        lengths = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(texts) and lengths.any() else 1.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc, counter in enumerate(counts):
+            for term, frequency in counter.items():
+                postings.setdefault(term, []).append((doc, frequency))
+
+        terms = {term: i for i, term in enumerate(sorted(postings))}
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        docs, weights = [], []
+        for term, i in terms.items():
+            entries = postings[term]
+            offsets[i + 1] = offsets[i] + len(entries)
+            idf = np.log(1 + (len(texts) - len(entries) + 0.5) / (len(entries) + 0.5))
+            doc_ids = np.array([doc for doc, _ in entries], dtype=np.int32)
+            tf = np.array([frequency for _, frequency in entries], dtype=np.float32)
+            norm = k1 * (1 - b + b * lengths[doc_ids] / average_length)
+            docs.append(doc_ids)
+            weights.append(idf * tf * (k1 + 1) / (tf + norm))
+
+        return cls(
+            terms,
+            offsets,
+            np.concatenate(docs) if docs else np.zeros(0, dtype=np.int32),
+            (np.concatenate(weights) if weights else np.zeros(0)).astype(np.float32),
+            len(texts),
+        )
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, TERMS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"size": self.size, "terms": list(self.terms)}, f)
+        np.save(os.path.join(directory, OFFSETS_FILE), self.offsets)
+        np.save(os.path.join(directory, DOCS_FILE), self.docs)
+        np.save(os.path.join(directory, WEIGHTS_FILE), self.weights)
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, TERMS_FILE))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "BM25Index":
+        mmap_mode = "r" if mmap else None
+        with open(os.path.join(directory, TERMS_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            {term: i for i, term in enumerate(data["terms"])},
+            np.load(os.path.join(directory, OFFSETS_FILE)),
+            np.load(os.path.join(directory, DOCS_FILE), mmap_mode=mmap_mode),
+            np.load(os.path.join(directory, WEIGHTS_FILE), mmap_mode=mmap_mode),
+            data["size"],
+        )
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Top-k (row, score) pairs, only rows sharing a term with `query`."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            i = self.terms.get(term)
+            if i is not None:
+                start, end = self.offsets[i], self.offsets[i + 1]
+                scores[self.docs[start:end]] += self.weights[start:end]
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(i), float(scores[i])) for i in best]
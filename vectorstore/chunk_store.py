@@ -0,0 +1,153 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+TEXTS_FILE = "chunks.bin"
+TEXT_OFFSETS_FILE = "chunk_offsets.npy"
+COLUMNS_FILE = "chunk_columns.json"
+LEGACY_CHUNKS_FILE = "chunks.json"
+
+################################################################
+# Chunks are stored column by column: every text back to back in one utf-8
+# blob with an offsets array, and one array per metadata key. Integer columns
+# are kept as is, any other column as codes into its list of distinct values
+# (a handful of source files for thousands of chunks). Everything but the
+# small value lists is memory-mapped, so loading reads no chunk text at all.
+################################################################
+
+
+class _TextColumn(Sequence):
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+
+class _MetadataColumn(Sequence):
+    def __init__(self, columns: Dict[str, np.ndarray], values: Dict[str, list]):
+        self.columns = columns
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        metadata = {}
+        for key, column in self.columns.items():
+            value = int(column[row])
+            if key in self.values:
+                if value < 0:
+                    continue  # the chunk has no such key
+                metadata[key] = self.values[key][value]
+            else:
+                metadata[key] = value
+        return metadata
+
+
+class ChunkStore:
+    """
+    The chunk texts and metadata of an index, stored column by column.
+
+    `texts` and `metadatas` behave like lists but decode a row only when it is
+    read, so a loaded store costs neither parse time nor memory up front.
+    """
+
+    def __init__(
+        self,
+        blob: np.ndarray,
+        offsets: np.ndarray,
+        columns: Dict[str, np.ndarray],
+        values: Dict[str, list],
+    ):
+        self.texts = _TextColumn(blob, offsets)
+        self.metadatas = _MetadataColumn(columns, values)
+        self.columns = columns
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @classmethod
+    def from_records(
+        cls, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> "ChunkStore":
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        metadatas = metadatas or [{} for _ in texts]
+        keys = sorted({key for metadata in metadatas for key in metadata})
+        columns: Dict[str, np.ndarray] = {}
+        values: Dict[str, list] = {}
+        for key in keys:
+            column = [metadata.get(key) for metadata in metadatas]
+            if all(type(value) is int for value in column):
+                columns[key] = np.array(column, dtype=np.int64)
+                continue
+            distinct: Dict[Any, int] = {}
+            codes = [
+                -1 if key not in metadata else distinct.setdefault(value, len(distinct))
+                for metadata, value in zip(metadatas, column)
+            ]
+            columns[key] = np.array(codes, dtype=np.int32)
+            values[key] = list(distinct)
+        return cls(blob, offsets, columns, values)
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, TEXTS_FILE), "wb") as f:
+            f.write(np.asarray(self.texts.blob).tobytes())
+        np.save(os.path.join(directory, TEXT_OFFSETS_FILE), self.texts.offsets)
+        for key, column in self.columns.items():
+            np.save(os.path.join(directory, f"chunk_meta_{key}.npy"), column)
+        with open(os.path.join(directory, COLUMNS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"keys": list(self.columns), "values": self.values}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "ChunkStore":
+        if not os.path.exists(os.path.join(directory, COLUMNS_FILE)):
+            # artifacts written before the columnar store
+            with open(
+                os.path.join(directory, LEGACY_CHUNKS_FILE), "r", encoding="utf-8"
+            ) as f:
+                chunks = json.load(f)
+            return cls.from_records(chunks["texts"], chunks["metadatas"])
+
+        mmap_mode = "r" if mmap else None
+        with open(os.path.join(directory, COLUMNS_FILE), "r", encoding="utf-8") as f:
+            layout = json.load(f)
+        texts_path = os.path.join(directory, TEXTS_FILE)
+        if not os.path.getsize(texts_path):
+            blob = np.zeros(0, dtype=np.uint8)  # numpy cannot map an empty file
+        elif mmap:
+            blob = np.memmap(texts_path, dtype=np.uint8, mode="r")
+        else:
+            blob = np.fromfile(texts_path, dtype=np.uint8)
+        return cls(
+            blob,
+            np.load(os.path.join(directory, TEXT_OFFSETS_FILE), mmap_mode=mmap_mode),
+            {
+                key: np.load(
+                    os.path.join(directory, f"chunk_meta_{key}.npy"),
+                    mmap_mode=mmap_mode,
+                )
+                for key in layout["keys"]
+            },
+            layout["values"],
+        )
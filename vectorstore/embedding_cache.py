@@ -0,0 +1,241 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from langchain_core.embeddings import Embeddings
+
+from utils import time_execution
+from vectorstore.batch_embedder import BatchEmbedder
+
+UPSERT_BATCH_SIZE = 100
+
+
+def chunk_id(text: str, model: str) -> str:
+    """
+    Deterministic id for a chunk, derived from its text and the embedding model.
+    Used both as the cache key and as the vector id in the index.
+    """
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def metadata_digest(metadata: Any) -> str:
+    """Stable digest of JSON-like metadata, to tell when it changed."""
+    return hashlib.sha256(
+        json.dumps(metadata, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def embedding_model_name(embeddings: Embeddings) -> str:
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+class EmbeddingCache:
+    """
+    Persistent on-disk store of embeddings keyed by `chunk_id`, plus a record of
+    which ids have already been upserted into which index, with the digest of
+    the metadata they were upserted with.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(id TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS upserts "
+                "(index_name TEXT NOT NULL, id TEXT NOT NULL, digest TEXT, "
+                "PRIMARY KEY (index_name, id))"
+            )
+            columns = {
+                row[1] for row in self._conn.execute("PRAGMA table_info(upserts)")
+            }
+            if "digest" not in columns:
+                # caches written before metadata digests were recorded
+                self._conn.execute("ALTER TABLE upserts ADD COLUMN digest TEXT")
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, List[float]]:
+        ids = list(ids)
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = ids[start : start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, vector FROM embeddings WHERE id IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (id, model, vector) VALUES (?, ?, ?)",
+                [
+                    (key, model, array("f", vector).tobytes())
+                    for key, vector in items.items()
+                ],
+            )
+
+    def upserted_ids(self, index_name: str) -> Set[str]:
+        return set(self.upserted_digests(index_name))
+
+    def upserted_digests(self, index_name: str) -> Dict[str, Optional[str]]:
+        """Metadata digest of every id upserted into `index_name`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, digest FROM upserts WHERE index_name = ?", (index_name,)
+            ).fetchall()
+        return dict(rows)
+
+    def mark_upserted(
+        self,
+        index_name: str,
+        ids: Iterable[str],
+        digests: Optional[Dict[str, str]] = None,
+    ) -> None:
+        digests = digests or {}
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO upserts (index_name, id, digest) "
+                "VALUES (?, ?, ?)",
+                [(index_name, key, digests.get(key)) for key in ids],
+            )
+
+    def unmark_upserted(
+        self, index_name: str, ids: Optional[Iterable[str]] = None
+    ) -> None:
+        with self._lock, self._conn:
+            if ids is None:
+                self._conn.execute(
+                    "DELETE FROM upserts WHERE index_name = ?", (index_name,)
+                )
+            else:
+                self._conn.executemany(
+                    "DELETE FROM upserts WHERE index_name = ? AND id = ?",
+                    [(index_name, key) for key in ids],
+                )
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an `Embeddings` client so that only chunks missing from the cache are
+    sent to the embedding API. Queries are passed straight through.
+
+    With a `BatchEmbedder`, misses are embedded by it instead, in parallel
+    batches, each stored in the cache as soon as it arrives.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        cache: EmbeddingCache,
+        embedder: Optional[BatchEmbedder] = None,
+    ):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.embedder = embedder
+        self.model = embedding_model_name(embeddings)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        ids = [chunk_id(text, self.model) for text in texts]
+        found = self.cache.get_many(ids)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(ids, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        logging.info(
+            f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses"
+        )
+        if missing and self.embedder is not None:
+            found.update(
+                self.embedder.embed(
+                    missing,
+                    on_batch=lambda batch: self.cache.put_many(self.model, batch),
+                )
+            )
+        elif missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(self.model, new)
+            found.update(new)
+
+        return [found[key] for key in ids]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+@time_execution
+def sync_index(
+    index: Any,
+    index_name: str,
+    texts: List[str],
+    embeddings: CachedEmbeddings,
+    text_key: str = "text",
+    metadatas: Optional[List[Dict[str, Any]]] = None,
+) -> None:
+    """
+    Bring `index` in line with `texts`: upsert only chunks the index does not hold
+    yet, or holds with different metadata, and delete vectors whose chunk no
+    longer exists. Vector ids come from `chunk_id`, so restarts never create
+    duplicates. `metadatas` are stored with the vectors, next to the text.
+    """
+    cache = embeddings.cache
+
+    # the local record is meaningless if the index was wiped or recreated
+    stats = index.describe_index_stats()
+    if not stats.get("total_vector_count"):
+        cache.unmark_upserted(index_name)
+
+    wanted: Dict[str, str] = {}
+    metadata: Dict[str, Dict[str, Any]] = {}
+    for text, extra in zip(texts, metadatas or [{} for _ in texts]):
+        key = chunk_id(text, embeddings.model)
+        wanted.setdefault(key, text)
+        metadata.setdefault(key, {**extra, text_key: text})
+
+    digests = {key: metadata_digest(extra) for key, extra in metadata.items()}
+    upserted = cache.upserted_digests(index_name)
+    new_ids = [key for key in wanted if upserted.get(key) != digests[key]]
+    stale_ids = [key for key in upserted if key not in wanted]
+
+    if new_ids:
+        vectors = embeddings.embed_documents([wanted[key] for key in new_ids])
+        for start in range(0, len(new_ids), UPSERT_BATCH_SIZE):
+            batch = new_ids[start : start + UPSERT_BATCH_SIZE]
+            index.upsert(
+                vectors=[
+                    {
+                        "id": key,
+                        "values": vector,
+                        "metadata": metadata[key],
+                    }
+                    for key, vector in zip(
+                        batch, vectors[start : start + UPSERT_BATCH_SIZE]
+                    )
+                ]
+            )
+            cache.mark_upserted(index_name, batch, digests)
+
+    for start in range(0, len(stale_ids), UPSERT_BATCH_SIZE):
+        batch = stale_ids[start : start + UPSERT_BATCH_SIZE]
+        index.delete(ids=batch)
+        cache.unmark_upserted(index_name, batch)
+
+    logging.info(
+        f"Index '{index_name}' synced: {len(new_ids)} upserted, "
+        f"{len(stale_ids)} deleted, {len(wanted) - len(new_ids)} unchanged"
+    )
@@ -0,0 +1,241 @@
+import csv
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from cache.response_cache import normalize_query
+from vectorstore.artifact import (
+    MANIFEST_FILE,
+    latest_version,
+    publish_version,
+    read_manifest,
+)
+from vectorstore.embedding_cache import metadata_digest
+from vectorstore.local_index import normalize
+
+FAQ_FILE = "faq.json"
+FAQ_VECTORS_FILE = "faq_embeddings.npy"
+
+ENGLISH = "en"
+
+################################################################
+# Like the index artifacts, every FAQ index is written to its own immutable
+# directory <root>/<version>/ and published by moving <root>/LATEST, so a
+# process starting mid-ingest never loads half of one.
+################################################################
+
+
+def load_faq_rows(data_directory: str) -> List[Tuple[str, str, str]]:
+    """
+    (question, answer, source) for every question row of the knowledge-base
+    CSVs, keeping the first answer of questions that appear more than once.
+    """
+    rows: Dict[str, Tuple[str, str, str]] = {}
+    pattern = os.path.join(data_directory, "**", "*.csv")
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                question = (row.get("question") or "").strip()
+                answer = (row.get("answer") or "").strip()
+                if question and answer:
+                    rows.setdefault(
+                        normalize_query(question),
+                        (question, answer, os.path.basename(path)),
+                    )
+    return list(rows.values())
+
+
+class FaqIndex:
+    """
+    Canonical answers to the FAQ questions of the knowledge base, optionally
+    translated ahead of time, with an exact and a nearest-question lookup, so
+    known questions are answered without retrieval or an LLM call.
+    """
+
+    def __init__(
+        self,
+        questions: List[str],
+        answers: Dict[str, List[str]],
+        vectors: np.ndarray,
+        sources: Optional[List[str]] = None,
+    ):
+        self.questions = questions
+        self.answers = answers
+        self.vectors = vectors
+        self.sources = sources or [""] * len(questions)
+        self.version: Optional[str] = None
+        self.rows = {
+            normalize_query(question): row for row, question in enumerate(questions)
+        }
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    @property
+    def languages(self) -> List[str]:
+        return list(self.answers)
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Sequence[Tuple[str, str, str]],
+        embedding: Embeddings,
+        translator=None,
+        languages: Sequence[str] = (),
+    ) -> "FaqIndex":
+        questions = [question for question, _, _ in rows]
+        answers = {ENGLISH: [answer for _, answer, _ in rows]}
+        for language in languages:
+            if language != ENGLISH:
+                # one batched, cached pass per language
+                answers[language] = translator.translate(
+                    answers[ENGLISH], ENGLISH, language
+                )
+        vectors = normalize(np.array(embedding.embed_documents(questions)))
+        return cls(questions, answers, vectors, [source for _, _, source in rows])
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, FAQ_VECTORS_FILE), self.vectors)
+        with open(os.path.join(directory, FAQ_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "questions": self.questions,
+                    "answers": self.answers,
+                    "sources": self.sources,
+                },
+                f,
+                ensure_ascii=False,
+            )
+
+    def digest(self) -> str:
+        """Digest of the questions, answers and vectors, to tell when they changed."""
+        digest = hashlib.sha256(
+            metadata_digest([self.questions, self.answers, self.sources]).encode()
+        )
+        digest.update(np.ascontiguousarray(self.vectors, dtype=np.float32).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, FAQ_FILE))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "FaqIndex":
+        with open(os.path.join(directory, FAQ_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        vectors = np.load(
+            os.path.join(directory, FAQ_VECTORS_FILE), mmap_mode="r" if mmap else None
+        )
+        return cls(data["questions"], data["answers"], vectors, data["sources"])
+
+    def match_exact(self, query: str) -> Optional[int]:
+        return self.rows.get(normalize_query(query))
+
+    def match(
+        self, query_vector: Sequence[float], threshold: float = 0.95
+    ) -> Optional[Tuple[int, float]]:
+        """The row of the question nearest to the query, if within `threshold`."""
+        if not len(self):
+            return None
+        scores = self.vectors @ normalize(np.asarray(query_vector))
+        row = int(np.argmax(scores))
+        score = float(scores[row])
+        return (row, score) if score >= threshold else None
+
+    def answer(self, row: int, language: str = ENGLISH) -> Optional[str]:
+        """The answer of `row` in `language`, None if it was not precomputed."""
+        answers = self.answers.get(language)
+        return answers[row] if answers is not None else None
+
+
+def write_faq_index(root: str, index: FaqIndex) -> str:
+    """
+    Write `index` as a new version under `root`, then point LATEST at it. The
+    version is only published once every file is on disk; an index identical
+    to the published one is not written again.
+    """
+    digest = index.digest()
+    current = latest_version(root)
+    if current and read_manifest(root, current).get("digest") == digest:
+        logging.info(f"FAQ index unchanged, keeping version {current}")
+        index.version = current
+        return current
+    version = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{digest[:12]}"
+
+    staging = os.path.join(root, f".{version}.tmp")
+    index.save(staging)
+    with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": version,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "digest": digest,
+                "questions": len(index),
+                "languages": index.languages,
+            },
+            f,
+            indent=2,
+        )
+    if os.path.isdir(os.path.join(root, version)):
+        # same answers within the same second, the existing version is identical
+        shutil.rmtree(staging, ignore_errors=True)
+    else:
+        os.replace(staging, os.path.join(root, version))
+    publish_version(root, version)
+    index.version = version
+    return version
+
+
+def load_faq_index(root: str, version: Optional[str] = None) -> Optional[FaqIndex]:
+    """The published FAQ index under `root` (or `version`), None if there is none."""
+    version = version or latest_version(root)
+    if version is None or not FaqIndex.exists(os.path.join(root, version)):
+        return None
+    index = FaqIndex.load(os.path.join(root, version))
+    index.version = version
+    logging.info(
+        f"Loaded FAQ index {version}: {len(index)} answers in languages: "
+        f"{', '.join(index.languages)}"
+    )
+    return index
+
+
+class LatestFaqIndex:
+    """
+    Serves the latest published FAQ index and swaps to a newer one once LATEST
+    moves, checking at most every `check_interval` seconds, the same way
+    `ArtifactIndex` follows the index artifacts.
+    """
+
+    def __init__(self, root: str, check_interval: float = 30.0):
+        self.root = root
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._index = load_faq_index(root)
+        self._checked_at = time.monotonic()
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._index.version if self._index is not None else None
+
+    @property
+    def index(self) -> Optional[FaqIndex]:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            with self._lock:
+                self._checked_at = time.monotonic()
+                version = latest_version(self.root)
+                if version and version != self.version:
+                    logging.info(f"Switching to FAQ index {version}")
+                    self._index = load_faq_index(self.root, version)
+        return self._index
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+# scores query/passage pairs, higher is more relevant
+Reranker = Callable[[str, List[str]], Sequence[float]]
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Document]], rrf_k: int = 60
+) -> List[Document]:
+    """
+    Merge ranked lists by summing 1 / (rrf_k + rank) per document, so a chunk
+    that both retrievers rank highly beats one that only a single retriever likes.
+    """
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def load_cross_encoder(model_name: str) -> Reranker:
+    """A local cross-encoder reranker, `sentence-transformers` must be installed."""
+    try:
+        from sentence_transformers import CrossEncoder
+    except ImportError as e:
+        raise ImportError(
+            "Reranking needs `pip install sentence-transformers`, "
+            "or leave rerank_model empty in config.ini"
+        ) from e
+
+    model = CrossEncoder(model_name)
+    return lambda query, passages: model.predict([(query, p) for p in passages])
+
+
+class HybridRetriever:
+    """
+    Retrieves from the vector store and the BM25 keyword index, fuses both
+    rankings with reciprocal-rank fusion and optionally reranks the fused
+    candidates locally.
+
+    Without a keyword index or reranker it is a plain vector search.
+    """
+
+    def __init__(
+        self,
+        vector_store: Any,
+        keyword_store: Optional[Any] = None,
+        candidates: int = 20,
+        rrf_k: int = 60,
+        reranker: Optional[Reranker] = None,
+    ):
+        self.vector_store = vector_store
+        self.keyword_store = keyword_store
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.reranker = reranker
+
+    def search(self, query: str, embedding: List[float], k: int = 4) -> List[Document]:
+        if self.keyword_store is None and self.reranker is None:
+            return self.vector_store.similarity_search_by_vector(embedding, k=k)
+
+        candidates = max(k, self.candidates)
+        rankings = [
+            self.vector_store.similarity_search_by_vector(embedding, k=candidates)
+        ]
+        if self.keyword_store is not None:
+            rankings.append(
+                [
+                    doc
+                    for doc, _ in self.keyword_store.keyword_search_with_score(
+                        query, candidates
+                    )
+                ]
+            )
+        documents = reciprocal_rank_fusion(rankings, self.rrf_k)[:candidates]
+
+        if self.reranker is not None and documents:
+            scores = self.reranker(query, [doc.page_content for doc in documents])
+            order = sorted(range(len(documents)), key=lambda i: -float(scores[i]))
+            documents = [documents[i] for i in order]
+
+        logging.debug(
+            f"Hybrid retrieval fused {sum(map(len, rankings))} hits into "
+            f"{len(documents)} candidates"
+        )
+        return documents[:k]
+
+    async def asearch(
+        self, query: str, embedding: List[float], k: int = 4
+    ) -> List[Document]:
+        """`search` in a worker thread, the vector stores only search synchronously."""
+        return await asyncio.to_thread(self.search, query, embedding, k)
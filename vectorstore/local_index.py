@@ -0,0 +1,213 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from vectorstore.bm25 import BM25Index
+from vectorstore.chunk_store import ChunkStore
+
+VECTORS_FILE = "embeddings.npy"
+CENTROIDS_FILE = "ivf_centroids.npy"
+LISTS_FILE = "ivf_lists.npy"
+OFFSETS_FILE = "ivf_offsets.npy"
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores along the last axis, best first."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def build_ivf(
+    vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Coarse quantizer for approximate search: spherical k-means over the
+    normalized vectors. Returns the centroids, the row ids grouped by list and
+    the offsets of each list into that array.
+    """
+    rng = np.random.default_rng(seed)
+    nlist = max(1, min(nlist, len(vectors)))
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for i in range(nlist):
+            members = vectors[assignments == i]
+            if len(members):
+                centroids[i] = members.sum(axis=0)
+        centroids = normalize(centroids)
+
+    assignments = np.argmax(vectors @ centroids.T, axis=1)
+    lists = np.argsort(assignments, kind="stable")
+    offsets = np.searchsorted(assignments[lists], np.arange(nlist + 1))
+    return centroids, lists.astype(np.int64), offsets.astype(np.int64)
+
+
+class LocalVectorIndex:
+    """
+    In-process vector index over a matrix of normalized embeddings.
+
+    Search is an exact batched dot product, unless an IVF quantizer was built,
+    in which case only the `nprobe` closest lists are scanned. A BM25 index over
+    the same chunks serves keyword search.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        texts: Union[List[str], ChunkStore],
+        embedding: Embeddings,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ivf: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+        nprobe: int = 8,
+        lexical: Optional[BM25Index] = None,
+    ):
+        self.vectors = vectors
+        self.chunks = (
+            texts
+            if isinstance(texts, ChunkStore)
+            else ChunkStore.from_records(texts, metadatas)
+        )
+        self.texts = self.chunks.texts
+        self.metadatas = self.chunks.metadatas
+        self.embedding = embedding
+        self.ivf = ivf
+        self.nprobe = nprobe
+        self.lexical = (
+            lexical if lexical is not None else BM25Index.from_texts(list(self.texts))
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        nlist: int = 0,
+        nprobe: int = 8,
+    ) -> "LocalVectorIndex":
+        vectors = normalize(embedding.embed_documents(texts))
+        ivf = build_ivf(vectors, nlist) if nlist and len(texts) else None
+        return cls(vectors, texts, embedding, metadatas, ivf=ivf, nprobe=nprobe)
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, VECTORS_FILE), np.asarray(self.vectors))
+        self.chunks.save(directory)
+        self.lexical.save(directory)
+
+        for name in (CENTROIDS_FILE, LISTS_FILE, OFFSETS_FILE):
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+        if self.ivf is not None:
+            for name, array in zip(
+                (CENTROIDS_FILE, LISTS_FILE, OFFSETS_FILE), self.ivf
+            ):
+                np.save(os.path.join(directory, name), array)
+
+    @classmethod
+    def load(
+        cls, directory: str, embedding: Embeddings, nprobe: int = 8, mmap: bool = True
+    ) -> "LocalVectorIndex":
+        mmap_mode = "r" if mmap else None
+        vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode=mmap_mode)
+        chunks = ChunkStore.load(directory, mmap)
+
+        ivf = None
+        if os.path.exists(os.path.join(directory, CENTROIDS_FILE)):
+            ivf = tuple(
+                np.load(os.path.join(directory, name))
+                for name in (CENTROIDS_FILE, LISTS_FILE, OFFSETS_FILE)
+            )
+        return cls(
+            vectors,
+            chunks,
+            embedding,
+            ivf=ivf,
+            nprobe=nprobe,
+            # artifacts written before keyword search existed are indexed on load
+            lexical=(
+                BM25Index.load(directory, mmap) if BM25Index.exists(directory) else None
+            ),
+        )
+
+    def search_vectors(
+        self, queries: np.ndarray, k: int
+    ) -> List[List[Tuple[int, float]]]:
+        """Top-k (row, score) pairs for each row of `queries`."""
+        queries = normalize(np.atleast_2d(queries))
+        if not len(self):
+            return [[] for _ in queries]
+
+        if self.ivf is None:
+            scores = queries @ np.asarray(self.vectors).T
+            best = top_k(scores, k)
+            return [
+                [(int(i), float(scores[row, i])) for i in best[row]]
+                for row in range(len(queries))
+            ]
+
+        centroids, lists, offsets = self.ivf
+        probes = top_k(queries @ centroids.T, self.nprobe)
+        results = []
+        for query, probe in zip(queries, probes):
+            candidates = np.concatenate(
+                [lists[offsets[p] : offsets[p + 1]] for p in probe]
+            )
+            scores = self.vectors[candidates] @ query
+            best = top_k(scores, k)
+            results.append([(int(candidates[i]), float(scores[i])) for i in best])
+        return results
+
+    def document(self, row: int) -> Document:
+        return Document(
+            page_content=self.texts[row], metadata=dict(self.metadatas[row])
+        )
+
+    def keyword_search_with_score(
+        self, query: str, k: int = 4
+    ) -> List[Tuple[Document, float]]:
+        return [(self.document(i), score) for i, score in self.lexical.search(query, k)]
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4
+    ) -> List[Tuple[Document, float]]:
+        return [
+            (self.document(i), score)
+            for i, score in self.search_vectors(np.asarray(embedding), k)[0]
+        ]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4
+    ) -> List[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)
+        ]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(
+            self.embedding.embed_query(query), k
+        )
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]